@@ -62,6 +62,14 @@ class Sync(object):
         self.backgroundsync_saftymargin = None
         # How many threads to download Plex metadata on sync?
         self.sync_thread_number = None
+        # How many Plex items shall we download with one single PMS request?
+        self.metadata_batch_size = None
+        # Shall full syncs get updated items, playstates and the items to
+        # delete from one single listing of every library?
+        self.fused_sync = None
+        # Shall full syncs read from a copy of plex.db (plex-copy.db) instead
+        # of a read-only snapshot of plex.db?
+        self.copy_plex_db = None
 
         # Shall Kodi show dialogs for syncing/caching images? (e.g. images left
         # to sync)
@@ -112,6 +120,9 @@ class Sync(object):
         self.sync_specific_plex_playlists = utils.settings('syncSpecificPlexPlaylists') == 'true'
         self.sync_specific_kodi_playlists = utils.settings('syncSpecificKodiPlaylists') == 'true'
         self.sync_thread_number = int(utils.settings('syncThreadNumber'))
+        self.metadata_batch_size = int(utils.settings('syncMetadataBatchSize'))
+        self.fused_sync = utils.settings('syncFused') == 'true'
+        self.copy_plex_db = utils.settings('syncCopyPlexDb') == 'true'
         self.reload()
 
     def reload(self):
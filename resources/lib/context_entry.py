@@ -6,7 +6,7 @@ import xbmc
 import xbmcgui
 
 from .plex_api import API
-from .plex_db import PlexDB
+from .plex_db import MAPPINGS
 from . import context, plex_functions as PF, playqueue as PQ
 from . import utils, variables as v, app
 
@@ -65,10 +65,9 @@ class ContextMenu(object):
     def _get_plex_id(kodi_id, kodi_type):
         plex_id = xbmc.getInfoLabel('ListItem.Property(plexid)') or None
         if not plex_id and kodi_id and kodi_type:
-            with PlexDB() as plexdb:
-                item = plexdb.item_by_kodi_id(kodi_id, kodi_type)
+            item = MAPPINGS.by_kodi_id(kodi_id, kodi_type)
             if item:
-                plex_id = item['plex_id']
+                plex_id = item.plex_id
         return plex_id
 
     def _select_menu(self):
@@ -1,12 +1,34 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
+from logging import getLogger
 import sqlite3
 from functools import wraps
+from threading import Lock, local
+from random import uniform
+from time import time
 
 from . import variables as v, app
 
-DB_WRITE_ATTEMPTS = 100
+LOG = getLogger('PLEX.db')
+
 DB_CONNECTION_TIMEOUT = 10
+# Exponential backoff [s] between attempts to write to a locked DB
+DB_BACKOFF_START = 0.05
+DB_BACKOFF_MAX = 2.0
+# Max. seconds we back off in total before giving up on a locked DB
+DB_MAX_BACKOFF_TOTAL = 10.0
+
+# Lock contention stats {db kind: Contention}, see log_contention()
+CONTENTION = {}
+CONTENTION_LOCK = Lock()
+
+# Per-thread pool of idle, already configured connections. POOL.conns is
+# {media_type: Connection}, see connect() and release()
+POOL = local()
+# Incremented by release_pool() - tells every thread to drop its pool
+POOL_GENERATION = 0
+# media_types of all connections we ever pooled
+POOLED_TYPES = set()
 
 
 class LockedDatabase(Exception):
@@ -16,40 +38,121 @@ class LockedDatabase(Exception):
     pass
 
 
+class Contention(object):
+    """
+    How often and how long our writers were blocked by a locked DB
+    """
+    def __init__(self):
+        # Number of DB operations that hit a locked DB at least once
+        self.blocked = 0
+        # Number of DB operations that we had to give up on
+        self.failed = 0
+        # Total number of retries
+        self.retries = 0
+        # Total and max time [s] DB operations were blocked
+        self.waited = 0.0
+        self.max_wait = 0.0
+
+
+def record_contention(db_kind, retries, waited, failed=False):
+    """
+    Call after a DB operation on db_kind ('video', 'music', 'texture',
+    'plex') was blocked for waited seconds and retried retries times
+    """
+    with CONTENTION_LOCK:
+        stats = CONTENTION.setdefault(db_kind, Contention())
+        stats.blocked += 1
+        stats.retries += retries
+        stats.waited += waited
+        stats.max_wait = max(stats.max_wait, waited)
+        if failed:
+            stats.failed += 1
+
+
+def blocked_count(db_kind):
+    """
+    Returns the number of DB operations on db_kind that have been blocked
+    since we last logged the contention stats
+    """
+    with CONTENTION_LOCK:
+        try:
+            return CONTENTION[db_kind].blocked
+        except KeyError:
+            return 0
+
+
+def log_contention():
+    """
+    Logs and resets the lock contention stats of all DBs
+    """
+    with CONTENTION_LOCK:
+        for db_kind, stats in sorted(CONTENTION.iteritems()):
+            LOG.info('Lock contention for %s DB: %s operations blocked '
+                     'for %.2fs in total, max %.2fs, %s retries, %s failed',
+                     db_kind, stats.blocked, stats.waited, stats.max_wait,
+                     stats.retries, stats.failed)
+        if not CONTENTION:
+            LOG.info('No lock contention for any DB')
+        CONTENTION.clear()
+
+
+def backoff(attempt, waited=0.0, start=DB_BACKOFF_START):
+    """
+    Returns the number of seconds to wait before our next attempt to access
+    a locked DB: exponential backoff with jitter, so that our different
+    writers do not retry in lockstep. Pass the seconds we already waited in
+    order to not exceed DB_MAX_BACKOFF_TOTAL
+    """
+    delay = min(start * 2 ** (attempt - 1), DB_BACKOFF_MAX)
+    return min(uniform(delay / 2, delay), DB_MAX_BACKOFF_TOTAL - waited)
+
+
 def catch_operationalerrors(method):
     """
     sqlite.OperationalError is raised immediately if another DB connection
     is open, reading something that we're trying to change
 
-    So let's catch it and try again
+    So let's catch it and try again - with an exponential backoff
 
     Also see https://github.com/mattn/go-sqlite3/issues/274
     """
     @wraps(method)
     def wrapper(self, *args, **kwargs):
-        attempts = DB_WRITE_ATTEMPTS
+        attempt = 0
+        waited = 0.0
+        start = time()
         while True:
             try:
-                return method(self, *args, **kwargs)
+                answ = method(self, *args, **kwargs)
             except sqlite3.OperationalError as err:
                 if 'database is locked' not in err:
                     # Not an error we want to catch, so reraise it
                     raise
-                attempts -= 1
-                if attempts == 0:
+                attempt += 1
+                if waited >= DB_MAX_BACKOFF_TOTAL:
+                    record_contention(self.db_kind, attempt, time() - start,
+                                      failed=True)
                     # Reraise in order to NOT catch nested OperationalErrors
                     raise LockedDatabase('Database is locked')
                 # Need to close the transactions and begin new ones
                 self.kodiconn.commit()
                 if self.artconn:
                     self.artconn.commit()
-                if app.APP.monitor.waitForAbort(0.1):
+                # Kodi might insert rows before our next transaction
+                self.invalidate_ids()
+                delay = backoff(attempt, waited)
+                waited += delay
+                if app.APP.monitor.waitForAbort(delay):
                     # PKC needs to quit
                     return
                 # Start new transactions
                 self.kodiconn.execute('BEGIN')
                 if self.artconn:
                     self.artconn.execute('BEGIN')
+            else:
+                if attempt:
+                    record_contention(self.db_kind, attempt, time() - start)
+                return answ
     return wrapper
 
 
@@ -64,39 +167,136 @@ def _initial_db_connection_setup(conn):
     conn.execute('BEGIN')
 
 
-def connect(media_type=None):
+def _begin(conn):
+    conn.execute('BEGIN')
+
+
+class Connection(sqlite3.Connection):
     """
-    Open a connection to the Kodi database.
-        media_type: 'video' (standard if not passed), 'plex', 'music', 'texture'
+    sqlite3 connection that remembers its media_type for the pool
     """
-    if media_type == "plex":
-        db_path = v.DB_PLEX_PATH
+    media_type = None
+
+
+def _db_path(media_type):
+    if media_type in ("plex", 'plex-snapshot'):
+        return v.DB_PLEX_PATH
     elif media_type == 'plex-copy':
-        db_path = v.DB_PLEX_COPY_PATH
+        return v.DB_PLEX_COPY_PATH
     elif media_type == "music":
-        db_path = v.DB_MUSIC_PATH
+        return v.DB_MUSIC_PATH
     elif media_type == "texture":
-        db_path = v.DB_TEXTURE_PATH
+        return v.DB_TEXTURE_PATH
+    else:
+        return v.DB_VIDEO_PATH
+
+
+def _pool():
+    """
+    Returns the pool {media_type: Connection} of the current thread. Closes
+    all pooled connections if release_pool() has been called in the meantime
+    """
+    if getattr(POOL, 'generation', None) != POOL_GENERATION:
+        for conn in getattr(POOL, 'conns', {}).itervalues():
+            conn.close()
+        POOL.conns = {}
+        POOL.generation = POOL_GENERATION
+    return POOL.conns
+
+
+def connect(media_type=None):
+    """
+    Open a connection to the Kodi database.
+        media_type: 'video' (standard if not passed), 'plex', 'music', 'texture'
+
+    'plex-snapshot' opens a read-only connection to plex.db. Thanks to WAL,
+    its transaction reads a consistent snapshot of the DB and neither blocks
+    nor is blocked by our writing connections
+
+    Reuses an idle connection of the current thread if there is one. Hand the
+    connection back with release() instead of closing it
+    """
+    try:
+        conn = _pool().pop(media_type)
+    except KeyError:
+        conn = sqlite3.connect(_db_path(media_type),
+                               timeout=DB_CONNECTION_TIMEOUT,
+                               isolation_level=None,
+                               factory=Connection)
+        conn.media_type = media_type
+        setup = _initial_db_connection_setup
     else:
-        db_path = v.DB_VIDEO_PATH
-    conn = sqlite3.connect(db_path,
-                           timeout=DB_CONNECTION_TIMEOUT,
-                           isolation_level=None)
-    attempts = DB_WRITE_ATTEMPTS
+        setup = _begin
+    db_kind = 'plex' if media_type == 'plex-snapshot' else media_type or 'video'
+    attempt = 0
+    waited = 0.0
+    start = time()
     while True:
         try:
-            _initial_db_connection_setup(conn)
+            setup(conn)
         except sqlite3.OperationalError as err:
             if 'database is locked' not in err:
                 # Not an error we want to catch, so reraise it
                 raise
-            attempts -= 1
-            if attempts == 0:
+            attempt += 1
+            if waited >= DB_MAX_BACKOFF_TOTAL:
+                record_contention(db_kind, attempt, time() - start,
+                                  failed=True)
                 # Reraise in order to NOT catch nested OperationalErrors
                 raise LockedDatabase('Database is locked')
-            if app.APP.monitor.waitForAbort(0.05):
+            delay = backoff(attempt, waited)
+            waited += delay
+            if app.APP.monitor.waitForAbort(delay):
                 # PKC needs to quit
                 raise LockedDatabase('Database was locked and we need to exit')
         else:
+            if attempt:
+                record_contention(db_kind, attempt, time() - start)
             break
+    if media_type == 'plex-snapshot' and setup is _initial_db_connection_setup:
+        conn.execute('PRAGMA query_only = ON;')
     return conn
+
+
+def release(conn):
+    """
+    Use instead of conn.close(): rolls back anything that has not been
+    committed and keeps the connection around for the next connect() of
+    this thread
+    """
+    if conn.media_type == 'plex-copy':
+        # plex-copy.db is replaced with every full sync
+        conn.close()
+        return
+    pool = _pool()
+    if conn.media_type in pool:
+        # Nested connections - we only need to keep one
+        conn.close()
+        return
+    try:
+        conn.rollback()
+    except sqlite3.Error:
+        conn.close()
+        return
+    pool[conn.media_type] = conn
+    POOLED_TYPES.add(conn.media_type)
+
+
+def release_pool():
+    """
+    Closes the pooled connections of the current thread right away. Other
+    threads close theirs with their next connect() or once they exit.
+    Then checkpoints the WAL of all DBs we pooled connections for
+    """
+    global POOL_GENERATION
+    POOL_GENERATION += 1
+    _pool()
+    for db_path in set(_db_path(x) for x in POOLED_TYPES):
+        conn = sqlite3.connect(db_path, timeout=DB_CONNECTION_TIMEOUT)
+        try:
+            conn.execute('PRAGMA wal_checkpoint(PASSIVE);')
+        except sqlite3.OperationalError as err:
+            LOG.warn('Could not checkpoint %s: %s', db_path, err)
+        finally:
+            conn.close()
+    POOLED_TYPES.clear()
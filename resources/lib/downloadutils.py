@@ -5,7 +5,7 @@ from logging import getLogger
 import requests
 import requests.exceptions as exceptions
 
-from . import utils, clientinfo, app
+from . import utils, clientinfo, app, backgroundthread
 
 ###############################################################################
 
@@ -15,9 +15,22 @@ requests.packages.urllib3.disable_warnings()
 
 LOG = getLogger('PLEX.download')
 
+# Connections to the PMS we keep open on top of one per sync download thread
+# and one per background worker - e.g. for playback and the Kodi monitor
+SPARE_CONNECTIONS = 4
+
 ###############################################################################
 
 
+def pool_size():
+    """
+    Max. number of connections to the PMS that PKC might use simultaneously
+    """
+    return (int(utils.settings('syncThreadNumber')) +
+            backgroundthread.WORKER_COUNT +
+            SPARE_CONNECTIONS)
+
+
 class DownloadUtils():
     """
     Manages any up/downloads with PKC. Careful to initiate correctly
@@ -63,6 +76,9 @@ class DownloadUtils():
         self.deviceId = clientinfo.getDeviceId()
         # Attach authenticated header to the session
         self.s.headers = clientinfo.getXArgsDeviceInfo()
+        # Replacing the headers dropped requests' default - let the PMS
+        # compress its (huge) xml responses
+        self.s.headers['Accept-Encoding'] = 'gzip, deflate'
         self.s.encoding = 'utf-8'
         # Set SSL settings
         self.setSSL()
@@ -72,13 +88,47 @@ class DownloadUtils():
             self.count_error = 0
             self.count_unauthorized = 0
 
-        # Retry connections to the server
-        self.s.mount("http://", requests.adapters.HTTPAdapter(max_retries=1))
-        self.s.mount("https://", requests.adapters.HTTPAdapter(max_retries=1))
+        # Retry connections to the server. Keep enough connections alive for
+        # all our threads - otherwise urllib3 discards them ("pool is full")
+        self.pool_size = pool_size()
+        self.s.mount("http://", requests.adapters.HTTPAdapter(
+            pool_maxsize=self.pool_size, max_retries=1))
+        self.s.mount("https://", requests.adapters.HTTPAdapter(
+            pool_maxsize=self.pool_size, max_retries=1))
+
+        LOG.debug("Requests session started on: %s with %s connections",
+                  app.CONN.server, self.pool_size)
+
+    def connection_stats(self):
+        """
+        Returns the tuple (number of requests, number of connections opened)
+        for our requests session since it was started
+        """
+        num_requests, num_connections = 0, 0
+        try:
+            adapters = self.s.adapters.values()
+        except AttributeError:
+            return num_requests, num_connections
+        for adapter in adapters:
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                num_requests += pool.num_requests
+                num_connections += pool.num_connections
+        return num_requests, num_connections
 
-        LOG.debug("Requests session started on: %s", app.CONN.server)
+    def log_connection_stats(self):
+        num_requests, num_connections = self.connection_stats()
+        LOG.info('PMS connections: %s requests, %s connections opened, %s '
+                 'reused. Pool size: %s',
+                 num_requests, num_connections,
+                 max(num_requests - num_connections, 0),
+                 getattr(self, 'pool_size', None))
 
     def stopSession(self):
+        self.log_connection_stats()
         try:
             self.s.close()
         except Exception:
@@ -3,7 +3,10 @@
 from __future__ import absolute_import, division, unicode_literals
 from logging import getLogger
 from ntpath import dirname
+from hashlib import md5
+import json
 
+from ..utils import cast
 from ..plex_db import PlexDB, PLEXDB_LOCK
 from ..kodi_db import KodiVideoDB, KODIDB_LOCK
 from .. import db, timing, app
@@ -74,28 +77,35 @@ class ItemBase(object):
         """
         Make sure DB changes are committed and connection to DB is closed.
         """
+        self.kodidb.log_cache_stats()
         try:
             if exc_type:
                 # re-raise any exception
                 return False
+            self.kodidb.collect_orphans()
             self.plexconn.commit()
+            self.plexdb.invalidate_mappings()
             self.kodiconn.commit()
             if self.artconn:
                 self.artconn.commit()
             return self
         finally:
-            self.plexconn.close()
-            self.kodiconn.close()
+            db.release(self.plexconn)
+            db.release(self.kodiconn)
             if self.artconn:
-                self.artconn.close()
+                db.release(self.artconn)
             if self.lock:
                 PLEXDB_LOCK.release()
                 KODIDB_LOCK.release()
 
     def commit(self):
+        # Committing makes our unlinks permanent - sweep their orphans now
+        self.kodidb.collect_orphans()
         self.plexconn.commit()
+        self.plexdb.invalidate_mappings()
         self.plexconn.execute('BEGIN')
         self.kodiconn.commit()
+        self.kodidb.invalidate_ids()
         self.kodiconn.execute('BEGIN')
         if self.artconn:
             self.artconn.commit()
@@ -146,26 +156,133 @@ class ItemBase(object):
         """
         return section_id in app.SYNC.section_ids
 
-    def update_provider_ids(self, api, kodi_id):
+    def sync_this_xml(self, xml, section_id=None):
         """
-        Updates the unique metadata provider ids (such as the IMDB id). Returns
-        a dict of the Kodi unique ids
+        Returns False if we are NOT synching the library section of the PMS
+        item xml. Check before calling bundle(), which might download even
+        more from the PMS
         """
+        section_id = section_id or cast(int, xml.get('librarySectionID'))
+        if self.sync_this_item(section_id):
+            return True
+        LOG.debug('Skipping sync of %s %s: %s - section %s not synched to '
+                  'Kodi', xml.get('type'), xml.get('ratingKey'),
+                  xml.get('title'), section_id)
+        return False
+
+    @staticmethod
+    def _digest(data):
+        return md5(json.dumps(data, sort_keys=True)).hexdigest()
+
+    def _unless_unchanged(self, item, kind, data, write, *args):
+        """
+        Calls write(*args) and returns its result - unless data, the
+        normalized input of write [json-serializable], is identical to the
+        data of our last write of kind for item. Then we skip the write and
+        return the result of the last write instead.
+
+        Always include the Kodi ids you write to in data!
+        """
+        digest = self._digest(data)
+        old = self.plexdb.kodi_digest(item['plex_id'], item['plex_type'], kind)
+        if old and old[0] == digest:
+            return json.loads(old[1])
+        return self._write_and_remember(item, kind, digest, write, *args)
+
+    def _write_and_remember(self, item, kind, digest, write, *args):
+        """
+        Calls write(*args) and remembers the digest of its input (see
+        _digest()) for _unless_unchanged(). Use for new Kodi items - their
+        Kodi ids might have belonged to items that do not exist anymore
+        """
+        result = write(*args)
+        self.plexdb.set_kodi_digest(item['plex_id'],
+                                    item['plex_type'],
+                                    kind,
+                                    digest,
+                                    json.dumps(result))
+        return result
+
+    def update_ratings(self, item, kodi_id):
+        """
+        Updates the item's default rating in the Kodi DB unless it did not
+        change. Returns the Kodi rating_id. Pass in the item's row bundle item
+        """
+        return self._unless_unchanged(
+            item,
+            'ratings',
+            (kodi_id, item['rating'], item['votecount']),
+            self.kodidb.update_ratings,
+            kodi_id, item['kodi_type'], 'default', item['rating'],
+            item['votecount'])
+
+    def add_ratings(self, item, kodi_id):
+        """
+        Adds the item's default rating to the Kodi DB. Returns the Kodi
+        rating_id. Pass in the item's row bundle item
+        """
+        return self._write_and_remember(
+            item,
+            'ratings',
+            self._digest((kodi_id, item['rating'], item['votecount'])),
+            self.kodidb.add_ratings,
+            kodi_id, item['kodi_type'], 'default', item['rating'],
+            item['votecount'])
+
+    def modify_streams(self, item, kodi_fileid, update_item=True):
+        """
+        Writes the item's streamdetails to the Kodi DB unless they did not
+        change. Pass in the item's row bundle item. Always writes them if
+        update_item is False
+        """
+        data = (kodi_fileid, item['streams'], item['runtime'])
+        if update_item:
+            self._unless_unchanged(item, 'streams', data,
+                                   self.kodidb.modify_streams,
+                                   kodi_fileid, item['streams'],
+                                   item['runtime'])
+        else:
+            self._write_and_remember(item, 'streams', self._digest(data),
+                                     self.kodidb.modify_streams,
+                                     kodi_fileid, item['streams'],
+                                     item['runtime'])
+
+    def update_provider_ids(self, item, kodi_id):
+        """
+        Updates the unique metadata provider ids (such as the IMDB id) unless
+        they did not change. Returns a dict of the Kodi unique ids. Pass in
+        the item's row bundle item
+        """
+        return self._unless_unchanged(item,
+                                      'uniqueid',
+                                      (kodi_id, item['guids']),
+                                      self._update_provider_ids,
+                                      item, kodi_id)
+
+    def _update_provider_ids(self, item, kodi_id):
         # We might have an old provider id stored!
-        self.kodidb.remove_uniqueid(kodi_id, api.kodi_type)
-        return self.add_provider_ids(api, kodi_id)
+        self.kodidb.remove_uniqueid(kodi_id, item['kodi_type'])
+        return self._add_provider_ids(item, kodi_id)
 
-    def add_provider_ids(self, api, kodi_id):
+    def add_provider_ids(self, item, kodi_id):
         """
         Adds the unique ids for all metadata providers to the Kodi database,
-        such as IMDB or The Movie Database TMDB.
+        such as IMDB or The Movie Database TMDB. Pass in the item's row bundle
+        item.
         Returns a dict of the Kodi ids: {<provider>: <kodi_unique_id>}
         """
-        kodi_unique_ids = api.guids.copy()
-        for provider, provider_id in api.guids.iteritems():
+        return self._write_and_remember(item,
+                                        'uniqueid',
+                                        self._digest((kodi_id, item['guids'])),
+                                        self._add_provider_ids,
+                                        item, kodi_id)
+
+    def _add_provider_ids(self, item, kodi_id):
+        kodi_unique_ids = item['guids'].copy()
+        for provider, provider_id in item['guids'].iteritems():
             kodi_unique_ids[provider] = self.kodidb.add_uniqueid(
                 kodi_id,
-                api.kodi_type,
+                item['kodi_type'],
                 provider_id,
                 provider)
         return kodi_unique_ids
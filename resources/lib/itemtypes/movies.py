@@ -19,13 +19,97 @@ class Movie(ItemBase):
         """
         Process single movie
         """
+        if not self.sync_this_xml(xml, section_id):
+            return
+        self.add_update_bundle(self.bundle(xml, section_id, children),
+                               section_name=section_name,
+                               section_id=section_id)
+
+    @staticmethod
+    def bundle(xml, section_id=None, children=None):
+        """
+        Turns the PMS metadata xml into a row bundle: a dict of plain values
+        that add_update_bundle() writes to the DBs without touching the xml
+        again. Does not access any DB, so call it from any thread
+        """
         api = API(xml)
-        if not self.sync_this_item(section_id or api.library_section_id()):
+        fullpath, path, filename = api.fullpath()
+        collections = api.collections()
+        set_artwork = None
+        if collections and app.SYNC.artwork:
+            # Get the artwork for the very first collection only, see below
+            plex_set_id, set_name = collections[0]
+            set_xml = None
+            if children is None:
+                # e.g. when added via websocket
+                LOG.debug('Costly looking up Plex collection %s: %s',
+                          plex_set_id, set_name)
+                for index, coll_plex_id in api.collections_match(section_id):
+                    # Get Plex artwork for collections - a pain
+                    if index == plex_set_id:
+                        set_xml = PF.GetPlexMetadata(coll_plex_id)
+                        try:
+                            set_xml = set_xml[0]
+                        except (TypeError, IndexError):
+                            LOG.error('Could not get set metadata %s',
+                                      coll_plex_id)
+                            set_xml = None
+                            continue
+                        break
+            elif plex_set_id in children:
+                # Collection xml element provided by get_metadata thread
+                set_xml = children[plex_set_id]
+            if set_xml is not None:
+                set_artwork = API(set_xml).artwork()
+        return {
+            'plex_id': api.plex_id,
+            'plex_type': api.plex_type,
+            'kodi_type': api.kodi_type,
+            'section_id': api.library_section_id(),
+            'checksum': api.checksum(),
+            'title': api.title(),
+            'fullpath': fullpath,
+            'path': path,
+            'filename': filename,
+            'date_created': api.date_created(),
+            'rating': api.rating(),
+            'votecount': api.votecount(),
+            'guids': api.guids.copy(),
+            'people': api.people(),
+            'artwork': api.artwork() if app.SYNC.artwork else None,
+            'plot': api.plot(),
+            'shortplot': api.shortplot(),
+            'tagline': api.tagline(),
+            'writers': api.list_to_string(api.writers()),
+            'year': api.year(),
+            'sorttitle': api.sorttitle(),
+            'runtime': api.runtime(),
+            'content_rating': api.content_rating(),
+            'genres': api.genres(),
+            'directors': api.list_to_string(api.directors()),
+            'studios': api.studios(),
+            'trailer': api.trailer(),
+            'countries': api.countries(),
+            'premiere_date': api.premiere_date(),
+            'userrating': api.userrating(),
+            'streams': api.mediastreams(),
+            'collections': collections,
+            'set_artwork': set_artwork,
+            'resume_point': api.resume_point(),
+            'viewcount': api.viewcount(),
+            'lastplayed': api.lastplayed()
+        }
+
+    def add_update_bundle(self, item, section_name=None, section_id=None):
+        """
+        Writes the movie's row bundle item (see bundle()) to the DBs
+        """
+        if not self.sync_this_item(section_id or item['section_id']):
             LOG.debug('Skipping sync of %s %s: %s - section %s not synched to '
-                      'Kodi', api.plex_type, api.plex_id, api.title(),
-                      section_id or api.library_section_id())
+                      'Kodi', item['plex_type'], item['plex_id'],
+                      item['title'], section_id or item['section_id'])
             return
-        plex_id = api.plex_id
+        plex_id = item['plex_id']
         movie = self.plexdb.movie(plex_id)
         if movie:
             update_item = True
@@ -36,7 +120,8 @@ class Movie(ItemBase):
             update_item = False
             kodi_id = self.kodidb.new_movie_id()
 
-        fullpath, path, filename = api.fullpath()
+        fullpath, path, filename = \
+            item['fullpath'], item['path'], item['filename']
         if app.SYNC.direct_paths and not fullpath.startswith('http'):
             kodi_pathid = self.kodidb.add_path(path,
                                                content='movies',
@@ -45,41 +130,33 @@ class Movie(ItemBase):
             kodi_pathid = self.kodidb.get_path(path)
 
         if update_item:
-            LOG.info('UPDATE movie plex_id: %s - %s', plex_id, api.title())
+            LOG.info('UPDATE movie plex_id: %s - %s', plex_id, item['title'])
             file_id = self.kodidb.modify_file(filename,
                                               kodi_pathid,
-                                              api.date_created())
+                                              item['date_created'])
             if file_id != old_kodi_fileid:
                 self.kodidb.remove_file(old_kodi_fileid)
-            rating_id = self.kodidb.update_ratings(kodi_id,
-                                                   v.KODI_TYPE_MOVIE,
-                                                   "default",
-                                                   api.rating(),
-                                                   api.votecount())
-            unique_id = self.update_provider_ids(api, kodi_id)
+            rating_id = self.update_ratings(item, kodi_id)
+            unique_id = self.update_provider_ids(item, kodi_id)
             self.kodidb.modify_people(kodi_id,
                                       v.KODI_TYPE_MOVIE,
-                                      api.people())
+                                      item['people'])
             if app.SYNC.artwork:
-                self.kodidb.modify_artwork(api.artwork(),
+                self.kodidb.modify_artwork(item['artwork'],
                                            kodi_id,
                                            v.KODI_TYPE_MOVIE)
         else:
-            LOG.info("ADD movie plex_id: %s - %s", plex_id, api.title())
+            LOG.info("ADD movie plex_id: %s - %s", plex_id, item['title'])
             file_id = self.kodidb.add_file(filename,
                                            kodi_pathid,
-                                           api.date_created())
-            rating_id = self.kodidb.add_ratings(kodi_id,
-                                                v.KODI_TYPE_MOVIE,
-                                                "default",
-                                                api.rating(),
-                                                api.votecount())
-            unique_id = self.add_provider_ids(api, kodi_id)
+                                           item['date_created'])
+            rating_id = self.add_ratings(item, kodi_id)
+            unique_id = self.add_provider_ids(item, kodi_id)
             self.kodidb.add_people(kodi_id,
                                    v.KODI_TYPE_MOVIE,
-                                   api.people())
+                                   item['people'])
             if app.SYNC.artwork:
-                self.kodidb.add_artwork(api.artwork(),
+                self.kodidb.add_artwork(item['artwork'],
                                         kodi_id,
                                         v.KODI_TYPE_MOVIE)
 
@@ -88,47 +165,47 @@ class Movie(ItemBase):
         # Update Kodi's main entry
         self.kodidb.add_movie(kodi_id,
                               file_id,
-                              api.title(),
-                              api.plot(),
-                              api.shortplot(),
-                              api.tagline(),
-                              api.votecount(),
+                              item['title'],
+                              item['plot'],
+                              item['shortplot'],
+                              item['tagline'],
+                              item['votecount'],
                               rating_id,
-                              api.list_to_string(api.writers()),
-                              api.year(),
+                              item['writers'],
+                              item['year'],
                               unique_id,
-                              api.sorttitle(),
-                              api.runtime(),
-                              api.content_rating(),
-                              api.list_to_string(api.genres()),
-                              api.list_to_string(api.directors()),
-                              api.title(),
-                              api.list_to_string(api.studios()),
-                              api.trailer(),
-                              api.list_to_string(api.countries()),
+                              item['sorttitle'],
+                              item['runtime'],
+                              item['content_rating'],
+                              API.list_to_string(item['genres']),
+                              item['directors'],
+                              item['title'],
+                              API.list_to_string(item['studios']),
+                              item['trailer'],
+                              API.list_to_string(item['countries']),
                               fullpath,
                               kodi_pathid,
-                              api.premiere_date(),
-                              api.userrating())
+                              item['premiere_date'],
+                              item['userrating'])
 
         self.kodidb.modify_countries(kodi_id,
                                      v.KODI_TYPE_MOVIE,
-                                     api.countries())
-        self.kodidb.modify_genres(kodi_id, v.KODI_TYPE_MOVIE, api.genres())
+                                     item['countries'])
+        self.kodidb.modify_genres(kodi_id, v.KODI_TYPE_MOVIE, item['genres'])
 
-        self.kodidb.modify_streams(file_id, api.mediastreams(), api.runtime())
-        self.kodidb.modify_studios(kodi_id, v.KODI_TYPE_MOVIE, api.studios())
+        self.modify_streams(item, file_id, update_item)
+        self.kodidb.modify_studios(kodi_id, v.KODI_TYPE_MOVIE, item['studios'])
         tags = [section_name]
-        self._process_collections(api, tags, kodi_id, section_id, children)
+        self._process_collections(item, tags, kodi_id)
         self.kodidb.modify_tags(kodi_id, v.KODI_TYPE_MOVIE, tags)
         # Process playstate
         self.kodidb.set_resume(file_id,
-                               api.resume_point(),
-                               api.runtime(),
-                               api.viewcount(),
-                               api.lastplayed())
+                               item['resume_point'],
+                               item['runtime'],
+                               item['viewcount'],
+                               item['lastplayed'])
         self.plexdb.add_movie(plex_id=plex_id,
-                              checksum=api.checksum(),
+                              checksum=item['checksum'],
                               section_id=section_id,
                               kodi_id=kodi_id,
                               kodi_fileid=file_id,
@@ -194,45 +271,22 @@ class Movie(ItemBase):
                                       api.userrating())
         return True
 
-    def _process_collections(self, api, tags, kodi_id, section_id, children):
-        for _, set_name in api.collections():
+    def _process_collections(self, item, tags, kodi_id):
+        for _, set_name in item['collections']:
             tags.append(set_name)
-        for plex_set_id, set_name in api.collections(): 
-            set_api = None
-            # Add any sets from Plex collection tags
-            kodi_set_id = self.kodidb.create_collection(set_name)
-            self.kodidb.assign_collection(kodi_set_id, kodi_id)
-            if not app.SYNC.artwork:
-                # Rest below is to get collection artwork
-                # TODO: continue instead of break (see TODO/break below)
-                break
-            if children is None:
-                # e.g. when added via websocket
-                LOG.debug('Costly looking up Plex collection %s: %s',
-                          plex_set_id, set_name)
-                for index, coll_plex_id in api.collections_match(section_id):
-                    # Get Plex artwork for collections - a pain
-                    if index == plex_set_id:
-                        set_xml = PF.GetPlexMetadata(coll_plex_id)
-                        try:
-                            set_xml.attrib
-                        except AttributeError:
-                            LOG.error('Could not get set metadata %s',
-                                      coll_plex_id)
-                            continue
-                        set_api = API(set_xml[0])
-                        break
-            elif plex_set_id in children:
-                # Provided by get_metadata thread
-                set_api = API(children[plex_set_id][0])
-            if set_api:
-                self.kodidb.modify_artwork(set_api.artwork(),
-                                           kodi_set_id,
-                                           v.KODI_TYPE_SET)
-            # TODO: Once Kodi (19?) supports SEVERAL sets/collections per
-            # movie, support that. For now, we only take the very first
-            # collection/set that Plex returns
-            break
+        if not item['collections']:
+            return
+        # TODO: Once Kodi (19?) supports SEVERAL sets/collections per
+        # movie, support that. For now, we only take the very first
+        # collection/set that Plex returns
+        _, set_name = item['collections'][0]
+        # Add any sets from Plex collection tags
+        kodi_set_id = self.kodidb.create_collection(set_name)
+        self.kodidb.assign_collection(kodi_set_id, kodi_id)
+        if item['set_artwork']:
+            self.kodidb.modify_artwork(item['set_artwork'],
+                                       kodi_set_id,
+                                       v.KODI_TYPE_SET)
 
     @staticmethod
     def _prioritize_provider_id(unique_ids):
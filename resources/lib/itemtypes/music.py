@@ -157,13 +157,41 @@ class Artist(MusicMixin, ItemBase):
         """
         Process a single artist
         """
+        if not self.sync_this_xml(xml, section_id):
+            return
+        self.add_update_bundle(self.bundle(xml, section_id, children),
+                               section_name=section_name,
+                               section_id=section_id)
+
+    @staticmethod
+    def bundle(xml, section_id=None, children=None):
+        """
+        Turns the PMS metadata xml into a row bundle: a dict of plain values
+        that add_update_bundle() writes to the DBs without touching the xml
+        again. Does not access any DB, so call it from any thread
+        """
         api = API(xml)
-        if not self.sync_this_item(section_id or api.library_section_id()):
+        return {
+            'plex_id': api.plex_id,
+            'plex_type': api.plex_type,
+            'section_id': api.library_section_id(),
+            'checksum': api.checksum(),
+            'title': api.title(),
+            'genre': api.list_to_string(api.genres()),
+            'plot': api.plot(),
+            'artwork': api.artwork() if app.SYNC.artwork else None
+        }
+
+    def add_update_bundle(self, item, section_name=None, section_id=None):
+        """
+        Writes the artist's row bundle item (see bundle()) to the DBs
+        """
+        if not self.sync_this_item(section_id or item['section_id']):
             LOG.debug('Skipping sync of %s %s: %s - section %s not synched to '
-                      'Kodi', api.plex_type, api.plex_id, api.title(),
-                      section_id or api.library_section_id())
+                      'Kodi', item['plex_type'], item['plex_id'],
+                      item['title'], section_id or item['section_id'])
             return
-        plex_id = api.plex_id
+        plex_id = item['plex_id']
         artist = self.plexdb.artist(plex_id)
         if not artist:
             update_item = False
@@ -175,7 +203,7 @@ class Artist(MusicMixin, ItemBase):
         musicBrainzId = None
 
         if app.SYNC.artwork:
-            artworks = api.artwork()
+            artworks = item['artwork']
             if 'poster' in artworks:
                 thumb = "<thumb>%s</thumb>" % artworks['poster']
             else:
@@ -189,17 +217,19 @@ class Artist(MusicMixin, ItemBase):
 
         # UPDATE THE ARTIST #####
         if update_item:
-            LOG.info("UPDATE artist plex_id: %s - Name: %s", plex_id, api.title())
+            LOG.info("UPDATE artist plex_id: %s - Name: %s",
+                     plex_id, item['title'])
         # OR ADD THE ARTIST #####
         else:
-            LOG.info("ADD artist plex_id: %s - Name: %s", plex_id, api.title())
+            LOG.info("ADD artist plex_id: %s - Name: %s",
+                     plex_id, item['title'])
             # safety checks: It looks like plex supports the same artist
             # multiple times.
             # Kodi doesn't allow that. In case that happens we just merge the
             # artist entries.
-            kodi_id = self.kodidb.add_artist(api.title(), musicBrainzId)
-        self.kodidb.update_artist(api.list_to_string(api.genres()),
-                                  api.plot(),
+            kodi_id = self.kodidb.add_artist(item['title'], musicBrainzId)
+        self.kodidb.update_artist(item['genre'],
+                                  item['plot'],
                                   thumb,
                                   fanart,
                                   timing.unix_date_to_kodi(self.last_sync),
@@ -209,7 +239,7 @@ class Artist(MusicMixin, ItemBase):
                                        kodi_id,
                                        v.KODI_TYPE_ARTIST)
         self.plexdb.add_artist(plex_id,
-                               api.checksum(),
+                               item['checksum'],
                                section_id,
                                kodi_id,
                                self.last_sync)
@@ -223,13 +253,90 @@ class Album(MusicMixin, ItemBase):
         scan_children: set to False if you don't want to add children, e.g. to
         avoid infinite loops
         """
+        if not self.sync_this_xml(xml, section_id):
+            return
+        self.add_update_bundle(self.bundle(xml,
+                                           section_id,
+                                           children,
+                                           scan_children=scan_children),
+                               section_name=section_name,
+                               section_id=section_id)
+
+    @staticmethod
+    def bundle(xml, section_id=None, children=None, scan_children=True,
+               compilation=None):
+        """
+        Turns the PMS metadata xml into a row bundle: a dict of plain values
+        that add_update_bundle() writes to the DBs without touching the xml
+        again. Does not access any DB, so call it from any thread. Returns
+        None if we cannot sync this album.
+
+        The bundle contains the bundles of all the album's songs unless
+        scan_children is False. Pass compilation [0 or 1] if you know whether
+        the album is a compilation to avoid downloading the children
+        """
         api = API(xml)
-        if not self.sync_this_item(section_id or api.library_section_id()):
+        plex_id = api.plex_id
+        if compilation is None or scan_children:
+            if children is None:
+                LOG.info('No children songs passed, getting them')
+                children = PF.GetAllPlexChildren(plex_id)
+                try:
+                    children[0].attrib
+                except (TypeError, IndexError, AttributeError):
+                    LOG.error('Could not get children for Plex id %s', plex_id)
+                    return
+        if compilation is None:
+            # See if we have a compilation - Plex does NOT feature a
+            # compilation flag for albums
+            compilation = 0
+            for song in children:
+                if song.get('originalTitle') is not None:
+                    compilation = 1
+                    break
+        genres = api.genres()
+        genre = api.list_to_string(genres)
+        if scan_children:
+            songs = [Song.bundle(song,
+                                 section_id,
+                                 album_xml=xml,
+                                 genres=genres,
+                                 genre=genre,
+                                 compilation=compilation)
+                     for song in children]
+        else:
+            songs = []
+        return {
+            'plex_id': plex_id,
+            'plex_type': api.plex_type,
+            'section_id': api.library_section_id(),
+            'checksum': api.checksum(),
+            'title': api.title(),
+            'parent_id': api.parent_id(),
+            'artist_name': api.artist_name(),
+            'genre': genre,
+            'year': api.year(),
+            'compilation': compilation,
+            'plot': api.plot(),
+            'studios': api.list_to_string(api.studios()),
+            'userrating': api.userrating(),
+            'artwork': api.artwork() if app.SYNC.artwork else None,
+            'songs': songs
+        }
+
+    def add_update_bundle(self, item, section_name=None, section_id=None):
+        """
+        Writes the album's row bundle item (see bundle()) to the DBs,
+        including all the songs bundled with the album
+        """
+        if item is None:
+            return
+        if not self.sync_this_item(section_id or item['section_id']):
             LOG.debug('Skipping sync of %s %s: %s - section %s not synched to '
-                      'Kodi', api.plex_type, api.plex_id, api.title(),
-                      section_id or api.library_section_id())
+                      'Kodi', item['plex_type'], item['plex_id'],
+                      item['title'], section_id or item['section_id'])
             return
-        plex_id = api.plex_id
+        plex_id = item['plex_id']
         album = self.plexdb.album(plex_id)
         if album:
             update_item = True
@@ -238,7 +345,7 @@ class Album(MusicMixin, ItemBase):
             update_item = False
 
         # Parent artist - should always be present
-        parent_id = api.parent_id()
+        parent_id = item['parent_id']
         artist = self.plexdb.artist(parent_id)
         if not artist:
             LOG.info('Artist %s does not yet exist in DB', parent_id)
@@ -246,8 +353,8 @@ class Album(MusicMixin, ItemBase):
             try:
                 artist_xml[0].attrib
             except (TypeError, IndexError, AttributeError):
-                LOG.error('Could not get artist %s xml for %s',
-                          parent_id, xml.attrib)
+                LOG.error('Could not get artist %s xml for album %s',
+                          parent_id, plex_id)
                 return
             Artist(self.last_sync,
                    plexdb=self.plexdb,
@@ -256,31 +363,15 @@ class Album(MusicMixin, ItemBase):
                                                   section_id)
             artist = self.plexdb.artist(parent_id)
             if not artist:
-                LOG.error('Adding artist %s failed for %s',
-                          parent_id, xml.attrib)
+                LOG.error('Adding artist %s failed for album %s',
+                          parent_id, plex_id)
                 return
         artist_id = artist['kodi_id']
-        # See if we have a compilation - Plex does NOT feature a compilation
-        # flag for albums
-        compilation = 0
-        if children is None:
-            LOG.info('No children songs passed, getting them')
-            children = PF.GetAllPlexChildren(plex_id)
-            try:
-                children[0].attrib
-            except (TypeError, IndexError, AttributeError):
-                LOG.error('Could not get children for Plex id %s', plex_id)
-                return
-        for song in children:
-            if song.get('originalTitle') is not None:
-                compilation = 1
-                break
-        name = api.title()
+        name = item['title']
         # Not yet implemented by Plex, let's use unique last.fm or gracenote
         musicBrainzId = None
-        genre = api.list_to_string(api.genres())
         if app.SYNC.artwork:
-            artworks = api.artwork()
+            artworks = item['artwork']
             if 'poster' in artworks:
                 thumb = "<thumb>%s</thumb>" % artworks['poster']
             else:
@@ -294,28 +385,28 @@ class Album(MusicMixin, ItemBase):
             if v.KODIVERSION >= 18:
                 self.kodidb.update_album(name,
                                          musicBrainzId,
-                                         api.artist_name(),
-                                         genre,
-                                         api.year(),
-                                         compilation,
-                                         api.plot(),
+                                         item['artist_name'],
+                                         item['genre'],
+                                         item['year'],
+                                         item['compilation'],
+                                         item['plot'],
                                          thumb,
-                                         api.list_to_string(api.studios()),
-                                         api.userrating(),
+                                         item['studios'],
+                                         item['userrating'],
                                          timing.unix_date_to_kodi(self.last_sync),
                                          'album',
                                          kodi_id)
             else:
                 self.kodidb.update_album_17(name,
                                             musicBrainzId,
-                                            api.artist_name(),
-                                            genre,
-                                            api.year(),
-                                            compilation,
-                                            api.plot(),
+                                            item['artist_name'],
+                                            item['genre'],
+                                            item['year'],
+                                            item['compilation'],
+                                            item['plot'],
                                             thumb,
-                                            api.list_to_string(api.studios()),
-                                            api.userrating(),
+                                            item['studios'],
+                                            item['userrating'],
                                             timing.unix_date_to_kodi(self.last_sync),
                                             'album',
                                             kodi_id)
@@ -327,55 +418,51 @@ class Album(MusicMixin, ItemBase):
                 self.kodidb.add_album(kodi_id,
                                       name,
                                       musicBrainzId,
-                                      api.artist_name(),
-                                      genre,
-                                      api.year(),
-                                      compilation,
-                                      api.plot(),
+                                      item['artist_name'],
+                                      item['genre'],
+                                      item['year'],
+                                      item['compilation'],
+                                      item['plot'],
                                       thumb,
-                                      api.list_to_string(api.studios()),
-                                      api.userrating(),
+                                      item['studios'],
+                                      item['userrating'],
                                       timing.unix_date_to_kodi(self.last_sync),
                                       'album')
             else:
                 self.kodidb.add_album_17(kodi_id,
                                          name,
                                          musicBrainzId,
-                                         api.artist_name(),
-                                         genre,
-                                         api.year(),
-                                         compilation,
-                                         api.plot(),
+                                         item['artist_name'],
+                                         item['genre'],
+                                         item['year'],
+                                         item['compilation'],
+                                         item['plot'],
                                          thumb,
-                                         api.list_to_string(api.studios()),
-                                         api.userrating(),
+                                         item['studios'],
+                                         item['userrating'],
                                          timing.unix_date_to_kodi(self.last_sync),
                                          'album')
-        self.kodidb.add_albumartist(artist_id, kodi_id, api.artist_name())
+        self.kodidb.add_albumartist(artist_id, kodi_id, item['artist_name'])
         if app.SYNC.artwork:
             self.kodidb.modify_artwork(artworks,
                                        kodi_id,
                                        v.KODI_TYPE_ALBUM)
         self.plexdb.add_album(plex_id,
-                              api.checksum(),
+                              item['checksum'],
                               section_id,
                               artist_id,
                               parent_id,
                               kodi_id,
                               self.last_sync)
         # Add all children - all tracks
-        if scan_children:
+        if item['songs']:
             context = Song(self.last_sync,
                            plexdb=self.plexdb,
                            kodidb=self.kodidb)
-            for song in children:
-                context.add_update(song,
-                                   section_name=section_name,
-                                   section_id=section_id,
-                                   album_xml=xml,
-                                   genres=api.genres(),
-                                   genre=genre,
-                                   compilation=compilation)
+            for song in item['songs']:
+                context.add_update_bundle(song,
+                                          section_name=section_name,
+                                          section_id=section_id)
 
 
 class Song(MusicMixin, ItemBase):
@@ -385,13 +472,90 @@ class Song(MusicMixin, ItemBase):
         """
         Process single song/track
         """
+        if not self.sync_this_xml(xml, section_id):
+            return
+        self.add_update_bundle(self.bundle(xml,
+                                           section_id,
+                                           children,
+                                           album_xml=album_xml,
+                                           genres=genres,
+                                           genre=genre,
+                                           compilation=compilation),
+                               section_name=section_name,
+                               section_id=section_id)
+
+    @staticmethod
+    def bundle(xml, section_id=None, children=None, album_xml=None,
+               genres=None, genre=None, compilation=None):
+        """
+        Turns the PMS metadata xml into a row bundle: a dict of plain values
+        that add_update_bundle() writes to the DBs without touching the xml
+        again. Does not access any DB, so call it from any thread
+        """
         api = API(xml)
-        if not self.sync_this_item(section_id or api.library_section_id()):
+        original_title = xml.get('originalTitle')
+        # Getting artists name is complicated
+        if compilation is not None:
+            if compilation == 0:
+                artists = api.grandparent_title()
+            else:
+                artists = original_title
+        else:
+            # compilation not set
+            artists = xml.get('originalTitle', api.grandparent_title())
+        tracknumber = api.index() or 0
+        disc = api.disc_number() or 1
+        if disc == 1:
+            track = tracknumber
+        else:
+            track = disc * 2 ** 16 + tracknumber
+        year = api.year()
+        if not year and album_xml is not None:
+            # Plex did not pass year info - get it from the parent album
+            album_api = API(album_xml)
+            year = album_api.year()
+        moods = []
+        for entry in xml:
+            if entry.tag == 'Mood':
+                moods.append(entry.attrib['tag'])
+        _, path, filename = api.fullpath()
+        return {
+            'plex_id': api.plex_id,
+            'plex_type': api.plex_type,
+            'section_id': api.library_section_id(),
+            'checksum': api.checksum(),
+            'title': api.title(),
+            'artist_id': api.grandparent_id(),
+            'album_id': api.parent_id(),
+            'original_title': original_title,
+            'artists': artists,
+            'artist_name': api.grandparent_title(),
+            'genres': genres,
+            'genre': genre,
+            'track': track,
+            'year': year,
+            'mood': api.list_to_string(moods),
+            'path': path,
+            'filename': filename,
+            'runtime': api.runtime(),
+            'viewcount': api.viewcount(),
+            'lastplayed': api.lastplayed(),
+            'userrating': api.userrating(),
+            'date_created': api.date_created(),
+            'artwork': api.artwork() if app.SYNC.artwork else None,
+            'has_parent_key': xml.get('parentKey') is not None
+        }
+
+    def add_update_bundle(self, item, section_name=None, section_id=None):
+        """
+        Writes the song's row bundle item (see bundle()) to the DBs
+        """
+        if not self.sync_this_item(section_id or item['section_id']):
             LOG.debug('Skipping sync of %s %s: %s - section %s not synched to '
-                      'Kodi', api.plex_type, api.plex_id, api.title(),
-                      section_id or api.library_section_id())
+                      'Kodi', item['plex_type'], item['plex_id'],
+                      item['title'], section_id or item['section_id'])
             return
-        plex_id = api.plex_id
+        plex_id = item['plex_id']
         song = self.plexdb.song(plex_id)
         if song:
             update_item = True
@@ -400,8 +564,8 @@ class Song(MusicMixin, ItemBase):
         else:
             update_item = False
             kodi_id = self.kodidb.add_song_id()
-        artist_id = api.grandparent_id()
-        album_id = api.parent_id()
+        artist_id = item['artist_id']
+        album_id = item['album_id']
 
         # The grandparent Artist - should always be present for every song!
         artist = self.plexdb.artist(artist_id)
@@ -412,8 +576,8 @@ class Song(MusicMixin, ItemBase):
             try:
                 artist_xml[0].attrib
             except (TypeError, IndexError, AttributeError):
-                LOG.error('Grandparent tvartist %s xml download failed for %s',
-                          artist_id, xml.attrib)
+                LOG.error('Grandparent tvartist %s xml download failed for '
+                          'song %s', artist_id, plex_id)
                 return
             Artist(self.last_sync,
                    plexdb=self.plexdb,
@@ -422,8 +586,8 @@ class Song(MusicMixin, ItemBase):
                                                   section_id)
             artist = self.plexdb.artist(artist_id)
             if not artist:
-                LOG.error('Still could not find grandparent artist %s for %s',
-                          artist_id, xml.attrib)
+                LOG.error('Still could not find grandparent artist %s for '
+                          'song %s', artist_id, plex_id)
                 return
         grandparent_id = artist['kodi_id']
 
@@ -433,12 +597,12 @@ class Song(MusicMixin, ItemBase):
             LOG.info('Creating singles album')
             parent_id = self.kodidb.new_album_id()
             if v.KODIVERSION >= 18:
-                self.kodidb.add_album(kodi_id,
+                self.kodidb.add_album(parent_id,
                                       None,
                                       None,
                                       None,
-                                      genre,
-                                      api.year(),
+                                      item['genre'],
+                                      item['year'],
                                       None,
                                       None,
                                       None,
@@ -447,12 +611,12 @@ class Song(MusicMixin, ItemBase):
                                       timing.unix_date_to_kodi(self.last_sync),
                                       'single')
             else:
-                self.kodidb.add_album_17(kodi_id,
+                self.kodidb.add_album_17(parent_id,
                                          None,
                                          None,
                                          None,
-                                         genre,
-                                         api.year(),
+                                         item['genre'],
+                                         item['year'],
                                          None,
                                          None,
                                          None,
@@ -468,53 +632,31 @@ class Song(MusicMixin, ItemBase):
                 try:
                     album_xml[0].attrib
                 except (TypeError, IndexError, AttributeError):
-                    LOG.error('Parent album %s xml download failed for %s',
-                              album_id, xml.attrib)
+                    LOG.error('Parent album %s xml download failed for song '
+                              '%s', album_id, plex_id)
                     return
+                compilation = 1 if item['original_title'] is not None else 0
                 Album(self.last_sync,
                       plexdb=self.plexdb,
-                      kodidb=self.kodidb).add_update(album_xml[0],
-                                                     section_name,
-                                                     section_id,
-                                                     children=[xml],
-                                                     scan_children=False)
+                      kodidb=self.kodidb).add_update_bundle(
+                          Album.bundle(album_xml[0],
+                                       section_id,
+                                       scan_children=False,
+                                       compilation=compilation),
+                          section_name=section_name,
+                          section_id=section_id)
                 album = self.plexdb.album(album_id)
                 if not album:
-                    LOG.error('Still could not find parent album %s for %s',
-                              album_id, xml.attrib)
+                    LOG.error('Still could not find parent album %s for song '
+                              '%s', album_id, plex_id)
                     return
             parent_id = album['kodi_id']
 
-        title = api.title()
+        title = item['title']
         # Not yet implemented by Plex
         musicBrainzId = None
         comment = None
-        # Getting artists name is complicated
-        if compilation is not None:
-            if compilation == 0:
-                artists = api.grandparent_title()
-            else:
-                artists = xml.get('originalTitle')
-        else:
-            # compilation not set
-            artists = xml.get('originalTitle', api.grandparent_title())
-        tracknumber = api.index() or 0
-        disc = api.disc_number() or 1
-        if disc == 1:
-            track = tracknumber
-        else:
-            track = disc * 2 ** 16 + tracknumber
-        year = api.year()
-        if not year and album_xml is not None:
-            # Plex did not pass year info - get it from the parent album
-            album_api = API(album_xml)
-            year = album_api.year()
-        moods = []
-        for entry in xml:
-            if entry.tag == 'Mood':
-                moods.append(entry.attrib['tag'])
-        mood = api.list_to_string(moods)
-        _, path, filename = api.fullpath()
+        path, filename = item['path'], item['filename']
         # UPDATE THE SONG #####
         if update_item:
             LOG.info("UPDATE song plex_id: %s - %s", plex_id, title)
@@ -524,35 +666,35 @@ class Song(MusicMixin, ItemBase):
             if v.KODIVERSION >= 18:
                 # Kodi Leia
                 self.kodidb.update_song(parent_id,
-                                        artists,
-                                        genre,
+                                        item['artists'],
+                                        item['genre'],
                                         title,
-                                        track,
-                                        api.runtime(),
-                                        year,
+                                        item['track'],
+                                        item['runtime'],
+                                        item['year'],
                                         filename,
-                                        api.viewcount(),
-                                        api.lastplayed(),
-                                        api.userrating(),
+                                        item['viewcount'],
+                                        item['lastplayed'],
+                                        item['userrating'],
                                         comment,
-                                        mood,
-                                        api.date_created(),
+                                        item['mood'],
+                                        item['date_created'],
                                         kodi_id)
             else:
                 self.kodidb.update_song_17(parent_id,
-                                           artists,
-                                           genre,
+                                           item['artists'],
+                                           item['genre'],
                                            title,
-                                           track,
-                                           api.runtime(),
-                                           year,
+                                           item['track'],
+                                           item['runtime'],
+                                           item['year'],
                                            filename,
-                                           api.viewcount(),
-                                           api.lastplayed(),
-                                           api.userrating(),
+                                           item['viewcount'],
+                                           item['lastplayed'],
+                                           item['userrating'],
                                            comment,
-                                           mood,
-                                           api.date_created(),
+                                           item['mood'],
+                                           item['date_created'],
                                            kodi_id)
         # OR ADD THE SONG #####
         else:
@@ -565,66 +707,67 @@ class Song(MusicMixin, ItemBase):
                 self.kodidb.add_song(kodi_id,
                                      parent_id,
                                      kodi_pathid,
-                                     artists,
-                                     genre,
+                                     item['artists'],
+                                     item['genre'],
                                      title,
-                                     track,
-                                     api.runtime(),
-                                     year,
+                                     item['track'],
+                                     item['runtime'],
+                                     item['year'],
                                      filename,
                                      musicBrainzId,
-                                     api.viewcount(),
-                                     api.lastplayed(),
-                                     api.userrating(),
+                                     item['viewcount'],
+                                     item['lastplayed'],
+                                     item['userrating'],
                                      0,
                                      0,
-                                     mood,
-                                     api.date_created())
+                                     item['mood'],
+                                     item['date_created'])
             else:
                 self.kodidb.add_song_17(kodi_id,
                                         parent_id,
                                         kodi_pathid,
-                                        artists,
-                                        genre,
+                                        item['artists'],
+                                        item['genre'],
                                         title,
-                                        track,
-                                        api.runtime(),
-                                        year,
+                                        item['track'],
+                                        item['runtime'],
+                                        item['year'],
                                         filename,
                                         musicBrainzId,
-                                        api.viewcount(),
-                                        api.lastplayed(),
-                                        api.userrating(),
+                                        item['viewcount'],
+                                        item['lastplayed'],
+                                        item['userrating'],
                                         0,
                                         0,
-                                        mood,
-                                        api.date_created())
+                                        item['mood'],
+                                        item['date_created'])
         if v.KODIVERSION < 18:
             # Link song to album
             self.kodidb.add_albuminfosong(kodi_id,
                                           parent_id,
-                                          track,
+                                          item['track'],
                                           title,
-                                          api.runtime())
+                                          item['runtime'])
         # Link song to artists
-        artist_name = api.grandparent_title()
-        # Do the actual linking
-        self.kodidb.add_song_artist(grandparent_id, kodi_id, artist_name)
+        self.kodidb.add_song_artist(grandparent_id,
+                                    kodi_id,
+                                    item['artist_name'])
         # Add genres
-        if genres:
-            self.kodidb.add_music_genres(kodi_id, genres, v.KODI_TYPE_SONG)
+        if item['genres']:
+            self.kodidb.add_music_genres(kodi_id,
+                                         item['genres'],
+                                         v.KODI_TYPE_SONG)
         if app.SYNC.artwork:
-            artworks = api.artwork()
-            self.kodidb.modify_artwork(artworks,
+            self.kodidb.modify_artwork(item['artwork'],
                                        kodi_id,
                                        v.KODI_TYPE_SONG)
-            if xml.get('parentKey') is None:
+            if not item['has_parent_key']:
                 # Update album artwork
-                self.kodidb.modify_artwork(artworks,
+                self.kodidb.modify_artwork(item['artwork'],
                                            parent_id,
                                            v.KODI_TYPE_ALBUM)
         self.plexdb.add_song(plex_id,
-                             api.checksum(),
+                             item['checksum'],
                              section_id,
                              artist_id,
                              grandparent_id,
@@ -147,13 +147,71 @@ class Show(TvShowMixin, ItemBase):
         """
         Process a single show
         """
+        if not self.sync_this_xml(xml, section_id):
+            return
+        self.add_update_bundle(self.bundle(xml, section_id, children),
+                               section_name=section_name,
+                               section_id=section_id)
+
+    @staticmethod
+    def bundle(xml, section_id=None, children=None):
+        """
+        Turns the PMS metadata xml into a row bundle: a dict of plain values
+        that add_update_bundle() writes to the DBs without touching the xml
+        again. Does not access any DB, so call it from any thread. Returns
+        None if we cannot sync this show
+        """
         api = API(xml)
-        if not self.sync_this_item(section_id or api.library_section_id()):
+        plex_id = api.plex_id
+        # GET THE FILE AND PATH #####
+        if app.SYNC.direct_paths:
+            # Direct paths is set the Kodi way
+            playurl = api.validate_playurl(api.tv_show_path(),
+                                           api.plex_type,
+                                           folder=True)
+            if playurl is None:
+                return
+            path, toplevelpath = process_path(playurl)
+        else:
+            # Set plugin path
+            toplevelpath = "plugin://%s.tvshows/" % v.ADDON_ID
+            path = "%s%s/" % (toplevelpath, plex_id)
+        return {
+            'plex_id': plex_id,
+            'plex_type': api.plex_type,
+            'kodi_type': api.kodi_type,
+            'section_id': api.library_section_id(),
+            'checksum': api.checksum(),
+            'title': api.title(),
+            'path': path,
+            'toplevelpath': toplevelpath,
+            'date_created': api.date_created(),
+            'rating': api.rating(),
+            'votecount': api.votecount(),
+            'guids': api.guids.copy(),
+            'people': api.people(),
+            'artwork': api.artwork() if app.SYNC.artwork else None,
+            'plot': api.plot(),
+            'premiere_date': api.premiere_date(),
+            'genres': api.genres(),
+            'content_rating': api.content_rating(),
+            'studios': api.studios(),
+            'sorttitle': api.sorttitle(),
+            'collections': api.collections()
+        }
+
+    def add_update_bundle(self, item, section_name=None, section_id=None):
+        """
+        Writes the show's row bundle item (see bundle()) to the DBs
+        """
+        if item is None:
+            return
+        if not self.sync_this_item(section_id or item['section_id']):
             LOG.debug('Skipping sync of %s %s: %s - section %s not synched to '
-                      'Kodi', api.plex_type, api.plex_id, api.title(),
-                      section_id or api.library_section_id())
+                      'Kodi', item['plex_type'], item['plex_id'],
+                      item['title'], section_id or item['section_id'])
             return
-        plex_id = api.plex_id
+        plex_id = item['plex_id']
         show = self.plexdb.show(plex_id)
         if not show:
             update_item = False
@@ -163,98 +221,79 @@ class Show(TvShowMixin, ItemBase):
             kodi_id = show['kodi_id']
             kodi_pathid = show['kodi_pathid']
 
-        # GET THE FILE AND PATH #####
         if app.SYNC.direct_paths:
-            # Direct paths is set the Kodi way
-            playurl = api.validate_playurl(api.tv_show_path(),
-                                           api.plex_type,
-                                           folder=True)
-            if playurl is None:
-                return
-            path, toplevelpath = process_path(playurl)
-            toppathid = self.kodidb.add_path(toplevelpath,
+            toppathid = self.kodidb.add_path(item['toplevelpath'],
                                              content='tvshows',
                                              scraper='metadata.local')
         else:
-            # Set plugin path
-            toplevelpath = "plugin://%s.tvshows/" % v.ADDON_ID
-            path = "%s%s/" % (toplevelpath, plex_id)
             # Do NOT set a parent id because addon-path cannot be "stacked"
             toppathid = None
 
-        kodi_pathid = self.kodidb.add_path(path,
-                                           date_added=api.date_created(),
+        kodi_pathid = self.kodidb.add_path(item['path'],
+                                           date_added=item['date_created'],
                                            id_parent_path=toppathid)
         # UPDATE THE TVSHOW #####
         if update_item:
-            LOG.info("UPDATE tvshow plex_id: %s - %s", plex_id, api.title())
+            LOG.info("UPDATE tvshow plex_id: %s - %s", plex_id, item['title'])
             # update new ratings Kodi 17
-            rating_id = self.kodidb.update_ratings(kodi_id,
-                                                   v.KODI_TYPE_SHOW,
-                                                   "default",
-                                                   api.rating(),
-                                                   api.votecount())
+            rating_id = self.update_ratings(item, kodi_id)
             unique_id = self._prioritize_provider_id(
-                self.update_provider_ids(api, kodi_id))
+                self.update_provider_ids(item, kodi_id))
             self.kodidb.modify_people(kodi_id,
                                       v.KODI_TYPE_SHOW,
-                                      api.people())
+                                      item['people'])
             if app.SYNC.artwork:
-                self.kodidb.modify_artwork(api.artwork(),
+                self.kodidb.modify_artwork(item['artwork'],
                                            kodi_id,
                                            v.KODI_TYPE_SHOW)
             # Update the tvshow entry
-            self.kodidb.update_show(api.title(),
-                                    api.plot(),
+            self.kodidb.update_show(item['title'],
+                                    item['plot'],
                                     rating_id,
-                                    api.premiere_date(),
-                                    api.list_to_string(api.genres()),
-                                    api.title(),
+                                    item['premiere_date'],
+                                    API.list_to_string(item['genres']),
+                                    item['title'],
                                     unique_id,
-                                    api.content_rating(),
-                                    api.list_to_string(api.studios()),
-                                    api.sorttitle(),
+                                    item['content_rating'],
+                                    API.list_to_string(item['studios']),
+                                    item['sorttitle'],
                                     kodi_id)
         # OR ADD THE TVSHOW #####
         else:
-            LOG.info("ADD tvshow plex_id: %s - %s", plex_id, api.title())
+            LOG.info("ADD tvshow plex_id: %s - %s", plex_id, item['title'])
             # Link the path
             self.kodidb.add_showlinkpath(kodi_id, kodi_pathid)
-            rating_id = self.kodidb.add_ratings(kodi_id,
-                                                v.KODI_TYPE_SHOW,
-                                                "default",
-                                                api.rating(),
-                                                api.votecount())
+            rating_id = self.add_ratings(item, kodi_id)
             unique_id = self._prioritize_provider_id(
-                self.add_provider_ids(api, kodi_id))
+                self.add_provider_ids(item, kodi_id))
             self.kodidb.add_people(kodi_id,
                                    v.KODI_TYPE_SHOW,
-                                   api.people())
+                                   item['people'])
             if app.SYNC.artwork:
-                self.kodidb.add_artwork(api.artwork(),
+                self.kodidb.add_artwork(item['artwork'],
                                         kodi_id,
                                         v.KODI_TYPE_SHOW)
             # Create the tvshow entry
             self.kodidb.add_show(kodi_id,
-                                 api.title(),
-                                 api.plot(),
+                                 item['title'],
+                                 item['plot'],
                                  rating_id,
-                                 api.premiere_date(),
-                                 api.list_to_string(api.genres()),
-                                 api.title(),
+                                 item['premiere_date'],
+                                 API.list_to_string(item['genres']),
+                                 item['title'],
                                  unique_id,
-                                 api.content_rating(),
-                                 api.list_to_string(api.studios()),
-                                 api.sorttitle())
-        self.kodidb.modify_genres(kodi_id, v.KODI_TYPE_SHOW, api.genres())
+                                 item['content_rating'],
+                                 API.list_to_string(item['studios']),
+                                 item['sorttitle'])
+        self.kodidb.modify_genres(kodi_id, v.KODI_TYPE_SHOW, item['genres'])
         # Process studios
-        self.kodidb.modify_studios(kodi_id, v.KODI_TYPE_SHOW, api.studios())
+        self.kodidb.modify_studios(kodi_id, v.KODI_TYPE_SHOW, item['studios'])
         # Process tags: view, PMS collection tags
         tags = [section_name]
-        tags.extend([i for _, i in api.collections()])
+        tags.extend([i for _, i in item['collections']])
         self.kodidb.modify_tags(kodi_id, v.KODI_TYPE_SHOW, tags)
         self.plexdb.add_show(plex_id=plex_id,
-                             checksum=api.checksum(),
+                             checksum=item['checksum'],
                              section_id=section_id,
                              kodi_id=kodi_id,
                              kodi_pathid=kodi_pathid,
@@ -277,19 +316,48 @@ class Season(TvShowMixin, ItemBase):
         """
         Process a single season of a certain tv show
         """
+        if not self.sync_this_xml(xml, section_id):
+            return
+        return self.add_update_bundle(self.bundle(xml, section_id, children),
+                                      section_name=section_name,
+                                      section_id=section_id)
+
+    @staticmethod
+    def bundle(xml, section_id=None, children=None):
+        """
+        Turns the PMS metadata xml into a row bundle: a dict of plain values
+        that add_update_bundle() writes to the DBs without touching the xml
+        again. Does not access any DB, so call it from any thread
+        """
         api = API(xml)
-        if not self.sync_this_item(section_id or api.library_section_id()):
+        return {
+            'plex_id': api.plex_id,
+            'plex_type': api.plex_type,
+            'section_id': api.library_section_id(),
+            'checksum': api.checksum(),
+            'season_name': api.season_name(),
+            'show_id': api.parent_id(),
+            'artwork': api.artwork() if app.SYNC.artwork else None,
+            'index': api.index(),
+            'userrating': api.userrating() or None
+        }
+
+    def add_update_bundle(self, item, section_name=None, section_id=None):
+        """
+        Writes the season's row bundle item (see bundle()) to the DBs
+        """
+        if not self.sync_this_item(section_id or item['section_id']):
             LOG.debug('Skipping sync of %s %s: %s - section %s not synched to '
-                      'Kodi', api.plex_type, api.plex_id, api.season_name(),
-                      section_id or api.library_section_id())
+                      'Kodi', item['plex_type'], item['plex_id'],
+                      item['season_name'], section_id or item['section_id'])
             return
-        plex_id = api.plex_id
+        plex_id = item['plex_id']
         season = self.plexdb.season(plex_id)
         if not season:
             update_item = False
         else:
             update_item = True
-        show_id = api.parent_id()
+        show_id = item['show_id']
         show = self.plexdb.show(show_id)
         if not show:
             LOG.warn('Parent TV show %s not found in DB, adding it', show_id)
@@ -310,38 +378,38 @@ class Season(TvShowMixin, ItemBase):
                 return
         parent_id = show['kodi_id']
         if app.SYNC.artwork:
-            parent_artwork = api.artwork(kodi_id=parent_id,
-                                         kodi_type=v.KODI_TYPE_SHOW)
-            artwork = api.artwork()
+            parent_artwork = self.kodidb.get_art(parent_id, v.KODI_TYPE_SHOW)
+            artwork = dict(item['artwork'])
             # Remove all artwork that is identical for the season's show
             for key in parent_artwork:
                 if key in artwork and artwork[key] == parent_artwork[key]:
                     del artwork[key]
         if update_item:
             LOG.info('UPDATE season plex_id %s - %s',
-                     plex_id, api.season_name())
+                     plex_id, item['season_name'])
             kodi_id = season['kodi_id']
             self.kodidb.update_season(kodi_id,
                                       parent_id,
-                                      api.index(),
-                                      api.season_name(),
-                                      api.userrating() or None)
+                                      item['index'],
+                                      item['season_name'],
+                                      item['userrating'])
             if app.SYNC.artwork:
                 self.kodidb.modify_artwork(artwork,
                                            kodi_id,
                                            v.KODI_TYPE_SEASON)
         else:
-            LOG.info('ADD season plex_id %s - %s', plex_id, api.season_name())
+            LOG.info('ADD season plex_id %s - %s',
+                     plex_id, item['season_name'])
             kodi_id = self.kodidb.add_season(parent_id,
-                                             api.index(),
-                                             api.season_name(),
-                                             api.userrating() or None)
+                                             item['index'],
+                                             item['season_name'],
+                                             item['userrating'])
             if app.SYNC.artwork:
                 self.kodidb.add_artwork(artwork,
                                         kodi_id,
                                         v.KODI_TYPE_SEASON)
         self.plexdb.add_season(plex_id=plex_id,
-                               checksum=api.checksum(),
+                               checksum=item['checksum'],
                                section_id=section_id,
                                show_id=show_id,
                                parent_id=parent_id,
@@ -355,13 +423,63 @@ class Episode(TvShowMixin, ItemBase):
         """
         Process single episode
         """
+        if not self.sync_this_xml(xml, section_id):
+            return
+        return self.add_update_bundle(self.bundle(xml, section_id, children),
+                                      section_name=section_name,
+                                      section_id=section_id)
+
+    @staticmethod
+    def bundle(xml, section_id=None, children=None):
+        """
+        Turns the PMS metadata xml into a row bundle: a dict of plain values
+        that add_update_bundle() writes to the DBs without touching the xml
+        again. Does not access any DB, so call it from any thread
+        """
         api = API(xml)
-        if not self.sync_this_item(section_id or api.library_section_id()):
+        fullpath, path, filename = api.fullpath()
+        return {
+            'plex_id': api.plex_id,
+            'plex_type': api.plex_type,
+            'kodi_type': api.kodi_type,
+            'section_id': api.library_section_id(),
+            'checksum': api.checksum(),
+            'title': api.title(),
+            'show_id': api.show_id(),
+            'season_id': api.season_id(),
+            'fullpath': fullpath,
+            'path': path,
+            'filename': filename,
+            'date_created': api.date_created(),
+            'rating': api.rating(),
+            'votecount': api.votecount(),
+            'guids': api.guids.copy(),
+            'people': api.people(),
+            'artwork': api.artwork() if app.SYNC.artwork else None,
+            'plot': api.plot(),
+            'writers': api.list_to_string(api.writers()),
+            'premiere_date': api.premiere_date(),
+            'runtime': api.runtime(),
+            'directors': api.list_to_string(api.directors()),
+            'season_number': api.season_number(),
+            'index': api.index(),
+            'userrating': api.userrating(),
+            'streams': api.mediastreams(),
+            'resume_point': api.resume_point(),
+            'viewcount': api.viewcount(),
+            'lastplayed': api.lastplayed()
+        }
+
+    def add_update_bundle(self, item, section_name=None, section_id=None):
+        """
+        Writes the episode's row bundle item (see bundle()) to the DBs
+        """
+        if not self.sync_this_item(section_id or item['section_id']):
             LOG.debug('Skipping sync of %s %s: %s - section %s not synched to '
-                      'Kodi', api.plex_type, api.plex_id, api.title(),
-                      section_id or api.library_section_id())
+                      'Kodi', item['plex_type'], item['plex_id'],
+                      item['title'], section_id or item['section_id'])
             return
-        plex_id = api.plex_id
+        plex_id = item['plex_id']
         episode = self.plexdb.episode(plex_id)
         if not episode:
             update_item = False
@@ -377,48 +495,51 @@ class Episode(TvShowMixin, ItemBase):
         airs_before_episode = "-1"
 
         # The grandparent TV show
-        show = self.plexdb.show(api.show_id())
+        show_id = item['show_id']
+        show = self.plexdb.show(show_id)
         if not show:
-            LOG.warn('Grandparent TV show %s not found in DB, adding it', api.show_id())
-            show_xml = PF.GetPlexMetadata(api.show_id())
+            LOG.warn('Grandparent TV show %s not found in DB, adding it', show_id)
+            show_xml = PF.GetPlexMetadata(show_id)
             try:
                 show_xml[0].attrib
             except (TypeError, IndexError, AttributeError):
-                LOG.error("Grandparent tvshow %s xml download failed", api.show_id())
+                LOG.error("Grandparent tvshow %s xml download failed", show_id)
                 return False
             Show(self.last_sync,
                  plexdb=self.plexdb,
                  kodidb=self.kodidb).add_update(show_xml[0],
                                                 section_name,
                                                 section_id)
-            show = self.plexdb.show(api.show_id())
+            show = self.plexdb.show(show_id)
             if not show:
-                LOG.error('Still could not find grandparent tv show %s', api.show_id())
+                LOG.error('Still could not find grandparent tv show %s', show_id)
                 return
         grandparent_id = show['kodi_id']
 
         # The parent Season
-        season = self.plexdb.season(api.season_id())
-        if not season and api.season_id():
-            LOG.warn('Parent season %s not found in DB, adding it', api.season_id())
-            season_xml = PF.GetPlexMetadata(api.season_id())
+        season_id = item['season_id']
+        season = self.plexdb.season(season_id)
+        if not season and season_id:
+            LOG.warn('Parent season %s not found in DB, adding it', season_id)
+            season_xml = PF.GetPlexMetadata(season_id)
             try:
                 season_xml[0].attrib
             except (TypeError, IndexError, AttributeError):
-                LOG.error("Parent season %s xml download failed", api.season_id())
+                LOG.error("Parent season %s xml download failed", season_id)
                 return False
             Season(self.last_sync,
                    plexdb=self.plexdb,
                    kodidb=self.kodidb).add_update(season_xml[0],
                                                   section_name,
                                                   section_id)
-            season = self.plexdb.season(api.season_id())
+            season = self.plexdb.season(season_id)
             if not season:
-                LOG.error('Still could not find parent season %s', api.season_id())
+                LOG.error('Still could not find parent season %s', season_id)
                 return
         parent_id = season['kodi_id'] if season else None
 
-        fullpath, path, filename = api.fullpath()
+        fullpath, path, filename = \
+            item['fullpath'], item['path'], item['filename']
         if app.SYNC.direct_paths and not fullpath.startswith('http'):
             parent_path_id = self.kodidb.parent_path_id(path)
             kodi_pathid = self.kodidb.add_path(path,
@@ -437,14 +558,14 @@ class Episode(TvShowMixin, ItemBase):
 
         # UPDATE THE EPISODE #####
         if update_item:
-            LOG.info("UPDATE episode plex_id: %s - %s", plex_id, api.title())
+            LOG.info("UPDATE episode plex_id: %s - %s", plex_id, item['title'])
             kodi_fileid = self.kodidb.modify_file(filename,
                                                   kodi_pathid,
-                                                  api.date_created())
+                                                  item['date_created'])
             if not app.SYNC.direct_paths:
                 kodi_fileid_2 = self.kodidb.modify_file(filename,
                                                         kodi_pathid_2,
-                                                        api.date_created())
+                                                        item['date_created'])
             else:
                 kodi_fileid_2 = None
 
@@ -452,30 +573,26 @@ class Episode(TvShowMixin, ItemBase):
                 self.kodidb.remove_file(old_kodi_fileid)
                 if not app.SYNC.direct_paths:
                     self.kodidb.remove_file(old_kodi_fileid_2)
-            ratingid = self.kodidb.update_ratings(kodi_id,
-                                                  v.KODI_TYPE_EPISODE,
-                                                  "default",
-                                                  api.rating(),
-                                                  api.votecount())
+            ratingid = self.update_ratings(item, kodi_id)
             unique_id = self._prioritize_provider_id(
-                self.update_provider_ids(api, kodi_id))
+                self.update_provider_ids(item, kodi_id))
             self.kodidb.modify_people(kodi_id,
                                       v.KODI_TYPE_EPISODE,
-                                      api.people())
+                                      item['people'])
             if app.SYNC.artwork:
-                self.kodidb.modify_artwork(api.artwork(),
+                self.kodidb.modify_artwork(item['artwork'],
                                            kodi_id,
                                            v.KODI_TYPE_EPISODE)
-            self.kodidb.update_episode(api.title(),
-                                       api.plot(),
+            self.kodidb.update_episode(item['title'],
+                                       item['plot'],
                                        ratingid,
-                                       api.list_to_string(api.writers()),
-                                       api.premiere_date(),
-                                       api.runtime(),
-                                       api.list_to_string(api.directors()),
-                                       api.season_number(),
-                                       api.index(),
-                                       api.title(),
+                                       item['writers'],
+                                       item['premiere_date'],
+                                       item['runtime'],
+                                       item['directors'],
+                                       item['season_number'],
+                                       item['index'],
+                                       item['title'],
                                        airs_before_season,
                                        airs_before_episode,
                                        fullpath,
@@ -483,70 +600,43 @@ class Episode(TvShowMixin, ItemBase):
                                        unique_id,
                                        kodi_fileid,  # and NOT kodi_fileid_2
                                        parent_id,
-                                       api.userrating(),
+                                       item['userrating'],
                                        kodi_id)
-            self.kodidb.set_resume(kodi_fileid,
-                                   api.resume_point(),
-                                   api.runtime(),
-                                   api.viewcount(),
-                                   api.lastplayed())
-            if not app.SYNC.direct_paths:
-                self.kodidb.set_resume(kodi_fileid_2,
-                                       api.resume_point(),
-                                       api.runtime(),
-                                       api.viewcount(),
-                                       api.lastplayed())
-            self.plexdb.add_episode(plex_id=plex_id,
-                                    checksum=api.checksum(),
-                                    section_id=section_id,
-                                    show_id=api.show_id(),
-                                    grandparent_id=grandparent_id,
-                                    season_id=api.season_id(),
-                                    parent_id=parent_id,
-                                    kodi_id=kodi_id,
-                                    kodi_fileid=kodi_fileid,
-                                    kodi_fileid_2=kodi_fileid_2,
-                                    kodi_pathid=kodi_pathid,
-                                    last_sync=self.last_sync)
         # OR ADD THE EPISODE #####
         else:
-            LOG.info("ADD episode plex_id: %s - %s", plex_id, api.title())
+            LOG.info("ADD episode plex_id: %s - %s", plex_id, item['title'])
             kodi_fileid = self.kodidb.add_file(filename,
                                                kodi_pathid,
-                                               api.date_created())
+                                               item['date_created'])
             if not app.SYNC.direct_paths:
                 kodi_fileid_2 = self.kodidb.add_file(filename,
                                                      kodi_pathid_2,
-                                                     api.date_created())
+                                                     item['date_created'])
             else:
                 kodi_fileid_2 = None
 
-            rating_id = self.kodidb.add_ratings(kodi_id,
-                                                v.KODI_TYPE_EPISODE,
-                                                "default",
-                                                api.rating(),
-                                                api.votecount())
+            rating_id = self.add_ratings(item, kodi_id)
             unique_id = self._prioritize_provider_id(
-                self.add_provider_ids(api, kodi_id))
+                self.add_provider_ids(item, kodi_id))
             self.kodidb.add_people(kodi_id,
                                    v.KODI_TYPE_EPISODE,
-                                   api.people())
+                                   item['people'])
             if app.SYNC.artwork:
-                self.kodidb.add_artwork(api.artwork(),
+                self.kodidb.add_artwork(item['artwork'],
                                         kodi_id,
                                         v.KODI_TYPE_EPISODE)
             self.kodidb.add_episode(kodi_id,
                                     kodi_fileid,  # and NOT kodi_fileid_2
-                                    api.title(),
-                                    api.plot(),
+                                    item['title'],
+                                    item['plot'],
                                     rating_id,
-                                    api.list_to_string(api.writers()),
-                                    api.premiere_date(),
-                                    api.runtime(),
-                                    api.list_to_string(api.directors()),
-                                    api.season_number(),
-                                    api.index(),
-                                    api.title(),
+                                    item['writers'],
+                                    item['premiere_date'],
+                                    item['runtime'],
+                                    item['directors'],
+                                    item['season_number'],
+                                    item['index'],
+                                    item['title'],
                                     grandparent_id,
                                     airs_before_season,
                                     airs_before_episode,
@@ -554,34 +644,32 @@ class Episode(TvShowMixin, ItemBase):
                                     kodi_pathid,
                                     unique_id,
                                     parent_id,
-                                    api.userrating())
-            self.kodidb.set_resume(kodi_fileid,
-                                   api.resume_point(),
-                                   api.runtime(),
-                                   api.viewcount(),
-                                   api.lastplayed())
-            if not app.SYNC.direct_paths:
-                self.kodidb.set_resume(kodi_fileid_2,
-                                       api.resume_point(),
-                                       api.runtime(),
-                                       api.viewcount(),
-                                       api.lastplayed())
-            self.plexdb.add_episode(plex_id=plex_id,
-                                    checksum=api.checksum(),
-                                    section_id=section_id,
-                                    show_id=api.show_id(),
-                                    grandparent_id=grandparent_id,
-                                    season_id=api.season_id(),
-                                    parent_id=parent_id,
-                                    kodi_id=kodi_id,
-                                    kodi_fileid=kodi_fileid,
-                                    kodi_fileid_2=kodi_fileid_2,
-                                    kodi_pathid=kodi_pathid,
-                                    last_sync=self.last_sync)
-
-        self.kodidb.modify_streams(kodi_fileid,  # and NOT kodi_fileid_2
-                                   api.mediastreams(),
-                                   api.runtime())
+                                    item['userrating'])
+        self.kodidb.set_resume(kodi_fileid,
+                               item['resume_point'],
+                               item['runtime'],
+                               item['viewcount'],
+                               item['lastplayed'])
+        if not app.SYNC.direct_paths:
+            self.kodidb.set_resume(kodi_fileid_2,
+                                   item['resume_point'],
+                                   item['runtime'],
+                                   item['viewcount'],
+                                   item['lastplayed'])
+        self.plexdb.add_episode(plex_id=plex_id,
+                                checksum=item['checksum'],
+                                section_id=section_id,
+                                show_id=show_id,
+                                grandparent_id=grandparent_id,
+                                season_id=season_id,
+                                parent_id=parent_id,
+                                kodi_id=kodi_id,
+                                kodi_fileid=kodi_fileid,
+                                kodi_fileid_2=kodi_fileid_2,
+                                kodi_pathid=kodi_pathid,
+                                last_sync=self.last_sync)
+        # and NOT kodi_fileid_2
+        self.modify_streams(item, kodi_fileid, update_item)
 
     @staticmethod
     def _prioritize_provider_id(unique_ids):
@@ -10,6 +10,14 @@ KODIDB_LOCK = Lock()
 UNTOUCHED_TABLES = ('version', 'versiontagscan')
 
 
+def nocase(name):
+    """
+    Returns the key for name that SQLite's COLLATE NOCASE would compare - it
+    only folds ASCII characters
+    """
+    return ''.join(c.lower() if c < '\x80' else c for c in name)
+
+
 class KodiDBBase(object):
     """
     Kodi database methods used for all types of items
@@ -25,10 +33,13 @@ class KodiDBBase(object):
         self.cursor = self.kodiconn.cursor() if self.kodiconn else None
         self.artconn = artconn
         self.artcursor = self.artconn.cursor() if self.artconn else None
+        # {table: last id we handed out}, see new_id()
+        self._last_ids = {}
 
     def __enter__(self):
         if self.lock:
             KODIDB_LOCK.acquire()
+        self._last_ids = {}
         self.kodiconn = db.connect(self.db_kind)
         self.cursor = self.kodiconn.cursor()
         self.artconn = db.connect('texture') if self._texture_db \
@@ -45,12 +56,55 @@ class KodiDBBase(object):
             if self.artconn:
                 self.artconn.commit()
         finally:
-            self.kodiconn.close()
+            db.release(self.kodiconn)
             if self.artconn:
-                self.artconn.close()
+                db.release(self.artconn)
             if self.lock:
                 KODIDB_LOCK.release()
 
+    def new_id(self, table, key):
+        """
+        Returns a new, unused id for the column key of table, e.g. idMovie of
+        table movie. Reads the max. id from the DB only once and hands out the
+        following ids from memory.
+
+        Kodi cannot insert rows while our transaction is writing. But it
+        might after we committed - so call invalidate_ids() after every commit
+        """
+        try:
+            self._last_ids[table] += 1
+        except KeyError:
+            self.cursor.execute('SELECT COALESCE(MAX(%s), 0) FROM %s'
+                                % (key, table))
+            self._last_ids[table] = self.cursor.fetchone()[0] + 1
+        return self._last_ids[table]
+
+    def invalidate_ids(self):
+        """
+        Forget the ids handed out by new_id() - Kodi itself might have
+        inserted rows since
+        """
+        self._last_ids = {}
+
+    def log_cache_stats(self):
+        """
+        Logs how well our caches worked - if we're using any
+        """
+        pass
+
+    def defer_orphan_gc(self):
+        """
+        Only unlink rows when removing items and delete orphaned rows later on
+        with collect_orphans() - if the DB supports it
+        """
+        pass
+
+    def collect_orphans(self):
+        """
+        Deletes everything that has been orphaned since defer_orphan_gc()
+        """
+        pass
+
     def art_urls(self, kodi_id, kodi_type):
         return (x[0] for x in
                 self.cursor.execute('SELECT url FROM art WHERE media_id = ? AND media_type = ?',
@@ -61,12 +115,16 @@ class KodiDBBase(object):
         return (x[0] for x in
                 self.cursor.execute(query, (kodi_type, limit, offset)))
 
+    @db.catch_operationalerrors
     def add_artwork(self, artworks, kodi_id, kodi_type):
         """
         Pass in an artworks dict (see PlexAPI) to set an items artwork.
         """
-        for kodi_art, url in artworks.iteritems():
-            self.add_art(url, kodi_id, kodi_type, kodi_art)
+        self.cursor.executemany('''
+            INSERT INTO art(media_id, media_type, type, url)
+            VALUES (?, ?, ?, ?)
+        ''', [(kodi_id, kodi_type, kodi_art, url)
+              for kodi_art, url in artworks.iteritems()])
 
     @db.catch_operationalerrors
     def add_art(self, url, kodi_id, kodi_type, kodi_art):
@@ -80,12 +138,33 @@ class KodiDBBase(object):
             VALUES (?, ?, ?, ?)
         ''', (kodi_id, kodi_type, kodi_art, url))
 
+    @db.catch_operationalerrors
     def modify_artwork(self, artworks, kodi_id, kodi_type):
         """
         Pass in an artworks dict (see PlexAPI) to set an items artwork.
+        Only writes artwork that actually changed
         """
+        self.cursor.execute('''
+            SELECT type, url FROM art WHERE media_id = ? AND media_type = ?
+        ''', (kodi_id, kodi_type))
+        old_artworks = dict(self.cursor.fetchall())
+        new, changed = [], []
         for kodi_art, url in artworks.iteritems():
-            self.modify_art(url, kodi_id, kodi_type, kodi_art)
+            if kodi_art not in old_artworks:
+                new.append((kodi_id, kodi_type, kodi_art, url))
+            elif url != old_artworks[kodi_art]:
+                self.delete_cached_artwork(old_artworks[kodi_art])
+                changed.append((url, kodi_id, kodi_type, kodi_art))
+        if new:
+            self.cursor.executemany('''
+                INSERT INTO art(media_id, media_type, type, url)
+                VALUES (?, ?, ?, ?)
+            ''', new)
+        if changed:
+            self.cursor.executemany('''
+                UPDATE art SET url = ?
+                WHERE media_id = ? AND media_type = ? AND type = ?
+            ''', changed)
 
     @db.catch_operationalerrors
     def modify_art(self, url, kodi_id, kodi_type, kodi_art):
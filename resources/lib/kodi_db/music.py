@@ -12,6 +12,102 @@ LOG = getLogger('PLEX.kodi_db.music')
 class KodiMusicDB(common.KodiDBBase):
     db_kind = 'music'
 
+    def __init__(self, *args, **kwargs):
+        super(KodiMusicDB, self).__init__(*args, **kwargs)
+        self._reset_caches()
+
+    def __enter__(self):
+        self._reset_caches()
+        return super(KodiMusicDB, self).__enter__()
+
+    def _reset_caches(self):
+        # Per-connection caches, each read with one single query on first use.
+        # Songs repeat the same few artists, genres and paths over and over
+        # {strGenre: idGenre} and the reverse {idGenre: strGenre}
+        self._genre_ids = None
+        self._genres = {}
+        # {strPath: idPath} and the reverse {idPath: strPath}
+        self._path_ids = None
+        self._paths = {}
+        # {nocase(strArtist): idArtist}, {strMusicBrainzArtistID: idArtist}
+        # and the reverse {idArtist: strArtist}, {idArtist: musicbrainz}
+        self._artist_ids = None
+        self._musicbrainz_ids = {}
+        self._artists = {}
+        self._artist_musicbrainz = {}
+
+    def invalidate_ids(self):
+        """
+        Also forget the genres, paths and artists we know - Kodi might delete
+        them after we committed
+        """
+        super(KodiMusicDB, self).invalidate_ids()
+        self._reset_caches()
+
+    def _genre_cache(self):
+        if self._genre_ids is None:
+            self._genre_ids = {}
+            self.cursor.execute('SELECT idGenre, strGenre FROM genre ORDER BY idGenre')
+            for genre_id, genre in self.cursor.fetchall():
+                # Like "LIMIT 1", use the oldest entry for duplicates
+                self._genre_ids.setdefault(genre, genre_id)
+            self._genres = dict((y, x) for x, y in self._genre_ids.iteritems())
+        return self._genre_ids
+
+    def _path_cache(self):
+        if self._path_ids is None:
+            self._path_ids = {}
+            self.cursor.execute('SELECT idPath, strPath FROM path ORDER BY idPath')
+            for path_id, path in self.cursor.fetchall():
+                self._path_ids.setdefault(path, path_id)
+                self._paths[path_id] = path
+        return self._path_ids
+
+    def _artist_cache(self):
+        if self._artist_ids is None:
+            self._artist_ids = {}
+            self.cursor.execute('''
+                SELECT idArtist, strArtist, strMusicBrainzArtistID
+                FROM artist
+                ORDER BY idArtist
+            ''')
+            for artist_id, name, musicbrainz in self.cursor.fetchall():
+                self._remember_artist(artist_id, name, musicbrainz)
+        return self._artist_ids
+
+    def _remember_artist(self, artist_id, name, musicbrainz=None):
+        if name is not None:
+            self._artist_ids.setdefault(common.nocase(name), artist_id)
+        if (musicbrainz is not None and
+                self._musicbrainz_ids.setdefault(musicbrainz,
+                                                 artist_id) == artist_id):
+            self._artist_musicbrainz[artist_id] = musicbrainz
+        self._artists[artist_id] = name
+
+    def _forget_artist(self, artist_id):
+        name = self._artists.pop(artist_id, None)
+        if (name is not None and
+                self._artist_ids.get(common.nocase(name)) == artist_id):
+            del self._artist_ids[common.nocase(name)]
+        musicbrainz = self._artist_musicbrainz.pop(artist_id, None)
+        if (musicbrainz is not None and
+                self._musicbrainz_ids.get(musicbrainz) == artist_id):
+            del self._musicbrainz_ids[musicbrainz]
+
+    def _genre_id(self, genre):
+        """
+        Returns the idGenre for genre [unicode], adding it if necessary
+        """
+        cache = self._genre_cache()
+        try:
+            return cache[genre]
+        except KeyError:
+            self.cursor.execute('INSERT INTO genre(strGenre) VALUES (?)',
+                                (genre, ))
+            cache[genre] = self.cursor.lastrowid
+            self._genres[self.cursor.lastrowid] = genre
+            return self.cursor.lastrowid
+
     @db.catch_operationalerrors
     def add_path(self, path):
         """
@@ -20,14 +116,15 @@ class KodiMusicDB(common.KodiDBBase):
         """
         # SQL won't return existing paths otherwise
         path = '' if path is None else path
-        self.cursor.execute('SELECT idPath FROM path WHERE strPath = ?',
-                            (path,))
+        cache = self._path_cache()
         try:
-            pathid = self.cursor.fetchone()[0]
-        except TypeError:
+            pathid = cache[path]
+        except KeyError:
             self.cursor.execute('INSERT INTO path(strPath, strHash) VALUES (?, ?)',
                                 (path, '123'))
             pathid = self.cursor.lastrowid
+            cache[path] = pathid
+            self._paths[pathid] = path
         return pathid
 
     @db.catch_operationalerrors
@@ -68,6 +165,17 @@ class KodiMusicDB(common.KodiDBBase):
             SET strPath = ?, strHash = ?
             WHERE idPath = ?
         ''', (path, '123', kodi_pathid))
+        if self._path_ids is not None:
+            self._forget_path(kodi_pathid)
+            self._path_ids.setdefault(path, kodi_pathid)
+            self._paths[kodi_pathid] = path
+
+    def _forget_path(self, path_id):
+        if self._path_ids is None:
+            return
+        path = self._paths.pop(path_id, None)
+        if path is not None and self._path_ids.get(path) == path_id:
+            del self._path_ids[path]
 
     def song_id_from_filename(self, filename, path):
         """
@@ -134,6 +242,9 @@ class KodiMusicDB(common.KodiDBBase):
         """
         self.cursor.execute('DELETE FROM genre WHERE idGenre = ?',
                             (genre_id, ))
+        genre = self._genres.pop(genre_id, None)
+        if genre is not None:
+            del self._genre_ids[genre]
 
     @db.catch_operationalerrors
     def delete_album_from_album_genre(self, album_id):
@@ -157,8 +268,7 @@ class KodiMusicDB(common.KodiDBBase):
                     self.delete_genre(genre[0])
 
     def new_album_id(self):
-        self.cursor.execute('SELECT COALESCE(MAX(idAlbum), 0) FROM album')
-        return self.cursor.fetchone()[0] + 1
+        return self.new_id('album', 'idAlbum')
 
     @db.catch_operationalerrors
     def add_album_17(self, *args):
@@ -341,47 +451,26 @@ class KodiMusicDB(common.KodiDBBase):
             # Delete current genres for clean slate
             self.cursor.execute('DELETE FROM album_genre WHERE idAlbum = ?',
                                 (kodiid, ))
-            for genre in genres:
-                self.cursor.execute('SELECT idGenre FROM genre WHERE strGenre = ?',
-                                    (genre, ))
-                try:
-                    genreid = self.cursor.fetchone()[0]
-                except TypeError:
-                    # Create the genre
-                    self.cursor.execute('INSERT INTO genre(strGenre) VALUES(?)',
-                                        (genre, ))
-                    genreid = self.cursor.lastrowid
-                self.cursor.execute('''
-                    INSERT OR REPLACE INTO album_genre(
-                        idGenre,
-                        idAlbum)
-                    VALUES (?, ?)
-                ''', (genreid, kodiid))
+            self.cursor.executemany('''
+                INSERT OR REPLACE INTO album_genre(
+                    idGenre,
+                    idAlbum)
+                VALUES (?, ?)
+            ''', [(self._genre_id(genre), kodiid) for genre in genres])
         elif mediatype == "song":
             # Delete current genres for clean slate
             self.cursor.execute('DELETE FROM song_genre WHERE idSong = ?',
                                 (kodiid, ))
-            for genre in genres:
-                self.cursor.execute('SELECT idGenre FROM genre WHERE strGenre = ?',
-                                    (genre, ))
-                try:
-                    genreid = self.cursor.fetchone()[0]
-                except TypeError:
-                    # Create the genre
-                    self.cursor.execute('INSERT INTO genre(strGenre) VALUES (?)',
-                                        (genre, ))
-                    genreid = self.cursor.lastrowid
-                self.cursor.execute('''
-                    INSERT OR REPLACE INTO song_genre(
-                        idGenre,
-                        idSong,
-                        iOrder)
-                    VALUES (?, ?, ?)
-                ''', (genreid, kodiid, 0))
+            self.cursor.executemany('''
+                INSERT OR REPLACE INTO song_genre(
+                    idGenre,
+                    idSong,
+                    iOrder)
+                VALUES (?, ?, ?)
+            ''', [(self._genre_id(genre), kodiid, 0) for genre in genres])
 
     def add_song_id(self):
-        self.cursor.execute('SELECT COALESCE(MAX(idSong),0) FROM song')
-        return self.cursor.fetchone()[0] + 1
+        return self.new_id('song', 'idSong')
 
     @db.catch_operationalerrors
     def add_song(self, *args):
@@ -497,21 +586,13 @@ class KodiMusicDB(common.KodiDBBase):
         """
         Adds a single artist's name to the db
         """
-        self.cursor.execute('''
-            SELECT idArtist, strArtist
-            FROM artist
-            WHERE strMusicBrainzArtistID = ?
-        ''', (musicbrainz, ))
+        cache = self._artist_cache()
         try:
-            result = self.cursor.fetchone()
-            artistid = result[0]
-            artistname = result[1]
-        except TypeError:
-            self.cursor.execute('SELECT idArtist FROM artist WHERE strArtist = ? COLLATE NOCASE',
-                                (name, ))
+            artistid = self._musicbrainz_ids[musicbrainz]
+        except KeyError:
             try:
-                artistid = self.cursor.fetchone()[0]
-            except TypeError:
+                artistid = cache[common.nocase(name)]
+            except KeyError:
                 # Krypton has a dummy first entry idArtist: 1  strArtist:
                 # [Missing Tag] strMusicBrainzArtistID: Artist Tag Missing
                 self.cursor.execute('''
@@ -519,10 +600,13 @@ class KodiMusicDB(common.KodiDBBase):
                     VALUES (?, ?)
                 ''', (name, musicbrainz))
                 artistid = self.cursor.lastrowid
+                self._remember_artist(artistid, name, musicbrainz)
         else:
-            if artistname != name:
+            if self._artists[artistid] != name:
                 self.cursor.execute('UPDATE artist SET strArtist = ? WHERE idArtist = ?',
                                     (name, artistid,))
+                self._forget_artist(artistid)
+                self._remember_artist(artistid, name, musicbrainz)
         return artistid
 
     @db.catch_operationalerrors
@@ -555,6 +639,7 @@ class KodiMusicDB(common.KodiDBBase):
     @db.catch_operationalerrors
     def remove_path(self, path_id):
         self.cursor.execute('DELETE FROM path WHERE idPath = ?', (path_id, ))
+        self._forget_path(path_id)
 
     @db.catch_operationalerrors
     def add_song_artist(self, artist_id, song_id, artist_name):
@@ -626,3 +711,5 @@ class KodiMusicDB(common.KodiDBBase):
                             (kodi_id, ))
         self.cursor.execute('DELETE FROM song_artist WHERE idArtist = ?',
                             (kodi_id, ))
+        if self._artist_ids is not None:
+            self._forget_artist(kodi_id)
@@ -2,20 +2,230 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, division, unicode_literals
 from logging import getLogger
-from sqlite3 import IntegrityError
 
 from . import common
-from .. import db, path_ops, timing, variables as v
+from .. import db, path_ops, timing, utils, variables as v
 
 LOG = getLogger('PLEX.kodi_db.video')
 
 MOVIE_PATH = 'plugin://%s.movies/' % v.ADDON_ID
 SHOW_PATH = 'plugin://%s.tvshows/' % v.ADDON_ID
+# Max. number of people we remember during one sync context. Casts repeat a
+# lot across the episodes of a show
+ACTOR_CACHE_SIZE = 5000
 
 
 class KodiVideoDB(common.KodiDBBase):
     db_kind = 'video'
 
+    def __init__(self, *args, **kwargs):
+        super(KodiVideoDB, self).__init__(*args, **kwargs)
+        # Per-connection cache {table: {nocase(name): id}} for the genre,
+        # country, studio and tag tables and the reverse {table: {id: key}}
+        self._name_ids = {}
+        self._name_keys = {}
+        # Cache name: (actor_id, art url or None) for table actor
+        self._actors = utils.LRUCache(ACTOR_CACHE_SIZE)
+        # Per-connection cache {strPath: idPath} for table path and the
+        # reverse {idPath: strPath}
+        self._path_ids = None
+        self._paths = {}
+        # Deferred orphan garbage collection, see defer_orphan_gc()
+        self._defer_gc = False
+
+    def __enter__(self):
+        self._name_ids = {}
+        self._name_keys = {}
+        self._actors = utils.LRUCache(ACTOR_CACHE_SIZE)
+        self._path_ids = None
+        self._paths = {}
+        self._defer_gc = False
+        return super(KodiVideoDB, self).__enter__()
+
+    def __exit__(self, e_typ, e_val, trcbak):
+        self.log_cache_stats()
+        return super(KodiVideoDB, self).__exit__(e_typ, e_val, trcbak)
+
+    def invalidate_ids(self):
+        """
+        Also forget the genres, countries, studios, tags, people and paths we
+        know - Kodi might delete them after we committed
+        """
+        super(KodiVideoDB, self).invalidate_ids()
+        self._name_ids = {}
+        self._name_keys = {}
+        self._actors.clear()
+        self._path_ids = None
+        self._paths = {}
+
+    def log_cache_stats(self):
+        """
+        Logs how well our caches worked for this connection
+        """
+        if self._actors.hits or self._actors.misses:
+            LOG.debug('Actor cache: %s hits, %s misses, hit rate %.1f%%, %s '
+                      'people cached', self._actors.hits, self._actors.misses,
+                      100 * self._actors.hit_rate(), len(self._actors))
+
+    def _name_cache(self, table, key):
+        """
+        Returns the dict {nocase(name): id} for table, reading all of the
+        table's entries with one single query the first time
+        """
+        try:
+            return self._name_ids[table]
+        except KeyError:
+            cache = {}
+            self.cursor.execute('SELECT %s, name FROM %s ORDER BY %s'
+                                % (key, table, key))
+            for entry_id, name in self.cursor.fetchall():
+                # Like "LIMIT 1", use the oldest entry for duplicate names
+                cache.setdefault(common.nocase(name), entry_id)
+            self._name_ids[table] = cache
+            self._name_keys[table] = dict((y, x) for x, y in cache.iteritems())
+            return cache
+
+    def _name_id(self, table, key, name):
+        """
+        Returns the id of name in table, e.g. the genre_id of a genre. Adds
+        name to the table if necessary
+        """
+        cache = self._name_cache(table, key)
+        try:
+            return cache[common.nocase(name)]
+        except KeyError:
+            self.cursor.execute('INSERT INTO %s(name) VALUES(?)' % table,
+                                (name, ))
+            cache[common.nocase(name)] = self.cursor.lastrowid
+            self._name_keys[table][self.cursor.lastrowid] = common.nocase(name)
+            return self.cursor.lastrowid
+
+    def _forget_name_id(self, table, entry_id):
+        """
+        Call after deleting entry_id from table, e.g. an orphaned genre
+        """
+        try:
+            name = self._name_keys[table].pop(entry_id)
+        except KeyError:
+            return
+        del self._name_ids[table][name]
+
+    def defer_orphan_gc(self):
+        """
+        From now on, removing items only unlinks rows. Files, paths, genres,
+        countries, studios, tags and people that might have been orphaned are
+        merely recorded as candidates in the temporary table orphan_candidate.
+        Call collect_orphans() before EVERY commit in order to delete them all
+        with a couple of set-based queries
+        """
+        self.cursor.execute('''
+            CREATE TEMP TABLE IF NOT EXISTS orphan_candidate(
+                kind TEXT,
+                id INTEGER,
+                PRIMARY KEY (kind, id))
+        ''')
+        self.cursor.execute('DELETE FROM orphan_candidate')
+        self._defer_gc = True
+
+    def _add_orphan_candidates(self, kind, ids):
+        self.cursor.executemany('INSERT OR IGNORE INTO orphan_candidate VALUES (?, ?)',
+                                [(kind, x) for x in ids])
+
+    @db.catch_operationalerrors
+    def collect_orphans(self):
+        """
+        Deletes all files recorded since defer_orphan_gc() or our last call -
+        including their bookmarks, settings and streamdetails - as well as all
+        recorded paths, genres, countries, studios, tags and people that are
+        now orphaned
+        """
+        if not self._defer_gc:
+            return
+        candidates = 'SELECT id FROM orphan_candidate WHERE kind = \'%s\''
+        # Files and the paths they might leave orphaned
+        self.cursor.execute('''
+            INSERT OR IGNORE INTO orphan_candidate
+            SELECT 'path', idPath FROM files WHERE idFile IN (%s)
+        ''' % (candidates % 'file'))
+        for table in ('bookmark', 'settings', 'streamdetails', 'stacktimes',
+                      'files'):
+            self.cursor.execute('DELETE FROM %s WHERE idFile IN (%s)'
+                                % (table, candidates % 'file'))
+        files = self.cursor.rowcount
+        # Make sure we're not deleting our root paths!
+        self.cursor.execute('''
+            DELETE FROM path
+            WHERE idPath IN (%s) AND strPath NOT IN (?, ?)
+            AND NOT EXISTS (SELECT 1 FROM files WHERE files.idPath = path.idPath)
+        ''' % (candidates % 'path'), (MOVIE_PATH, SHOW_PATH))
+        paths = self.cursor.rowcount
+        if paths:
+            self._path_ids = None
+            self._paths = {}
+        names = 0
+        for table, key in (('genre', 'genre_id'),
+                           ('country', 'country_id'),
+                           ('studio', 'studio_id'),
+                           ('tag', 'tag_id')):
+            self.cursor.execute('''
+                DELETE FROM {0} WHERE {1} IN ({2}) AND NOT EXISTS
+                (SELECT 1 FROM {0}_link WHERE {0}_link.{1} = {0}.{1})
+            '''.format(table, key, candidates % table))
+            names += self.cursor.rowcount
+        self._name_ids = {}
+        self._name_keys = {}
+        orphaned_people = '''
+            SELECT id FROM orphan_candidate
+            WHERE kind = 'actor'
+            AND NOT EXISTS (SELECT 1 FROM actor_link
+                            WHERE actor_link.actor_id = orphan_candidate.id)
+            AND NOT EXISTS (SELECT 1 FROM director_link
+                            WHERE director_link.actor_id = orphan_candidate.id)
+            AND NOT EXISTS (SELECT 1 FROM writer_link
+                            WHERE writer_link.actor_id = orphan_candidate.id)
+        '''
+        self.cursor.execute('''
+            SELECT url FROM art WHERE media_type = 'actor' AND media_id IN (%s)
+        ''' % orphaned_people)
+        for row in self.cursor.fetchall():
+            self.delete_cached_artwork(row[0])
+        self.cursor.execute('DELETE FROM actor WHERE actor_id IN (%s)'
+                            % orphaned_people)
+        people = self.cursor.rowcount
+        self._actors.clear()
+        # Keep on deferring until we leave this context
+        self.cursor.execute('DELETE FROM orphan_candidate')
+        LOG.debug('Deleted orphans: %s files, %s paths, %s genres, countries, '
+                  'studios or tags and %s people', files, paths, names, people)
+
+    def _path_cache(self):
+        """
+        Returns the dict {strPath: idPath}, reading the entire path table with
+        one single query the first time. Thousands of episodes share a
+        handful of paths
+        """
+        if self._path_ids is None:
+            # Descending so the oldest entry wins for duplicate paths - just
+            # like "LIMIT 1"
+            self.cursor.execute('''
+                SELECT strPath, idPath FROM path ORDER BY idPath DESC
+            ''')
+            self._path_ids = dict(self.cursor.fetchall())
+            self._paths = dict((y, x) for x, y in self._path_ids.iteritems())
+        return self._path_ids
+
+    def _remember_path(self, path, path_id):
+        self._path_cache()[path] = path_id
+        self._paths[path_id] = path
+
+    def _forget_path(self, path_id):
+        """
+        Call after deleting path_id from table path
+        """
+        path = self._paths.pop(path_id, None)
+        if path is not None and self._path_ids.get(path) == path_id:
+            del self._path_ids[path]
+
     @db.catch_operationalerrors
     def create_kodi_db_indicees(self):
         """
@@ -54,6 +264,7 @@ class KodiVideoDB(common.KodiDBBase):
                                             'metadata.local',
                                             1,
                                             0))
+                self._remember_path(path, self.cursor.lastrowid)
 
     @db.catch_operationalerrors
     def parent_path_id(self, path):
@@ -72,6 +283,7 @@ class KodiVideoDB(common.KodiDBBase):
                                 ''',
                                 (parentpath, timing.kodi_now()))
             pathid = self.cursor.lastrowid
+            self._remember_path(parentpath, pathid)
             if parentpath != path:
                 # In case we end up having media in the filesystem root, C:\
                 parent_id = self.parent_path_id(parentpath)
@@ -98,11 +310,8 @@ class KodiVideoDB(common.KodiDBBase):
         WILL activate noUpdate for the path!
         """
         path = '' if path is None else path
-        self.cursor.execute('SELECT idPath FROM path WHERE strPath = ? LIMIT 1',
-                            (path, ))
-        try:
-            pathid = self.cursor.fetchone()[0]
-        except TypeError:
+        pathid = self.get_path(path)
+        if pathid is None:
             self.cursor.execute('''
                                 INSERT INTO path(
                                     strPath,
@@ -116,18 +325,26 @@ class KodiVideoDB(common.KodiDBBase):
                                 (path, date_added, id_parent_path, content,
                                  scraper, 1))
             pathid = self.cursor.lastrowid
+            self._remember_path(path, pathid)
         return pathid
 
     def get_path(self, path):
         """
         Returns the idPath from the path table for path [unicode] or None
         """
-        self.cursor.execute('SELECT idPath FROM path WHERE strPath = ?',
+        try:
+            return self._path_cache()[path]
+        except KeyError:
+            pass
+        # Somebody else might have added the path in the meantime
+        self.cursor.execute('SELECT idPath FROM path WHERE strPath = ? LIMIT 1',
                             (path, ))
         try:
-            return self.cursor.fetchone()[0]
+            path_id = self.cursor.fetchone()[0]
         except TypeError:
-            pass
+            return
+        self._remember_path(path, path_id)
+        return path_id
 
     @db.catch_operationalerrors
     def add_file(self, filename, path_id, date_added):
@@ -168,11 +385,8 @@ class KodiVideoDB(common.KodiDBBase):
         """
         Returns the idShow for path [unicode] or None
         """
-        self.cursor.execute('SELECT idPath FROM path WHERE strPath = ? LIMIT 1',
-                            (path, ))
-        try:
-            path_id = self.cursor.fetchone()[0]
-        except TypeError:
+        path_id = self.get_path(path)
+        if path_id is None:
             return
         self.cursor.execute('SELECT idShow FROM tvshowlinkpath WHERE idPath = ? LIMIT 1',
                             (path_id, ))
@@ -189,6 +403,9 @@ class KodiVideoDB(common.KodiDBBase):
         If remove_orphans is true, this method will delete any orphaned path
         entries in the Kodi path table
         """
+        if self._defer_gc and remove_orphans:
+            self._add_orphan_candidates('file', (file_id, ))
+            return
         self.cursor.execute('SELECT idPath FROM files WHERE idFile = ? LIMIT 1',
                             (file_id,))
         try:
@@ -216,53 +433,43 @@ class KodiVideoDB(common.KodiDBBase):
                     WHERE idPath = ? AND strPath NOT IN (?, ?)
                 '''
                 self.cursor.execute(query, (path_id, MOVIE_PATH, SHOW_PATH))
+                if self.cursor.rowcount:
+                    self._forget_path(path_id)
 
     @db.catch_operationalerrors
     def _modify_link_and_table(self, kodi_id, kodi_type, entries, link_table,
                                table, key, first_id=None):
         first_id = first_id if first_id is not None else 1
-        entry_ids = []
-        for entry in entries:
-            self.cursor.execute('''
-                SELECT %s FROM %s WHERE name = ? COLLATE NOCASE LIMIT 1
-            ''' % (key, table), (entry, ))
-            try:
-                entry_id = self.cursor.fetchone()[0]
-            except TypeError:
-                self.cursor.execute('INSERT INTO %s(name) VALUES(?)' % table,
-                                    (entry, ))
-                entry_id = self.cursor.lastrowid
-            finally:
-                entry_ids.append(entry_id)
+        entry_ids = set(self._name_id(table, key, entry) for entry in entries)
         # Now process the ids obtained from the names
         # Get the existing, old entries
-        outdated_entries = []
-        for entry_id in self.cursor.execute('SELECT %s FROM %s WHERE media_id = ? AND media_type = ?'
-                                            % (key, link_table), (kodi_id, kodi_type)):
-            try:
-                entry_ids.remove(entry_id[0])
-            except ValueError:
-                outdated_entries.append(entry_id[0])
+        self.cursor.execute('SELECT %s FROM %s WHERE media_id = ? AND media_type = ?'
+                            % (key, link_table), (kodi_id, kodi_type))
+        old_entry_ids = set(x[0] for x in self.cursor.fetchall())
         # Add all new entries that haven't already been added
-        for entry_id in entry_ids:
-            try:
-                self.cursor.execute('INSERT INTO %s VALUES (?, ?, ?)' % link_table,
-                                    (entry_id, kodi_id, kodi_type))
-            except IntegrityError:
-                LOG.info('IntegrityError: skipping entry %s for table %s',
-                         entry_id, link_table)
+        self.cursor.executemany('INSERT OR IGNORE INTO %s VALUES (?, ?, ?)' % link_table,
+                                [(x, kodi_id, kodi_type)
+                                 for x in entry_ids - old_entry_ids])
         # Delete all outdated references in the link table. Also check whether
         # we need to delete orphaned entries in the master table
+        outdated_entries = old_entry_ids - entry_ids
+        if not outdated_entries:
+            return
+        self.cursor.executemany('''
+            DELETE FROM %s WHERE %s = ? AND media_id = ? AND media_type = ?
+        ''' % (link_table, key), [(x, kodi_id, kodi_type)
+                                  for x in outdated_entries])
+        if self._defer_gc:
+            self._add_orphan_candidates(table, outdated_entries)
+            return
         for entry_id in outdated_entries:
-            self.cursor.execute('''
-                DELETE FROM %s WHERE %s = ? AND media_id = ? AND media_type = ?
-            ''' % (link_table, key), (entry_id, kodi_id, kodi_type))
             self.cursor.execute('SELECT %s FROM %s WHERE %s = ?' % (key, link_table, key),
                                 (entry_id, ))
             if self.cursor.fetchone() is None:
                 # Delete in the original table because entry is now orphaned
                 self.cursor.execute('DELETE FROM %s WHERE %s = ?' % (table, key),
                                     (entry_id, ))
+                self._forget_name_id(table, entry_id)
 
     def modify_countries(self, kodi_id, kodi_type, countries=None):
         """
@@ -324,35 +531,31 @@ class KodiVideoDB(common.KodiDBBase):
     @db.catch_operationalerrors
     def _add_people_kind(self, kodi_id, kodi_type, kind, people_list):
         # Save new people to Kodi DB by iterating over the remaining entries
+        links = []
         if kind == 'actor':
             for person in people_list:
                 # Make sure the person entry in table actor exists
-                actor_id, new = self._get_actor_id(person[0],
-                                                   art_url=person[1])
-                if not new and person[1]:
+                actor_id, art_url = self._get_actor_id(person[0],
+                                                       art_url=person[1])
+                if person[1] and art_url is None:
                     # Person might have shown up as a director or writer first
                     # WITHOUT an art url from the Plex side!
-                    # Check here if we need to set the actor's art url
-                    self._check_actor_art(actor_id, person[1])
-                # Link the person with the media element
-                try:
-                    self.cursor.execute('INSERT INTO actor_link VALUES (?, ?, ?, ?, ?)',
-                                        (actor_id, kodi_id, kodi_type,
-                                         person[2], person[3]))
-                except IntegrityError:
-                    # With Kodi, an actor may have only one role, unlike Plex
-                    pass
+                    self._set_actor_art(person[0], actor_id, person[1])
+                links.append((actor_id, kodi_id, kodi_type,
+                              person[2], person[3]))
+            # Link the people with the media element. With Kodi, an actor may
+            # have only one role, unlike Plex - hence OR IGNORE
+            self.cursor.executemany('INSERT OR IGNORE INTO actor_link VALUES (?, ?, ?, ?, ?)',
+                                    links)
         else:
             for person in people_list:
                 # Make sure the person entry in table actor exists:
                 actor_id, _ = self._get_actor_id(person[0])
-                # Link the person with the media element
-                try:
-                    self.cursor.execute('INSERT INTO %s_link VALUES (?, ?, ?)' % kind,
-                                        (actor_id, kodi_id, kodi_type))
-                except IntegrityError:
-                    # Again, Kodi may have only one person assigned to a role
-                    pass
+                links.append((actor_id, kodi_id, kodi_type))
+            # Link the people with the media element. Again, Kodi may have
+            # only one person assigned to a role
+            self.cursor.executemany('INSERT OR IGNORE INTO %s_link VALUES (?, ?, ?)' % kind,
+                                    links)
 
     def modify_people(self, kodi_id, kodi_type, people=None):
         """
@@ -391,10 +594,24 @@ class KodiVideoDB(common.KodiDBBase):
         # Determine which people we need to save or delete
         outdated_people = []
         for person in old_people:
-            try:
-                people_list.remove(person[1:])
-            except ValueError:
-                outdated_people.append(person)
+            if kind == 'actor':
+                # Same actor in the same role - ignore the art url
+                for new_person in people_list:
+                    if (new_person[0] == person[1] and
+                            new_person[2:] == person[3:]):
+                        break
+                else:
+                    outdated_people.append(person)
+                    continue
+                people_list.remove(new_person)
+                if new_person[1] and person[2] is None:
+                    # Never overwrite art the actor already has
+                    self._set_actor_art(person[1], person[0], new_person[1])
+            else:
+                try:
+                    people_list.remove(person[1:])
+                except ValueError:
+                    outdated_people.append(person)
         # Get rid of old entries
         query = '''
             DELETE FROM %s_link
@@ -405,6 +622,9 @@ class KodiVideoDB(common.KodiDBBase):
         for person in outdated_people:
             # Delete the outdated entry
             self.cursor.execute(query, (person[0], kodi_id, kodi_type))
+            if self._defer_gc:
+                self._add_orphan_candidates('actor', (person[0], ))
+                continue
             # Do we now have orphaned entries?
             for person_kind in ('actor', 'writer', 'director'):
                 self.cursor.execute(query_actor_check % person_kind,
@@ -415,6 +635,7 @@ class KodiVideoDB(common.KodiDBBase):
                 # person entry in actor table is now orphaned
                 # Delete the person from actor table
                 self.cursor.execute(query_actor_delete, (person[0],))
+                self._actors.discard(person[1])
                 if kind == 'actor':
                     # Delete any associated artwork
                     self.delete_artwork(person[0], 'actor')
@@ -433,32 +654,42 @@ class KodiVideoDB(common.KodiDBBase):
     def _get_actor_id(self, name, art_url=None):
         """
         Returns the tuple
-            (actor_id [int], new_entry [bool])
+            (actor_id [int], art_url [unicode or None])
         for name [unicode] in table actor (without ensuring that the name
-        matches)."new_entry" will be True if a new DB entry has just been
-        created.
-        If not, will create a new record with actor_id, name, art_url
+        matches). art_url is the actor's art url in the Kodi DB or None.
+        If name does not exist yet, will create a new record with actor_id,
+        name, art_url
 
         Uses Plex ids and thus assumes that Plex person id is unique!
         """
+        actor = self._actors.get(name)
+        if actor is not None:
+            return actor
         self.cursor.execute('SELECT actor_id FROM actor WHERE name=? LIMIT 1',
                             (name,))
         try:
-            return (self.cursor.fetchone()[0], False)
+            actor_id = self.cursor.fetchone()[0]
         except TypeError:
-            return (self._new_actor_id(name, art_url), True)
+            actor = (self._new_actor_id(name, art_url), art_url or None)
+        else:
+            self.cursor.execute('''
+                SELECT url FROM art
+                WHERE media_id = ? AND media_type = 'actor'
+                LIMIT 1''', (actor_id, ))
+            try:
+                actor = (actor_id, self.cursor.fetchone()[0])
+            except TypeError:
+                actor = (actor_id, None)
+        self._actors.set(name, actor)
+        return actor
 
-    def _check_actor_art(self, actor_id, url):
+    def _set_actor_art(self, name, actor_id, url):
         """
-        Sets the actor's art url [unicode] for actor_id [int]
+        Adds the art url [unicode] for actor_id [int]. Only call if the actor
+        does not have any art yet
         """
-        self.cursor.execute('''
-            SELECT EXISTS(SELECT 1 FROM art
-                          WHERE media_id = ? AND media_type = 'actor'
-                          LIMIT 1)''', (actor_id, ))
-        if not self.cursor.fetchone()[0]:
-            # We got a new artwork url for this actor!
-            self.add_art(url, actor_id, 'actor', 'thumb')
+        self.add_art(url, actor_id, 'actor', 'thumb')
+        self._actors.set(name, (actor_id, url))
 
     def get_art(self, kodi_id, kodi_type):
         """
@@ -636,14 +867,7 @@ class KodiVideoDB(common.KodiDBBase):
         """
         Will create a new tag if needed and return the tag_id
         """
-        self.cursor.execute('SELECT tag_id FROM tag WHERE name = ? COLLATE NOCASE',
-                            (name,))
-        try:
-            tag_id = self.cursor.fetchone()[0]
-        except TypeError:
-            self.cursor.execute('INSERT INTO tag(name) VALUES(?)', (name, ))
-            tag_id = self.cursor.lastrowid
-        return tag_id
+        return self._name_id('tag', 'tag_id', name)
 
     @db.catch_operationalerrors
     def update_tag(self, oldtag, newtag, kodiid, mediatype):
@@ -822,12 +1046,10 @@ class KodiVideoDB(common.KodiDBBase):
                             (kodi_id, kodi_type))
 
     def new_show_id(self):
-        self.cursor.execute('SELECT COALESCE(MAX(idShow), 0) FROM tvshow')
-        return self.cursor.fetchone()[0] + 1
+        return self.new_id('tvshow', 'idShow')
 
     def new_episode_id(self):
-        self.cursor.execute('SELECT COALESCE(MAX(idEpisode), 0) FROM episode')
-        return self.cursor.fetchone()[0] + 1
+        return self.new_id('episode', 'idEpisode')
 
     @db.catch_operationalerrors
     def add_episode(self, *args):
@@ -941,8 +1163,7 @@ class KodiVideoDB(common.KodiDBBase):
                             (kodi_id,))
 
     def new_movie_id(self):
-        self.cursor.execute('SELECT COALESCE(MAX(idMovie), 0) FROM movie')
-        return self.cursor.fetchone()[0] + 1
+        return self.new_id('movie', 'idMovie')
 
     @db.catch_operationalerrors
     def add_movie(self, *args):
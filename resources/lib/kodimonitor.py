@@ -13,7 +13,7 @@ import binascii
 import xbmc
 
 from .plex_api import API
-from .plex_db import PlexDB
+from .plex_db import MAPPINGS
 from . import kodi_db
 from .downloadutils import DownloadUtils as DU
 from . import utils, timing, plex_functions as PF
@@ -153,11 +153,10 @@ class KodiMonitor(xbmc.Monitor):
         if not kodi_id and kodi_type and path:
             kodi_id, _ = kodi_db.kodiid_from_filename(path, kodi_type)
         if kodi_id:
-            with PlexDB() as plexdb:
-                db_item = plexdb.item_by_kodi_id(kodi_id, kodi_type)
-            if db_item:
-                plex_id = db_item['plex_id']
-                plex_type = db_item['plex_type']
+            mapping = MAPPINGS.by_kodi_id(kodi_id, kodi_type)
+            if mapping:
+                plex_id = mapping.plex_id
+                plex_type = mapping.plex_type
         return plex_id, plex_type
 
     @staticmethod
@@ -408,8 +407,7 @@ def _record_playstate(status, ended):
     if status['plex_type'] not in v.PLEX_VIDEOTYPES:
         LOG.debug('Not messing with non-video entries')
         return
-    with PlexDB() as plexdb:
-        db_item = plexdb.item_by_id(status['plex_id'], status['plex_type'])
+    db_item = MAPPINGS.by_plex_id(status['plex_id'], status['plex_type'])
     if not db_item:
         # Item not (yet) in Kodi library
         LOG.debug('No playstate update due to Plex id not found: %s', status)
@@ -442,7 +440,7 @@ def _record_playstate(status, ended):
     if playcount is None:
         LOG.debug('playcount not found, looking it up in the Kodi DB')
         with kodi_db.KodiVideoDB() as kodidb:
-            playcount = kodidb.get_playcount(db_item['kodi_fileid'])
+            playcount = kodidb.get_playcount(db_item.kodi_fileid)
         playcount = 0 if playcount is None else playcount
     if time < v.IGNORE_SECONDS_AT_START:
         LOG.debug('Ignoring playback less than %s seconds',
@@ -457,14 +455,14 @@ def _record_playstate(status, ended):
         playcount += 1
         time = 0
     with kodi_db.KodiVideoDB() as kodidb:
-        kodidb.set_resume(db_item['kodi_fileid'],
+        kodidb.set_resume(db_item.kodi_fileid,
                           time,
                           totaltime,
                           playcount,
                           last_played)
-        if 'kodi_fileid_2' in db_item and db_item['kodi_fileid_2']:
+        if db_item.kodi_fileid_2:
             # Dirty hack for our episodes
-            kodidb.set_resume(db_item['kodi_fileid_2'],
+            kodidb.set_resume(db_item.kodi_fileid_2,
                               time,
                               totaltime,
                               playcount,
@@ -489,9 +487,9 @@ def _external_player_correct_plex_watch_count(db_item):
     See https://kodi.wiki/view/External_players
     """
     with kodi_db.KodiVideoDB() as kodidb:
-        playcount = kodidb.get_playcount(db_item['kodi_fileid'])
+        playcount = kodidb.get_playcount(db_item.kodi_fileid)
     LOG.debug('External player detected. Playcount: %s', playcount)
-    PF.scrobble(db_item['plex_id'], 'watched' if playcount else 'unwatched')
+    PF.scrobble(db_item.plex_id, 'watched' if playcount else 'unwatched')
     return True if playcount else False
 
 
@@ -619,14 +617,13 @@ def _videolibrary_onupdate(data):
         # increase or decrease the viewcount
         return
     # Send notification to the server.
-    with PlexDB(lock=False) as plexdb:
-        db_item = plexdb.item_by_kodi_id(kodi_id, kodi_type)
+    db_item = MAPPINGS.by_kodi_id(kodi_id, kodi_type)
     if not db_item:
         LOG.error("Could not find plex_id in plex database for a "
                   "video library update")
         return
     # notify the server
     if playcount > 0:
-        PF.scrobble(db_item['plex_id'], 'watched')
+        PF.scrobble(db_item.plex_id, 'watched')
     else:
-        PF.scrobble(db_item['plex_id'], 'unwatched')
+        PF.scrobble(db_item.plex_id, 'unwatched')
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, unicode_literals
+from logging import getLogger
+from threading import Lock
+
+from .. import plex_functions as PF, utils
+
+LOG = getLogger('PLEX.sync.collection_cache')
+
+
+class CollectionCache(object):
+    """
+    Thread-safe cache of all the Plex collections (Kodi sets) of one single
+    library section. Downloads every collection including its artwork with
+    one single PMS listing request - either explicitly with prefetch() as
+    soon as we know that we need to sync the section or lazily on the first
+    get(). Afterwards, lookups never block
+    """
+    def __init__(self, section_id):
+        self.section_id = section_id
+        # Dict with entries of the form
+        # <collection index [as in an item's metadata with "Collection id"]>:
+        # <collection xml element of the PMS listing>
+        self._collections = None
+        self._lock = Lock()
+
+    def prefetch(self):
+        """
+        Downloads all collections of the section if we haven't already.
+        Returns False if the download failed - the next call will try again
+        """
+        if self._collections is not None:
+            return True
+        with self._lock:
+            if self._collections is not None:
+                # Another thread was faster
+                return True
+            xml = PF.collections(self.section_id)
+            if xml is None:
+                LOG.warn('Could not download collections for section %s',
+                         self.section_id)
+                return False
+            self._collections = dict((utils.cast(int, x.get('index')), x)
+                                     for x in xml)
+            LOG.debug('Cached %s collections for section %s',
+                      len(self._collections), self.section_id)
+            return True
+
+    def get(self, plex_set_id):
+        """
+        Returns the xml element of the collection with index plex_set_id or
+        None if there is no such collection. Raises RuntimeError if we could
+        not download the collections
+        """
+        if not self.prefetch():
+            raise RuntimeError('Collections of section %s unavailable'
+                               % self.section_id)
+        return self._collections.get(plex_set_id)
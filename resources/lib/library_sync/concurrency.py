@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, unicode_literals
+from logging import getLogger
+from threading import Condition
+
+LOG = getLogger('PLEX.sync.concurrency')
+
+# Weight of a new latency sample for the moving average of the PMS latency
+LATENCY_ALPHA = 0.2
+# Latency is "too high" once it exceeds our baseline by this factor
+LATENCY_TOLERANCE = 2.0
+# Let our best-ever latency drift upwards a bit with every round
+BASELINE_DRIFT = 1.05
+# Max. seconds to wait before retrying after the PMS returned an error
+MAX_BACKOFF = 30.0
+
+
+class ConcurrencyController(object):
+    """
+    Adjusts the number of GetMetadataThread workers that may download from
+    the PMS at the same time - AIMD-style:
+
+        * Additive increase: add one worker after a round of requests if the
+          PMS latency stays close to the best latency we've seen
+        * Decrease by one worker if latency climbs too much
+        * Multiplicative decrease: halve the number of workers as soon as the
+          PMS returns an error such as 401 (PMS under strain) or 5xx
+
+    A round is as many requests as there are active workers. Workers that are
+    not allowed to work are parked in acquire() instead of being stopped.
+    """
+    def __init__(self, max_workers):
+        self.max_workers = max(max_workers, 1)
+        # Start in the middle and let the PMS tell us where to go
+        self.limit = max(self.max_workers // 2, 1)
+        self._active = 0
+        self._cond = Condition()
+        # Moving average and best-ever moving average of the latency [s]
+        self._latency = None
+        self._baseline = None
+        # Current round
+        self._samples = 0
+        self._decreased = False
+        self._consecutive_errors = 0
+        # Stats for the section we're currently downloading
+        self._section = None
+        self._requests = 0
+        self._errors = 0
+        self._total_latency = 0.0
+        self._min_limit = self.limit
+        self._max_limit = self.limit
+
+    def acquire(self, thread):
+        """
+        Blocks (parks) thread until it may download again. Returns
+        immediately if the thread should be cancelled
+        """
+        with self._cond:
+            while self._active >= self.limit and not thread.should_cancel():
+                self._cond.wait(0.5)
+            self._active += 1
+
+    def release(self):
+        with self._cond:
+            self._active -= 1
+            self._cond.notify()
+
+    def backoff(self):
+        """
+        Returns the number of seconds to wait before retrying a request that
+        the PMS answered with an error
+        """
+        with self._cond:
+            return min(0.5 * 2 ** self._consecutive_errors, MAX_BACKOFF)
+
+    def report(self, section, latency, error=False):
+        """
+        Call after each PMS request with the request's latency [float,
+        seconds] and whether the PMS answered with an error
+        """
+        with self._cond:
+            if self._section is None or section != self._section:
+                self._log_section()
+                self._start_section(section)
+            self._requests += 1
+            self._samples += 1
+            if error:
+                self._errors += 1
+                self._consecutive_errors += 1
+                if not self._decreased:
+                    # Multiplicative decrease - once per round
+                    self._set_limit(self.limit // 2)
+                    self._decreased = True
+                    self._samples = 0
+                return
+            self._consecutive_errors = 0
+            self._total_latency += latency
+            if self._latency is None:
+                self._latency = latency
+            else:
+                self._latency = (LATENCY_ALPHA * latency +
+                                 (1 - LATENCY_ALPHA) * self._latency)
+            if self._baseline is None or self._latency < self._baseline:
+                self._baseline = self._latency
+            if self._samples < self.limit:
+                return
+            # One round is done
+            if self._latency > LATENCY_TOLERANCE * self._baseline:
+                self._set_limit(self.limit - 1)
+            elif not self._decreased:
+                self._set_limit(self.limit + 1)
+            self._baseline *= BASELINE_DRIFT
+            self._decreased = False
+            self._samples = 0
+
+    def _set_limit(self, limit):
+        limit = min(max(limit, 1), self.max_workers)
+        if limit == self.limit:
+            return
+        LOG.debug('Changing number of active download threads from %s to %s. '
+                  'Latency %.3fs, baseline %.3fs', self.limit, limit,
+                  self._latency or 0.0, self._baseline or 0.0)
+        self.limit = limit
+        self._min_limit = min(self._min_limit, limit)
+        self._max_limit = max(self._max_limit, limit)
+        # Wake up parked threads if we allow more of them now
+        self._cond.notify_all()
+
+    def _start_section(self, section):
+        self._section = section
+        self._requests = 0
+        self._errors = 0
+        self._total_latency = 0.0
+        self._min_limit = self.limit
+        self._max_limit = self.limit
+
+    def _log_section(self):
+        if self._section is None or not self._requests:
+            return
+        successful = self._requests - self._errors
+        LOG.info('Downloaded metadata for section %s: %s requests, %s errors, '
+                 'avg latency %.3fs, %s-%s of max %s download threads active '
+                 '(currently %s)',
+                 self._section, self._requests, self._errors,
+                 self._total_latency / successful if successful else 0.0,
+                 self._min_limit, self._max_limit, self.max_workers,
+                 self.limit)
+
+    def log_stats(self):
+        """
+        Logs the stats of the section we last downloaded
+        """
+        with self._cond:
+            self._log_section()
+            self._section = None
@@ -42,17 +42,19 @@ class FanartThread(backgroundthread.KillableThread):
 
     def _loop(self):
         for typus in SUPPORTED_TYPES:
-            offset = 0
+            # Page by plex_id - process_fanart() flips fanart_synced, so an
+            # offset would skip items
+            last_plex_id = 0
             while True:
                 with PlexDB() as plexdb:
                     # Keep DB connection open only for a short period of time!
                     if self.refresh:
                         batch = list(plexdb.every_plex_id(typus,
-                                                          offset,
+                                                          last_plex_id,
                                                           BATCH_SIZE))
                     else:
                         batch = list(plexdb.missing_fanart(typus,
-                                                           offset,
+                                                           last_plex_id,
                                                            BATCH_SIZE))
                 for plex_id in batch:
                     # Do the actual, time-consuming processing
@@ -61,7 +63,7 @@ class FanartThread(backgroundthread.KillableThread):
                     process_fanart(plex_id, typus, self.refresh)
                 if len(batch) < BATCH_SIZE:
                     break
-                offset += BATCH_SIZE
+                last_plex_id = batch[-1]
         return True
 
     def _run(self):
@@ -2,10 +2,12 @@
 from __future__ import absolute_import, division, unicode_literals
 from logging import getLogger
 from Queue import Full
+from sys import getsizeof
 
 from . import common, sections
 from ..plex_db import PlexDB
-from .. import backgroundthread
+from .. import backgroundthread, plex_functions as PF, utils, \
+    variables as v, app
 
 LOG = getLogger('PLEX.sync.fill_metadata_queue')
 
@@ -16,17 +18,81 @@ class FillMetadataQueue(common.LibrarySyncMixin,
                         backgroundthread.KillableThread):
     """
     Determines which plex_ids we need to sync and puts these ids in a separate
-    queue. Will use a COPIED plex.db file (plex-copy.db) in order to read much
-    faster without the writing thread stalling
+    queue. Reads a read-only snapshot of plex.db (or the COPIED plex.db file
+    plex-copy.db if the user chose so) in order to read much faster without
+    the writing thread stalling.
+
+    With fused=True, the sections' iterators list ALL PMS items. Unchanged
+    items are then put directly into the processing_queue in order to only
+    sync their playstates and mark them as still present on the PMS
     """
     def __init__(self, repair, section_queue, get_metadata_queue,
-                 processing_queue):
+                 processing_queue, fused=False):
         self.repair = repair
         self.section_queue = section_queue
         self.get_metadata_queue = get_metadata_queue
         self.processing_queue = processing_queue
+        self.fused = fused
+        # Did we get the complete PMS listing for every section?
+        self.successful = True
         super(FillMetadataQueue, self).__init__()
 
+    def _checksum_index(self, section):
+        """
+        Loads all the (plex_id, checksum) pairs we know of for section at once
+        in order to avoid one plex.db lookup per PMS item
+        """
+        if self.repair or section.plex_type == v.PLEX_TYPE_SONG:
+            # We're going to sync every single item anyway - or never look at
+            # the checksums, for songs
+            return {}
+        with PlexDB(lock=False, snapshot=True) as plexdb:
+            checksums = plexdb.checksum_index(section.section_id,
+                                              section.plex_type)
+        LOG.debug('Loaded %s checksums for section %s, using roughly %s kB '
+                  'of memory', len(checksums), section,
+                  (getsizeof(checksums) +
+                   sum(getsizeof(x) + getsizeof(y)
+                       for x, y in checksums.iteritems())) // 1024)
+        return checksums
+
+    @staticmethod
+    def _resume(section):
+        """
+        Returns the position within the PMS listing of the next item that
+        section.iterator will yield. If we're resuming an interrupted sync,
+        verifies that the PMS listing did not change since we stored the
+        checkpoint - otherwise starts over with a new iterator. Returns None
+        if that failed
+        """
+        checkpoint = section.checkpoint
+        if not checkpoint:
+            return 0
+        if checkpoint['total'] == section.iterator.total:
+            try:
+                xml = next(section.iterator)
+            except (StopIteration, RuntimeError):
+                pass
+            else:
+                plex_id = utils.cast(int, xml.get('ratingKey'))
+                if plex_id == checkpoint['plex_id']:
+                    LOG.info('Resuming interrupted sync of section %s after '
+                             'position %s of %s', section,
+                             checkpoint['position'], checkpoint['total'])
+                    return checkpoint['position'] + 1
+        LOG.info('PMS items changed since the sync of section %s was '
+                 'interrupted. Starting over', section)
+        section.checkpoint = None
+        try:
+            section.iterator = PF.get_section_iterator(
+                section.section_id,
+                plex_type=section.plex_type,
+                updated_at=section.updated_at)
+        except RuntimeError:
+            LOG.error('Error getting section iterator %s', section)
+            return
+        return 0
+
     def _process_section(self, section):
         # Initialize only once to avoid loosing the last value before we're
         # breaking the for loop
@@ -34,8 +100,15 @@ class FillMetadataQueue(common.LibrarySyncMixin,
                   section, section.number_of_items)
         count = 0
         do_process_section = False
-        with PlexDB(lock=False, copy=True) as plexdb:
-            for xml in section.iterator:
+        start = self._resume(section)
+        if start is None:
+            self.successful = False
+            section.number_of_items = 0
+            return
+        section.number_of_items = section.iterator.total - start
+        checksums = self._checksum_index(section)
+        try:
+            for position, xml in enumerate(section.iterator, start):
                 if self.should_cancel():
                     break
                 plex_id = int(xml.get('ratingKey'))
@@ -43,23 +116,51 @@ class FillMetadataQueue(common.LibrarySyncMixin,
                     plex_id,
                     abs(int(xml.get('updatedAt',
                             xml.get('addedAt', '1541572987'))))))
-                if (not self.repair and
-                        plexdb.checksum(plex_id, section.plex_type) == checksum):
+                unchanged = (section.plex_type == v.PLEX_TYPE_SONG or
+                             (not self.repair and
+                              checksums.get(plex_id) == checksum))
+                if unchanged and not self.fused:
                     continue
-                try:
-                    self.get_metadata_queue.put((count, plex_id, section),
-                                                timeout=QUEUE_TIMEOUT)
-                except Full:
-                    LOG.error('Putting %s in get_metadata_queue timed out - '
-                              'aborting sync now', plex_id)
-                    section.sync_successful = False
-                    break
-                count += 1
                 if not do_process_section:
                     do_process_section = True
+                    # Warn the user for this new section if we cannot access
+                    # a file. The download threads validate the paths while
+                    # bundling and might still finish the last section's
+                    # items - they'll merely check one more path
+                    app.SYNC.path_verified = False
                     self.processing_queue.add_section(section)
                     LOG.debug('Put section in queue with %s items: %s',
                               section.number_of_items, section)
+                try:
+                    if unchanged:
+                        self.processing_queue.put(
+                            (count, {'section': section,
+                                     'xml': xml,
+                                     'playstate': True,
+                                     'count': count,
+                                     'position': position,
+                                     'plex_id': plex_id}),
+                            timeout=QUEUE_TIMEOUT)
+                    else:
+                        if section.collections:
+                            # Get all collections before the download
+                            # threads need them
+                            section.collections.prefetch()
+                        self.get_metadata_queue.put(
+                            (count, plex_id, section, position),
+                            timeout=QUEUE_TIMEOUT)
+                except Full:
+                    LOG.error('Putting %s in queue timed out - aborting sync '
+                              'now', plex_id)
+                    section.sync_successful = False
+                    break
+                count += 1
+        except RuntimeError:
+            LOG.error('Could not get all PMS items for section %s', section)
+            section.sync_successful = False
+            self.successful = False
+        # Free the memory of our checksum index for the next section
+        del checksums
         # We might have received LESS items from the PMS than anticipated.
         # Ensures that our queues finish
         LOG.debug('%s items to process for section %s', count, section)
@@ -2,16 +2,22 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, division, unicode_literals
 from logging import getLogger
+from array import array
+from collections import defaultdict
+from itertools import islice
 import Queue
 
 import xbmcgui
 
 from .get_metadata import GetMetadataThread
+from .concurrency import ConcurrencyController
 from .fill_metadata_queue import FillMetadataQueue
 from .process_metadata import ProcessMetadataThread
 from . import common, sections
 from .. import utils, timing, backgroundthread as bg, variables as v, app
-from .. import plex_functions as PF, itemtypes, path_ops
+from .. import plex_functions as PF, itemtypes, path_ops, db
+from ..plex_db import PlexDB, MAPPINGS
+from ..downloadutils import DownloadUtils as DU
 
 if common.PLAYLIST_SYNC_ENABLED:
     from .. import playlists
@@ -48,6 +54,12 @@ class FullSync(common.LibrarySyncMixin, bg.KillableThread):
             self.dialog = None
         self.current_time = timing.plex_now()
         self.last_section = sections.Section()
+        # Sections for which we resumed an interrupted sync
+        self.resumed = []
+        # plex_ids of unchanged PMS items we've seen during the playstate
+        # passes in order to detect the deleted ones. The fused sync marks
+        # them in plex.db right away: {plex_type: array of plex_ids}
+        self.seen = defaultdict(lambda: array(str('l')))
         self.install_sync_done = utils.settings('SyncInstallRunDone') == 'true'
         super(FullSync, self).__init__()
 
@@ -72,8 +84,8 @@ class FullSync(common.LibrarySyncMixin, bg.KillableThread):
         """
         Takes the current plex.db file and copies it to plex-copy.db
         This will allow us to have "concurrent" connections during adding/
-        updating items, increasing sync speed tremendously.
-        Using the same DB with e.g. WAL mode did not really work out...
+        updating items. Only used if the user opted for it - otherwise we're
+        reading a WAL snapshot of plex.db, see db.connect()
         """
         path_ops.copyfile(v.DB_PLEX_PATH, v.DB_PLEX_COPY_PATH)
 
@@ -84,11 +96,16 @@ class FullSync(common.LibrarySyncMixin, bg.KillableThread):
         scanner_thread = FillMetadataQueue(self.repair,
                                            section_queue,
                                            get_metadata_queue,
-                                           processing_queue)
+                                           processing_queue,
+                                           fused=app.SYNC.fused_sync)
         scanner_thread.start()
+        # syncThreadNumber is the upper bound - the controller decides how
+        # many of our download threads may hit the PMS at the same time
+        controller = ConcurrencyController(
+            int(utils.settings('syncThreadNumber')))
         metadata_threads = [
-            GetMetadataThread(get_metadata_queue, processing_queue)
-            for _ in range(int(utils.settings('syncThreadNumber')))
+            GetMetadataThread(get_metadata_queue, processing_queue, controller)
+            for _ in range(controller.max_workers)
         ]
         for t in metadata_threads:
             t.start()
@@ -102,8 +119,10 @@ class FullSync(common.LibrarySyncMixin, bg.KillableThread):
         for t in metadata_threads:
             t.join()
         LOG.debug('Download metadata threads finished')
+        controller.log_stats()
         process_thread.join()
-        self.successful = process_thread.successful
+        self.successful = (process_thread.successful and
+                           scanner_thread.successful)
         LOG.debug('threads finished work. successful: %s', self.successful)
 
     @utils.log_time
@@ -127,9 +146,8 @@ class FullSync(common.LibrarySyncMixin, bg.KillableThread):
                         context.add_update(xml,
                                            section_name=section.name,
                                            section_id=section.section_id)
-                    context.plexdb.update_last_sync(int(xml.attrib['ratingKey']),
-                                                    section.plex_type,
-                                                    self.current_time)
+                    self.seen[section.plex_type].append(
+                        int(xml.attrib['ratingKey']))
                     self.update_progressbar(section, '', section.count - 1)
                     if section.count % PLAYSTATE_BATCH_SIZE == 0:
                         context.commit()
@@ -137,9 +155,25 @@ class FullSync(common.LibrarySyncMixin, bg.KillableThread):
             LOG.error('Could not entirely process section %s', section)
             self.successful = False
 
-    def threaded_get_generators(self, kinds, section_queue, items):
+    @staticmethod
+    def sync_checkpoint(section, updated_at):
+        """
+        Returns the checkpoint of an interrupted sync of section, if that
+        sync used the same PMS listing filter updated_at. Returns None
+        otherwise
+        """
+        with PlexDB(lock=False, snapshot=True) as plexdb:
+            checkpoint = plexdb.sync_checkpoint(section.section_id,
+                                                section.plex_type)
+        if checkpoint and checkpoint['updated_at'] == updated_at:
+            return checkpoint
+
+    def threaded_get_generators(self, kinds, section_queue, items,
+                                resume=False):
         """
-        Getting iterators is costly, so let's do it in a dedicated thread
+        Getting iterators is costly, so let's do it in a dedicated thread.
+        Pass resume=True to let the iterators start at the checkpoint of an
+        interrupted sync
         """
         LOG.debug('Start threaded_get_generators')
         try:
@@ -170,15 +204,27 @@ class FullSync(common.LibrarySyncMixin, bg.KillableThread):
                     elif items == 'updated':
                         updated_at = timestamp
                         last_viewed_at = None
+                    start = 0
+                    if resume:
+                        section.updated_at = updated_at
+                        section.checkpoint = self.sync_checkpoint(section,
+                                                                  updated_at)
+                        if section.checkpoint:
+                            # FillMetadataQueue will verify this position
+                            start = section.checkpoint['position']
+                            self.resumed.append(section)
                     try:
                         section.iterator = PF.get_section_iterator(
                             section.section_id,
                             plex_type=section.plex_type,
                             updated_at=updated_at,
-                            last_viewed_at=last_viewed_at)
+                            last_viewed_at=last_viewed_at,
+                            start=start)
                     except RuntimeError:
                         LOG.error('Sync at least partially unsuccessful!')
                         LOG.error('Error getting section iterator %s', section)
+                        # Never delete the items of this section
+                        self.successful = False
                     else:
                         section.number_of_items = section.iterator.total
                         if section.number_of_items > 0:
@@ -193,6 +239,10 @@ class FullSync(common.LibrarySyncMixin, bg.KillableThread):
             LOG.debug('Exiting threaded_get_generators')
 
     def full_library_sync(self):
+        if self.repair:
+            # The Kodi DB might have lost rows that we think are up-to-date
+            with PlexDB() as plexdb:
+                plexdb.wipe_kodi_digests()
         section_queue = Queue.Queue()
         processing_queue = bg.ProcessingQueue(maxsize=XML_QUEUE_SIZE)
         kinds = [
@@ -206,20 +256,105 @@ class FullSync(common.LibrarySyncMixin, bg.KillableThread):
                 (v.PLEX_TYPE_ARTIST, v.PLEX_TYPE_ARTIST),
                 (v.PLEX_TYPE_ALBUM, v.PLEX_TYPE_ARTIST),
             ])
+            if app.SYNC.fused_sync:
+                # Songs only need their playstates synched and marked
+                kinds.append((v.PLEX_TYPE_SONG, v.PLEX_TYPE_ARTIST))
 
         # ADD NEW ITEMS
         # We need to enforce syncing e.g. show before season before episode
+        # Fused sync: get ALL items once to sync new and changed items,
+        # playstates and to mark all items on the PMS
         bg.FunctionAsTask(self.threaded_get_generators,
                           None,
                           kinds,
                           section_queue,
-                          items='all' if self.repair else 'updated').start()
+                          items='all' if self.repair or app.SYNC.fused_sync
+                          else 'updated',
+                          resume=True).start()
         # Do the heavy lifting
         self.process_new_and_changed_items(section_queue, processing_queue)
         common.update_kodi_library(video=True, music=True)
         if self.should_cancel() or not self.successful:
             return
 
+        if app.SYNC.fused_sync:
+            if not self.sync_playlists():
+                return
+            if not self.playstates_of_resumed_sections():
+                return
+            self.mark_resumed_sections()
+        elif not self.playstate_passes(kinds, section_queue):
+            return
+        self.delete_items()
+
+    def mark_resumed_sections(self):
+        """
+        Fused sync: items that a previously interrupted sync already processed
+        or marked as unchanged are still present on the PMS (or were just
+        recently deleted). Mark them in order to not delete them
+        """
+        with PlexDB() as plexdb:
+            for section in self.resumed:
+                if not section.checkpoint:
+                    # FillMetadataQueue started over and saw every item
+                    continue
+                plexdb.restamp_last_sync(section.plex_type,
+                                         section.section_id,
+                                         section.checkpoint['last_sync'],
+                                         self.current_time)
+
+    def playstates_of_resumed_sections(self):
+        """
+        Fused sync: we skipped the items up to the checkpoint of an
+        interrupted sync. Sync their playstates and userdata now. Returns
+        False if we need to abort the full sync
+        """
+        for section in self.resumed:
+            if self.should_cancel():
+                return False
+            if not section.checkpoint:
+                continue
+            LOG.debug('Syncing playstates of the %s items we skipped for '
+                      'section %s', section.checkpoint['position'] + 1, section)
+            try:
+                iterator = PF.get_section_iterator(
+                    section.section_id,
+                    plex_type=section.plex_type,
+                    updated_at=section.updated_at,
+                    # Don't download ahead beyond the checkpoint
+                    chunks_in_flight=min(
+                        PF.CHUNKS_IN_FLIGHT,
+                        section.checkpoint['position'] // PF.CONTAINERSIZE + 1))
+            except RuntimeError:
+                LOG.error('Error getting section iterator %s', section)
+                self.successful = False
+                return False
+            section.number_of_items = section.checkpoint['position'] + 1
+            section.iterator = islice(iterator, section.number_of_items)
+            section.count = 0
+            self.playstate_per_section(section)
+        return not self.should_cancel() and self.successful
+
+    def sync_playlists(self):
+        """
+        Sync Plex playlists to Kodi and vice-versa. Returns False if we need
+        to abort the full sync
+        """
+        if not common.PLAYLIST_SYNC_ENABLED:
+            return True
+        LOG.debug('Start playlist sync')
+        if self.show_dialog:
+            if self.dialog:
+                self.dialog.close()
+            self.dialog = xbmcgui.DialogProgressBG()
+            # "Synching playlists"
+            self.dialog.create(utils.lang(39715))
+        return playlists.full_sync() and not self.should_cancel()
+
+    def playstate_passes(self, kinds, section_queue):
+        """
+        Returns False if we need to abort the full sync
+        """
         # In order to not delete all your songs again for playstate synch
         if app.SYNC.enable_music:
             kinds.extend([
@@ -237,19 +372,10 @@ class FullSync(common.LibrarySyncMixin, bg.KillableThread):
                           items='watched').start()
         self.processing_loop_playstates(section_queue)
         if self.should_cancel() or not self.successful:
-            return
+            return False
 
-        # Sync Plex playlists to Kodi and vice-versa
-        if common.PLAYLIST_SYNC_ENABLED:
-            LOG.debug('Start playlist sync')
-            if self.show_dialog:
-                if self.dialog:
-                    self.dialog.close()
-                self.dialog = xbmcgui.DialogProgressBG()
-                # "Synching playlists"
-                self.dialog.create(utils.lang(39715))
-            if not playlists.full_sync() or self.should_cancel():
-                return
+        if not self.sync_playlists():
+            return False
 
         # SYNC PLAYSTATE of ALL items (otherwise we won't pick up on items that
         # were set to unwatched or changed user ratings). Also mark all items on
@@ -266,9 +392,9 @@ class FullSync(common.LibrarySyncMixin, bg.KillableThread):
                           section_queue,
                           items='all').start()
         self.processing_loop_playstates(section_queue)
-        if self.should_cancel() or not self.successful:
-            return
+        return not self.should_cancel() and self.successful
 
+    def delete_items(self):
         # Delete movies that are not on Plex anymore
         LOG.debug('Looking for items to delete')
         kinds = [
@@ -285,18 +411,22 @@ class FullSync(common.LibrarySyncMixin, bg.KillableThread):
             ])
         for plex_type, context in kinds:
             # Delete movies that are not on Plex anymore
-            while True:
-                with context(self.current_time) as ctx:
-                    plex_ids = list(
-                        ctx.plexdb.plex_id_by_last_sync(plex_type,
-                                                        self.current_time,
-                                                        DELETION_BATCH_SIZE))
-                    for plex_id in plex_ids:
-                        if self.should_cancel():
-                            return
-                        ctx.remove(plex_id, plex_type)
-                if len(plex_ids) < DELETION_BATCH_SIZE:
-                    break
+            with context(self.current_time) as ctx:
+                # Delete orphaned Kodi files, paths, genres etc. in one go
+                ctx.kodidb.defer_orphan_gc()
+                # Items that we synced during this sync carry the current
+                # time. Everything else must be among the items we've seen
+                ctx.plexdb.set_seen(self.seen.pop(plex_type, ()))
+                plex_ids = ctx.plexdb.plex_ids_not_seen(plex_type,
+                                                        self.current_time)
+                ctx.plexdb.update_last_sync_seen(plex_type, self.current_time)
+                LOG.debug('Deleting %s %s items', len(plex_ids), plex_type)
+                for i, plex_id in enumerate(plex_ids, 1):
+                    if self.should_cancel():
+                        return
+                    ctx.remove(plex_id, plex_type)
+                    if i % DELETION_BATCH_SIZE == 0:
+                        ctx.commit()
         LOG.debug('Done looking for items to delete')
 
     @utils.log_time
@@ -305,10 +435,16 @@ class FullSync(common.LibrarySyncMixin, bg.KillableThread):
             # Get latest Plex libraries and build playlist and video node files
             if self.should_cancel() or not sections.sync_from_pms(self):
                 return
-            self.copy_plex_db()
+            if app.SYNC.copy_plex_db:
+                self.copy_plex_db()
             self.full_library_sync()
+            if self.successful and not self.should_cancel():
+                MAPPINGS.warm()
         finally:
             common.update_kodi_library(video=True, music=True)
+            db.log_contention()
+            db.release_pool()
+            DU().log_connection_stats()
             if self.dialog:
                 self.dialog.close()
             if not self.successful and not self.should_cancel():
@@ -1,66 +1,61 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, division, unicode_literals
 from logging import getLogger
+import Queue
+from time import time
 
 from . import common
 from ..plex_api import API
-from .. import backgroundthread, plex_functions as PF, utils, variables as v
+from .. import backgroundthread, plex_functions as PF, utils, app, \
+    variables as v
 
 LOG = getLogger('PLEX.sync.get_metadata')
-LOCK = backgroundthread.threading.Lock()
+# How many times do we try an item if the PMS returns 401 (PMS under strain).
+# We're backing off exponentially, up to MAX_BACKOFF seconds between attempts
+ATTEMPTS_ON_401 = 10
 
 
 class GetMetadataThread(common.LibrarySyncMixin,
                         backgroundthread.KillableThread):
     """
     Threaded download of Plex XML metadata for a certain library item.
-    Fills the queue with the downloaded etree XML objects
+    Fills the queue with the downloaded etree XML objects. Will download up to
+    app.SYNC.metadata_batch_size items with one single PMS request. The
+    ConcurrencyController controller decides whether this thread may download
+    or is parked for now
     """
-    def __init__(self, get_metadata_queue, processing_queue):
+    def __init__(self, get_metadata_queue, processing_queue, controller):
         self.get_metadata_queue = get_metadata_queue
         self.processing_queue = processing_queue
+        self.controller = controller
         super(GetMetadataThread, self).__init__()
 
-    def _collections(self, item):
-        api = API(item['xml'][0])
-        collection_match = item['section'].collection_match
-        collection_xmls = item['section'].collection_xmls
-        if collection_match is None:
-            collection_match = PF.collections(api.library_section_id())
-            if collection_match is None:
-                LOG.error('Could not download collections')
-                return
-            # Extract what we need to know
-            collection_match = \
-                [(utils.cast(int, x.get('index')),
-                  utils.cast(int, x.get('ratingKey'))) for x in collection_match]
+    @staticmethod
+    def _collections(item):
+        """
+        Looks up the xml of every Plex collection the movie belongs to. Never
+        blocks once the section's CollectionCache is filled
+        """
         item['children'] = {}
-        for plex_set_id, set_name in api.collections():
-            if self.should_cancel():
-                return
-            if plex_set_id not in collection_xmls:
-                # Get Plex metadata for collections - a pain
-                for index, collection_plex_id in collection_match:
-                    if index == plex_set_id:
-                        collection_xml = PF.GetPlexMetadata(collection_plex_id)
-                        try:
-                            collection_xml[0].attrib
-                        except (TypeError, IndexError, AttributeError):
-                            LOG.error('Could not get collection %s %s',
-                                      collection_plex_id, set_name)
-                            continue
-                        collection_xmls[plex_set_id] = collection_xml
-                        break
-                else:
-                    LOG.error('Did not find Plex collection %s %s',
-                              plex_set_id, set_name)
-                    continue
-            item['children'][plex_set_id] = collection_xmls[plex_set_id]
+        for plex_set_id, set_name in API(item['xml'][0]).collections():
+            try:
+                collection_xml = item['section'].collections.get(plex_set_id)
+            except RuntimeError:
+                LOG.warn('Could not get Plex collection %s %s',
+                         plex_set_id, set_name)
+                # Don't record the section as successfully synced
+                item['section'].sync_successful = False
+                continue
+            if collection_xml is None:
+                LOG.error('Did not find Plex collection %s %s',
+                          plex_set_id, set_name)
+                continue
+            item['children'][plex_set_id] = collection_xml
 
-    def _process_abort(self, count, section):
+    def _process_abort(self, items):
         # Make sure other threads will also receive sentinel
         self.get_metadata_queue.put(None)
-        if count is not None:
+        for count, _, section, _ in items:
             self._process_skipped_item(count, section)
 
     def _process_skipped_item(self, count, section):
@@ -68,56 +63,189 @@ class GetMetadataThread(common.LibrarySyncMixin,
         # Add a "dummy" item so we're not skipping a beat
         self.processing_queue.put((count, {'section': section, 'xml': None}))
 
+    def _get_batch(self):
+        """
+        Returns a list of up to app.SYNC.metadata_batch_size items of the form
+        (count, plex_id, section, position) from the get_metadata_queue. Will
+        only block for the very first item. The sentinel None, if received,
+        will always be the last entry of the list
+        """
+        batch = [self.get_metadata_queue.get()]
+        while (batch[-1] is not None and
+               len(batch) < app.SYNC.metadata_batch_size):
+            try:
+                batch.append(self.get_metadata_queue.get_nowait())
+            except Queue.Empty:
+                break
+        return batch
+
+    def _timed(self, section, func, *args, **kwargs):
+        """
+        Calls func(*args, **kwargs) for a PMS request and reports the latency
+        and the outcome to our ConcurrencyController. Only None (the PMS did
+        not answer) and 401 count as errors - not e.g. an item that has been
+        deleted in the meantime
+        """
+        start = time()
+        xml = func(*args, **kwargs)
+        self.controller.report(section,
+                               time() - start,
+                               error=xml is None or xml == 401)
+        return xml
+
+    def _download_batch(self, items):
+        """
+        Downloads the xml metadata for all items with one single PMS request.
+        Returns a dict {plex_id: xml}, which might be empty if something went
+        wrong
+        """
+        if len(items) < 2:
+            return {}
+        xmls = self._timed(items[0][2],
+                           PF.get_plex_metadata_batch,
+                           [x[1] for x in items])
+        if xmls is None or xmls == 401:
+            LOG.warn('Batched download of %s items failed with %s, falling '
+                     'back to single requests', len(items), xmls)
+            return {}
+        return xmls
+
+    def _download_item(self, plex_id, section):
+        """
+        Downloads the xml metadata for a single item. Returns False if the
+        item does not exist.
+
+        If the PMS returns 401, parks this thread without occupying a download
+        slot, backs off and retries. Returns 401 if that did not help
+        """
+        for attempt in range(1, ATTEMPTS_ON_401 + 1):
+            xml = self._timed(section, PF.GetPlexMetadata, plex_id,
+                              missing=False)
+            if (xml != 401 or attempt == ATTEMPTS_ON_401 or
+                    self.should_cancel()):
+                break
+            LOG.warn('HTTP 401 returned by PMS for %s, backing off', plex_id)
+            # Let other threads download while we're waiting
+            self.controller.release()
+            try:
+                self.sleep(self.controller.backoff())
+            finally:
+                self.controller.acquire(self)
+        return xml
+
+    @staticmethod
+    def _bundle(item):
+        """
+        Transforms the downloaded xml into the row bundle the
+        ProcessMetadataThread will write to the DBs - so that our single DB
+        writer thread does not need to parse any xml. Returns False if
+        something went wrong
+        """
+        try:
+            item['bundle'] = item['section'].context.bundle(
+                item['xml'][0],
+                item['section'].section_id,
+                item['children'])
+        except Exception:
+            LOG.error('Could not process the metadata of %s. Skipping item '
+                      'for now', item['plex_id'])
+            utils.ERROR()
+            return False
+        return True
+
     def _run(self):
         while True:
-            item = self.get_metadata_queue.get()
+            batch = self._get_batch()
             try:
-                if item is None or self.should_cancel():
-                    self._process_abort(item[0] if item else None,
-                                        item[2] if item else None)
-                    break
-                count, plex_id, section = item
-                item = {
-                    'xml': PF.GetPlexMetadata(plex_id),  # This will block
-                    'children': None,
-                    'section': section
-                }
-                if item['xml'] is None:
-                    # Did not receive a valid XML - skip that item for now
-                    LOG.error("Could not get metadata for %s. Skipping item "
-                              "for now", plex_id)
-                    self._process_skipped_item(count, section)
-                    continue
-                elif item['xml'] == 401:
-                    LOG.error('HTTP 401 returned by PMS. Too much strain? '
-                              'Cancelling sync for now')
-                    utils.window('plex_scancrashed', value='401')
-                    self._process_abort(count, section)
-                    break
-                if section.plex_type == v.PLEX_TYPE_MOVIE:
-                    # Check for collections/sets
-                    collections = False
-                    for child in item['xml'][0]:
-                        if child.tag == 'Collection':
-                            collections = True
-                            break
-                    if collections:
-                        with LOCK:
-                            self._collections(item)
-                if section.get_children:
-                    if self.should_cancel():
-                        self._process_abort(count, section)
+                # Park here if the PMS is already busy enough
+                self.controller.acquire(self)
+                try:
+                    if not self._process_batch(batch):
                         break
-                    children_xml = PF.GetAllPlexChildren(plex_id)  # Will block
-                    try:
-                        children_xml[0].attrib
-                    except (TypeError, IndexError, AttributeError):
-                        LOG.error('Could not get children for Plex id %s',
-                                  plex_id)
-                        self._process_skipped_item(count, section)
-                        continue
-                    else:
-                        item['children'] = children_xml
-                self.processing_queue.put((count, item))
+                finally:
+                    self.controller.release()
             finally:
-                self.get_metadata_queue.task_done()
+                for _ in batch:
+                    self.get_metadata_queue.task_done()
+
+    def _process_batch(self, batch):
+        """
+        Returns False if this thread should exit
+        """
+        if batch[-1] is None:
+            # Sentinel received - process the rest of the batch first
+            items = batch[:-1]
+        else:
+            items = batch
+        if self.should_cancel():
+            self._process_abort(items)
+            return False
+        xmls = self._download_batch(items)
+        for i, (count, plex_id, section, position) in enumerate(items):
+            if self.should_cancel():
+                self._process_abort(items[i:])
+                return False
+            xml = xmls.get(plex_id)
+            if xml is None:
+                # Fall back to downloading this item on its own
+                xml = self._download_item(plex_id, section)  # This will block
+            if xml is None:
+                # Did not receive a valid XML - skip that item for now
+                LOG.error("Could not get metadata for %s. Skipping item "
+                          "for now", plex_id)
+                self._process_skipped_item(count, section)
+                continue
+            elif xml is False:
+                LOG.warn('Plex item %s does not exist anymore. Skipping it',
+                         plex_id)
+                self._process_skipped_item(count, section)
+                continue
+            elif xml == 401:
+                # Skip only this item - our next sync will pick it up
+                LOG.error('HTTP 401 returned by PMS for %s even after backing '
+                          'off. Too much strain? Skipping item for now',
+                          plex_id)
+                self._process_skipped_item(count, section)
+                continue
+            item = {
+                'xml': xml,
+                'children': None,
+                'section': section,
+                'count': count,
+                'position': position,
+                'plex_id': plex_id
+            }
+            if section.plex_type == v.PLEX_TYPE_MOVIE:
+                # Check for collections/sets
+                collections = False
+                for child in item['xml'][0]:
+                    if child.tag == 'Collection':
+                        collections = True
+                        break
+                if collections:
+                    self._collections(item)
+            if section.get_children:
+                if self.should_cancel():
+                    self._process_abort(items[i:])
+                    return False
+                children_xml = self._timed(section,
+                                           PF.GetAllPlexChildren,
+                                           plex_id)  # Will block
+                try:
+                    children_xml[0].attrib
+                except (TypeError, IndexError, AttributeError):
+                    LOG.error('Could not get children for Plex id %s',
+                              plex_id)
+                    self._process_skipped_item(count, section)
+                    continue
+                else:
+                    item['children'] = children_xml
+            if not self._bundle(item):
+                self._process_skipped_item(count, section)
+                continue
+            self.processing_queue.put((count, item))
+        if len(items) < len(batch):
+            # Make sure other threads will also receive the sentinel
+            self.get_metadata_queue.put(None)
+            return False
+        return True
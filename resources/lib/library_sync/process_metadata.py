@@ -4,34 +4,93 @@ from logging import getLogger
 
 from . import common, sections
 from ..plex_db import PlexDB
-from .. import backgroundthread, app
+from .. import backgroundthread, db
 
 LOG = getLogger('PLEX.sync.process_metadata')
 
 COMMIT_TO_DB_EVERY_X_ITEMS = 500
+# Commit at least this often if Kodi is contending for its DB
+MIN_COMMIT_TO_DB_EVERY_X_ITEMS = 25
 
 
 class ProcessMetadataThread(common.LibrarySyncMixin,
                             backgroundthread.KillableThread):
     """
-    Invoke once in order to process the received PMS metadata xmls
+    Invoke once in order to process the received PMS metadata xmls.
+
+    Persists a checkpoint for the section we're processing in plex.db with
+    every commit: the position and plex_id of the PMS item up to which all
+    items have been processed. An interrupted sync can thus be resumed, see
+    FillMetadataQueue
     """
     def __init__(self, current_time, processing_queue, update_progressbar):
         self.current_time = current_time
         self.processing_queue = processing_queue
         self.update_progressbar = update_progressbar
+        # plex_ids of unchanged items we did not yet mark in plex.db
+        self._seen = []
         self.last_section = sections.Section()
         self.successful = True
+        # Commit more often if Kodi (e.g. its library scanner) needs to
+        # access the DB while we're writing, see _adapt_commit_interval()
+        self.commit_every = COMMIT_TO_DB_EVERY_X_ITEMS
+        self._blocked = {}
+        # Time marks for the next delta sync: {section_id: last_sync}
+        self._last_syncs = {}
+        self._reset_checkpoint()
         super(ProcessMetadataThread, self).__init__()
 
+    def _reset_checkpoint(self):
+        # count of the next item that we need in order to advance our
+        # checkpoint
+        self._next_count = 0
+        # Processed items with a higher count: {count: (position, plex_id)}
+        self._processed = {}
+        self._checkpoint = None
+        self._saved_checkpoint = None
+
+    def _advance_checkpoint(self, item):
+        """
+        Download threads deliver items out of order. Advances our checkpoint
+        to the highest position up to which every item has been processed.
+        Skipped items will thus stall the checkpoint
+        """
+        self._processed[item['count']] = (item['position'], item['plex_id'])
+        while self._next_count in self._processed:
+            self._checkpoint = self._processed.pop(self._next_count)
+            self._next_count += 1
+
+    def _save_checkpoint(self, plexdb, section):
+        """
+        Call before committing to plex.db. Marks the unchanged items we've
+        seen in the same transaction - a resumed sync skips them and must not
+        delete them
+        """
+        if self._seen:
+            plexdb.set_seen(self._seen)
+            plexdb.update_last_sync_seen(section.plex_type, self.current_time)
+            self._seen = []
+        if self._checkpoint == self._saved_checkpoint:
+            return
+        plexdb.set_sync_checkpoint(section.section_id,
+                                   section.plex_type,
+                                   section.updated_at,
+                                   section.iterator.total,
+                                   self._checkpoint[0],
+                                   self._checkpoint[1],
+                                   # Items synced by an interrupted sync
+                                   section.checkpoint['last_sync']
+                                   if section.checkpoint
+                                   else self.current_time)
+        self._saved_checkpoint = self._checkpoint
+
     def start_section(self, section):
         if section != self.last_section:
             if self.last_section:
                 self.finish_last_section()
             LOG.debug('Start or continue processing section %s', section)
             self.last_section = section
-            # Warn the user for this new section if we cannot access a file
-            app.SYNC.path_verified = False
+            self._reset_checkpoint()
         else:
             LOG.debug('Resume processing section %s', section)
 
@@ -40,16 +99,61 @@ class ProcessMetadataThread(common.LibrarySyncMixin,
                 self.last_section.sync_successful):
             # Check for should_cancel() because we cannot be sure that we
             # processed every item of the section
+            section_id = self.last_section.section_id
+            checkpoint = self.last_section.checkpoint
+            # If we resumed an interrupted sync, we skipped items that might
+            # have changed since - let the next sync look at them again. Mind
+            # the other plex_types of the same section, e.g. seasons
+            self._last_syncs[section_id] = min(
+                self._last_syncs.get(section_id, self.current_time),
+                checkpoint['last_sync'] if checkpoint else self.current_time)
             with PlexDB() as plexdb:
                 # Set the new time mark for the next delta sync
-                plexdb.update_section_last_sync(self.last_section.section_id,
-                                                self.current_time)
+                plexdb.update_section_last_sync(section_id,
+                                                self._last_syncs[section_id])
+                # No need to resume anything
+                plexdb.remove_sync_checkpoint(self.last_section.section_id,
+                                              self.last_section.plex_type)
             LOG.info('Finished processing section successfully: %s',
                      self.last_section)
         elif self.last_section and not self.last_section.sync_successful:
             LOG.warn('Sync not successful for section %s', self.last_section)
             self.successful = False
 
+    def _adapt_commit_interval(self, context):
+        """
+        Halves the number of items per transaction if our writes to the Kodi
+        DB were blocked since our last commit. Grows it back towards
+        COMMIT_TO_DB_EVERY_X_ITEMS otherwise
+        """
+        db_kind = context.kodidb.db_kind
+        blocked = db.blocked_count(db_kind)
+        if blocked > self._blocked.get(db_kind, 0):
+            commit_every = max(self.commit_every // 2,
+                               MIN_COMMIT_TO_DB_EVERY_X_ITEMS)
+        else:
+            commit_every = min(self.commit_every * 2,
+                               COMMIT_TO_DB_EVERY_X_ITEMS)
+        self._blocked[db_kind] = blocked
+        if commit_every != self.commit_every:
+            LOG.debug('Committing to the %s DB every %s items instead of %s',
+                      db_kind, commit_every, self.commit_every)
+            self.commit_every = commit_every
+
+    def process_playstate(self, context, section, xml):
+        """
+        Fused full sync: xml is the PMS listing's xml element of an item that
+        did not change. Only sync its playstate and userdata and mark it as
+        still present on the PMS
+        """
+        self.update_progressbar(section, xml.get('title'), section.count)
+        if not context.update_userdata(xml, section.plex_type):
+            # Somehow did not sync this item yet
+            context.add_update(xml,
+                               section_name=section.name,
+                               section_id=section.section_id)
+        self._seen.append(int(xml.attrib['ratingKey']))
+
     def _get(self):
         item = {'xml': None}
         while item and item['xml'] is None:
@@ -76,17 +180,26 @@ class ProcessMetadataThread(common.LibrarySyncMixin,
                 while not self.should_cancel():
                     if item is None or item['section'] != section:
                         break
-                    self.update_progressbar(section,
-                                            item['xml'][0].get('title'),
-                                            section.count)
-                    context.add_update(item['xml'][0],
-                                       section_name=section.name,
-                                       section_id=section.section_id,
-                                       children=item['children'])
+                    if item.get('playstate'):
+                        self.process_playstate(context, section, item['xml'])
+                    else:
+                        self.update_progressbar(section,
+                                                item['xml'][0].get('title'),
+                                                section.count)
+                        # Row bundle already built by GetMetadataThread
+                        context.add_update_bundle(
+                            item['bundle'],
+                            section_name=section.name,
+                            section_id=section.section_id)
+                    self._advance_checkpoint(item)
                     processed += 1
                     section.count += 1
-                    if processed == COMMIT_TO_DB_EVERY_X_ITEMS:
+                    if processed >= self.commit_every:
                         processed = 0
+                        self._save_checkpoint(context.plexdb, section)
                         context.commit()
+                        self._adapt_commit_interval(context)
                     item = self._get()
+                # Committed when leaving the context
+                self._save_checkpoint(context.plexdb, section)
         self.finish_last_section()
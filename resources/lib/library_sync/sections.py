@@ -5,6 +5,7 @@ from logging import getLogger
 import copy
 
 from . import nodes
+from .collection_cache import CollectionCache
 from ..plex_db import PlexDB
 from ..plex_api import API
 from .. import kodi_db
@@ -462,17 +463,20 @@ def get_sync_section(section, plex_type):
     # Some more init stuff
     # Has sync for this section been successful?
     section.sync_successful = True
-    # List of tuples: (collection index [as in an item's metadata with
-    # "Collection id"], collection plex id)
-    section.collection_match = None
-    # Dict with entries of the form <collection index>: <collection xml>
-    section.collection_xmls = {}
+    # All Plex collections of this section, shared by all sync threads
+    section.collections = CollectionCache(section.section_id) \
+        if plex_type == v.PLEX_TYPE_MOVIE else None
     # Keep count during sync
     section.count = 0
     # Total number of items that we need to sync
     section.number_of_items = 0
     # Iterator to get one sync item after the other
     section.iterator = None
+    # updatedAt filter used for the iterator's PMS listing
+    section.updated_at = None
+    # Checkpoint dict of an interrupted sync we're resuming, see
+    # PlexDB.sync_checkpoint()
+    section.checkpoint = None
     return section
 
 
@@ -530,10 +534,12 @@ def _delete_kodi_db_items(section):
         types = ()
         LOG.debug('Skipping deletion of DB elements for section %s', section)
     for plex_type, context in types:
+        last_plex_id = 0
         while True:
             with PlexDB() as plexdb:
                 plex_ids = list(plexdb.plexid_by_sectionid(section.section_id,
                                                            plex_type,
+                                                           last_plex_id,
                                                            BATCH_SIZE))
                 with kodi_context(texture_db=True) as kodidb:
                     typus = context(None, plexdb=plexdb, kodidb=kodidb)
@@ -543,6 +549,7 @@ def _delete_kodi_db_items(section):
                         typus.remove(plex_id)
             if len(plex_ids) < BATCH_SIZE:
                 break
+            last_plex_id = plex_ids[-1]
     return True
 
 
@@ -6,7 +6,7 @@ from logging import getLogger
 from .common import update_kodi_library, PLAYLIST_SYNC_ENABLED
 from .fanart import SYNC_FANART, FanartTask
 from ..plex_api import API
-from ..plex_db import PlexDB
+from ..plex_db import MAPPINGS
 from .. import kodi_db
 from .. import backgroundthread, plex_functions as PF, itemtypes
 from .. import artwork, utils, timing, variables as v, app
@@ -133,6 +133,8 @@ def process_new_item_message(message):
 def process_delete_message(message):
     plex_type = message['plex_type']
     with itemtypes.ITEMTYPE_FROM_PLEXTYPE[plex_type](None) as typus:
+        # A show might come with thousands of episodes
+        typus.kodidb.defer_orphan_gc()
         typus.remove(message['plex_id'], plex_type=plex_type)
     return True, plex_type in v.PLEX_VIDEOTYPES, plex_type in v.PLEX_AUDIOTYPES
 
@@ -212,8 +214,7 @@ def store_activity_message(data):
             # Likely a Plex id like /library/metadata/3/children
             continue
         # We're only looking at existing elements - have we synced yet?
-        with PlexDB(lock=False) as plexdb:
-            typus = plexdb.item_by_id(plex_id, plex_type=None)
+        typus = MAPPINGS.by_plex_id(plex_id)
         if not typus:
             LOG.debug('plex_id %s not synced yet - skipping', plex_id)
             continue
@@ -225,7 +226,7 @@ def store_activity_message(data):
             # Haven't added this element to the queue yet
             WEBSOCKET_MESSAGES.append({
                 'state': None,  # Don't need a state here
-                'plex_type': typus['plex_type'],
+                'plex_type': typus.plex_type,
                 'plex_id': plex_id,
                 'timestamp': timing.unix_timestamp(),
                 'attempt': 0
@@ -257,9 +258,8 @@ def process_playing(data):
         session_key = message['sessionKey']
         # Do we already have a sessionKey stored?
         if session_key not in PLAYSTATE_SESSIONS:
-            with PlexDB(lock=False) as plexdb:
-                typus = plexdb.item_by_id(plex_id, plex_type=None)
-            if not typus or 'kodi_fileid' not in typus:
+            typus = MAPPINGS.by_plex_id(plex_id)
+            if not typus or typus.kodi_fileid is None:
                 # Item not (yet) in Kodi library or not affiliated with a file
                 continue
             if utils.settings('plex_serverowned') == 'false':
@@ -277,13 +277,10 @@ def process_playing(data):
                 LOG.debug('Updated current sessions. They are: %s',
                           PLAYSTATE_SESSIONS)
             # Attach Kodi info to the session
-            PLAYSTATE_SESSIONS[session_key]['kodi_fileid'] = typus['kodi_fileid']
-            if typus['plex_type'] == v.PLEX_TYPE_EPISODE:
-                PLAYSTATE_SESSIONS[session_key]['kodi_fileid_2'] = typus['kodi_fileid_2']
-            else:
-                PLAYSTATE_SESSIONS[session_key]['kodi_fileid_2'] = None
-            PLAYSTATE_SESSIONS[session_key]['kodi_id'] = typus['kodi_id']
-            PLAYSTATE_SESSIONS[session_key]['kodi_type'] = typus['kodi_type']
+            PLAYSTATE_SESSIONS[session_key]['kodi_fileid'] = typus.kodi_fileid
+            PLAYSTATE_SESSIONS[session_key]['kodi_fileid_2'] = typus.kodi_fileid_2
+            PLAYSTATE_SESSIONS[session_key]['kodi_id'] = typus.kodi_id
+            PLAYSTATE_SESSIONS[session_key]['kodi_type'] = typus.kodi_type
         session = PLAYSTATE_SESSIONS[session_key]
         if utils.settings('plex_serverowned') != 'false':
             # Identify the user - same one as signed on with PKC? Skip
@@ -361,12 +358,11 @@ def cache_artwork(plex_id, plex_type, kodi_id=None, kodi_type=None):
     if not CACHING_ENALBED:
         return
     if not kodi_id:
-        with PlexDB(lock=False) as plexdb:
-            item = plexdb.item_by_id(plex_id, plex_type)
+        item = MAPPINGS.by_plex_id(plex_id, plex_type)
         if not item:
             LOG.error('Could not retrieve Plex db info for %s', plex_id)
             return
-        kodi_id, kodi_type = item['kodi_id'], item['kodi_type']
+        kodi_id, kodi_type = item.kodi_id, item.kodi_type
     with kodi_db.KODIDB_FROM_PLEXTYPE[plex_type]() as kodidb:
         for url in kodidb.art_urls(kodi_id, kodi_type):
             artwork.cache_url(url)
@@ -11,7 +11,7 @@ import datetime
 import xbmc
 
 from .plex_api import API
-from .plex_db import PlexDB
+from .plex_db import MAPPINGS
 from .kodi_db import KodiVideoDB
 from . import plex_functions as PF, playlist_func as PL, playqueue as PQ
 from . import json_rpc as js, variables as v, utils, transfer
@@ -333,10 +333,9 @@ def _prep_playlist_stack(xml, resume):
                 api.plex_type not in (v.PLEX_TYPE_CLIP, v.PLEX_TYPE_EPISODE)):
             # If user chose to play via PMS or force transcode, do not
             # use the item path stored in the Kodi DB
-            with PlexDB(lock=False) as plexdb:
-                db_item = plexdb.item_by_id(api.plex_id, api.plex_type)
-            kodi_id = db_item['kodi_id'] if db_item else None
-            kodi_type = db_item['kodi_type'] if db_item else None
+            db_item = MAPPINGS.by_plex_id(api.plex_id, api.plex_type)
+            kodi_id = db_item.kodi_id if db_item else None
+            kodi_type = db_item.kodi_type if db_item else None
         else:
             # We will never store clips (trailers) in the Kodi DB.
             # Also set kodi_id to None for playback via PMS, so that we're
@@ -418,11 +417,10 @@ def _use_kodi_db_offset(plex_id, plex_type, plex_offset):
     """
     if plex_type not in (v.PLEX_TYPE_MOVIE, v.PLEX_TYPE_EPISODE):
         return plex_offset
-    with PlexDB(lock=False) as plexdb:
-        db_item = plexdb.item_by_id(plex_id, plex_type)
+    db_item = MAPPINGS.by_plex_id(plex_id, plex_type)
     if db_item:
         with KodiVideoDB(lock=False) as kodidb:
-            return kodidb.get_resume(db_item['kodi_fileid'])
+            return kodidb.get_resume(db_item.kodi_fileid)
     else:
         return plex_offset
 
@@ -4,6 +4,7 @@
 plex_api interfaces with all Plex Media Server (and plex.tv) xml responses
 """
 from __future__ import absolute_import, division, unicode_literals
+from collections import defaultdict
 
 from .base import Base
 from .artwork import Artwork
@@ -26,7 +27,18 @@ def mass_api(xml):
     this process for several PMS items!)
     """
     apis = [API(x) for x in xml]
+    by_type = defaultdict(list)
+    for api in apis:
+        by_type[api.plex_type].append(api)
     with PlexDB(lock=False) as plexdb:
-        for api in apis:
-            api.check_db(plexdb=plexdb)
+        for plex_type, typed_apis in by_type.iteritems():
+            if plex_type is None:
+                # Need to look up every single plex_type first
+                for api in typed_apis:
+                    api.check_db(plexdb=plexdb)
+                continue
+            db_items = plexdb.items_by_ids((x.plex_id for x in typed_apis),
+                                           plex_type)
+            for api in typed_apis:
+                api.set_db_item(db_items.get(api.plex_id))
     return apis
@@ -159,6 +159,14 @@ class Base(object):
         else:
             with PlexDB(lock=False) as plexdb:
                 db_item = plexdb.item_by_id(self.plex_id, self.plex_type)
+        self.set_db_item(db_item)
+
+    def set_db_item(self, db_item):
+        """
+        Sets the Kodi info we looked up in the Plex DB, e.g. with
+        PlexDB().item_by_id(). Pass in None if we did not sync the item
+        """
+        self._checked_db = True
         if not db_item:
             return
         self._section_id = db_item['section_id']
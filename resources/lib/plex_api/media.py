@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, division, unicode_literals
 from logging import getLogger
+from threading import Lock
 
 from ..utils import cast
 from ..downloadutils import DownloadUtils as DU
@@ -9,6 +10,9 @@ from .. import utils, variables as v, app, path_ops, clientinfo
 from .. import plex_functions as PF
 
 LOG = getLogger('PLEX.api')
+# Several sync threads might validate paths at the same time - make sure we're
+# only asking the user once
+VALIDATE_LOCK = Lock()
 
 
 class Media(object):
@@ -361,36 +365,40 @@ class Media(object):
         if (app.SYNC.path_verified and not force_check) or omit_check:
             return path
 
-        # exist() needs a / or \ at the end to work for directories
-        if not folder:
-            # files
-            check = path_ops.exists(path)
-        else:
-            # directories
-            if "\\" in path:
-                if not path.endswith('\\'):
-                    # Add the missing backslash
-                    check = path_ops.exists(path + "\\")
-                else:
-                    check = path_ops.exists(path)
+        with VALIDATE_LOCK:
+            if app.SYNC.path_verified and not force_check:
+                # Another thread verified the path in the meantime
+                return path
+            # exist() needs a / or \ at the end to work for directories
+            if not folder:
+                # files
+                check = path_ops.exists(path)
             else:
-                if not path.endswith('/'):
-                    check = path_ops.exists(path + "/")
+                # directories
+                if "\\" in path:
+                    if not path.endswith('\\'):
+                        # Add the missing backslash
+                        check = path_ops.exists(path + "\\")
+                    else:
+                        check = path_ops.exists(path)
+                else:
+                    if not path.endswith('/'):
+                        check = path_ops.exists(path + "/")
+                    else:
+                        check = path_ops.exists(path)
+            if not check:
+                if force_check is False:
+                    # Validate the path is correct with user intervention
+                    if self.ask_to_validate(path):
+                        app.APP.stop_threads(block=False)
+                        path = None
+                    app.SYNC.path_verified = True
                 else:
-                    check = path_ops.exists(path)
-        if not check:
-            if force_check is False:
-                # Validate the path is correct with user intervention
-                if self.ask_to_validate(path):
-                    app.APP.stop_threads(block=False)
                     path = None
+            elif not force_check:
+                # Only set the flag if we were not force-checking the path
                 app.SYNC.path_verified = True
-            else:
-                path = None
-        elif not force_check:
-            # Only set the flag if we were not force-checking the path
-            app.SYNC.path_verified = True
-        return path
+            return path
 
     @staticmethod
     def ask_to_validate(url):
@@ -3,6 +3,7 @@
 from __future__ import absolute_import, division, unicode_literals
 
 from .common import PlexDBBase, initialize, wipe, PLEXDB_LOCK
+from .mapping import MAPPINGS
 from .tvshows import TVShows
 from .movies import Movies
 from .music import Music
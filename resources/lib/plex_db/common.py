@@ -3,7 +3,8 @@
 from __future__ import absolute_import, division, unicode_literals
 from threading import Lock
 
-from .. import db, variables as v
+from .mapping import MAPPINGS
+from .. import db, app, variables as v
 
 PLEXDB_LOCK = Lock()
 
@@ -16,23 +17,44 @@ SUPPORTED_KODI_TYPES = (
     v.KODI_TYPE_ALBUM,
     v.KODI_TYPE_SONG
 )
+# All the plex_types that we record in the table item_type
+INDEXED_PLEX_TYPES = (
+    v.PLEX_TYPE_MOVIE,
+    v.PLEX_TYPE_SHOW,
+    v.PLEX_TYPE_SEASON,
+    v.PLEX_TYPE_EPISODE,
+    v.PLEX_TYPE_ARTIST,
+    v.PLEX_TYPE_ALBUM,
+    v.PLEX_TYPE_SONG
+)
+# SQLite's default SQLITE_MAX_VARIABLE_NUMBER for versions before 3.32
+MAX_SQL_VARIABLES = 999
 
 
 class PlexDBBase(object):
     """
     Plex database methods used for all types of items.
     """
-    def __init__(self, plexconn=None, lock=True, copy=False):
+    def __init__(self, plexconn=None, lock=True, snapshot=False):
         # Allows us to use this class with a cursor instead of context mgr
         self.plexconn = plexconn
         self.cursor = self.plexconn.cursor() if self.plexconn else None
         self.lock = lock
-        self.copy = copy
+        # Read-only access for the full sync while another thread is writing.
+        # Uses the copied plex-copy.db if the user opted for it
+        self.snapshot = snapshot
+        # plex_ids we added, changed or removed, see invalidate_mappings()
+        self.written_plex_ids = set()
 
     def __enter__(self):
         if self.lock:
             PLEXDB_LOCK.acquire()
-        self.plexconn = db.connect('plex-copy' if self.copy else 'plex')
+        if not self.snapshot:
+            self.plexconn = db.connect('plex')
+        elif app.SYNC.copy_plex_db:
+            self.plexconn = db.connect('plex-copy')
+        else:
+            self.plexconn = db.connect('plex-snapshot')
         self.cursor = self.plexconn.cursor()
         return self
 
@@ -42,8 +64,9 @@ class PlexDBBase(object):
                 # re-raise any exception
                 return False
             self.plexconn.commit()
+            self.invalidate_mappings()
         finally:
-            self.plexconn.close()
+            db.release(self.plexconn)
             if self.lock:
                 PLEXDB_LOCK.release()
 
@@ -79,20 +102,61 @@ class PlexDBBase(object):
             # Will never be synched to Kodi
             pass
         elif plex_type is None:
-            # SLOW - lookup plex_id in all our tables
-            for kind in (v.PLEX_TYPE_MOVIE,
-                         v.PLEX_TYPE_EPISODE,
-                         v.PLEX_TYPE_SHOW,
-                         v.PLEX_TYPE_SEASON,
-                         'song',  # darn
-                         v.PLEX_TYPE_ALBUM,
-                         v.PLEX_TYPE_ARTIST):
-                method = getattr(self, kind)
-                answ = method(plex_id)
-                if answ:
-                    break
+            # Look up the plex_type first
+            plex_type = self.plex_type_by_id(plex_id)
+            if plex_type is not None:
+                answ = self.item_by_id(plex_id, plex_type)
         return answ
 
+    def plex_type_by_id(self, plex_id):
+        """
+        Returns the plex_type of the item with plex_id or None if we have not
+        synced such an item
+        """
+        self.cursor.execute('SELECT plex_type FROM item_type WHERE plex_id = ?',
+                            (plex_id, ))
+        try:
+            return self.cursor.fetchone()[0]
+        except TypeError:
+            pass
+
+    def add_plex_type(self, plex_id, plex_type):
+        """
+        Records plex_type for plex_id in order to look up items without
+        knowing their plex_type. Called by every add_<plex_type> method
+        """
+        self.cursor.execute('''
+            INSERT OR REPLACE INTO item_type(plex_id, plex_type)
+            VALUES (?, ?)
+        ''', (plex_id, plex_type))
+        self.written_plex_ids.add(plex_id)
+
+    def invalidate_mappings(self):
+        """
+        Call after committing: lets the service-wide cache plex_db.MAPPINGS
+        forget all the items we added, changed or removed
+        """
+        if self.written_plex_ids:
+            MAPPINGS.invalidate(self.written_plex_ids)
+            self.written_plex_ids = set()
+
+    def kodi_ids(self, plex_type, limit):
+        """
+        Returns an iterator for tuples (plex_id, kodi_id, kodi_fileid,
+        kodi_fileid_2) for the limit [int] items of plex_type that we synced
+        most recently. kodi_fileid and kodi_fileid_2 are None if plex_type
+        has no such column
+        """
+        query = '''
+            SELECT plex_id, kodi_id, %s, %s FROM %s
+            ORDER BY last_sync DESC
+            LIMIT ?
+        ''' % ('kodi_fileid' if plex_type in (v.PLEX_TYPE_MOVIE,
+                                               v.PLEX_TYPE_EPISODE) else 'NULL',
+               'kodi_fileid_2' if plex_type == v.PLEX_TYPE_EPISODE else 'NULL',
+               plex_type)
+        return self.cursor.execute(query, (limit, ))
+
     def item_by_kodi_id(self, kodi_id, kodi_type):
         """
         """
@@ -104,14 +168,90 @@ class PlexDBBase(object):
         method = getattr(self, 'entry_to_%s' % v.PLEX_TYPE_FROM_KODI_TYPE[kodi_type])
         return method(self.cursor.fetchone())
 
-    def plex_id_by_last_sync(self, plex_type, last_sync, limit):
+    def items_by_ids(self, plex_ids, plex_type):
+        """
+        Returns a dict {plex_id: item} for all the plex_ids [iterable of int]
+        of type plex_type that we synced. Uses one single query for every
+        MAX_SQL_VARIABLES plex_ids instead of one query per item
+        """
+        answ = {}
+        if plex_type not in INDEXED_PLEX_TYPES:
+            return answ
+        plex_ids = list(set(x for x in plex_ids if x is not None))
+        method = getattr(self, 'entry_to_%s' % plex_type)
+        for i in range(0, len(plex_ids), MAX_SQL_VARIABLES):
+            chunk = plex_ids[i:i + MAX_SQL_VARIABLES]
+            self.cursor.execute('SELECT * FROM %s WHERE plex_id IN (%s)'
+                                % (plex_type, ','.join('?' * len(chunk))),
+                                chunk)
+            for entry in self.cursor.fetchall():
+                item = method(entry)
+                answ[item['plex_id']] = item
+        return answ
+
+    def plex_id_by_last_sync(self, plex_type, last_sync, last_plex_id,
+                             limit):
         """
         Returns an iterator for all items where the last_sync is NOT identical
+        Will start with the first plex_id greater than last_plex_id [int] and
+        return limit [int] number of items
         """
         query = '''
-            SELECT plex_id FROM %s WHERE last_sync <> ? LIMIT %s
+            SELECT plex_id FROM %s
+            WHERE last_sync <> ? AND plex_id > ?
+            ORDER BY plex_id
+            LIMIT %s
         ''' % (plex_type, limit)
-        return (x[0] for x in self.cursor.execute(query, (last_sync, )))
+        return (x[0] for x in self.cursor.execute(query,
+                                                  (last_sync, last_plex_id)))
+
+    def set_seen(self, plex_ids):
+        """
+        Stores plex_ids [iterable of int] in the temporary table seen, which
+        only lives as long as this db connection. Replaces any plex_ids that
+        were stored previously
+        """
+        self.cursor.execute('''
+            CREATE TEMP TABLE IF NOT EXISTS seen(
+                plex_id INTEGER PRIMARY KEY)
+        ''')
+        self.cursor.execute('DELETE FROM seen')
+        self.cursor.executemany('INSERT OR IGNORE INTO seen(plex_id) VALUES (?)',
+                                ((x, ) for x in plex_ids))
+
+    def plex_ids_not_seen(self, plex_type, last_sync):
+        """
+        Returns a list of the plex_ids of all items that are neither in the
+        temporary table seen (see set_seen) nor have been synced at last_sync
+        """
+        query = '''
+            SELECT %s.plex_id FROM %s
+            LEFT JOIN seen ON seen.plex_id = %s.plex_id
+            WHERE seen.plex_id IS NULL AND %s.last_sync <> ?
+        ''' % (plex_type, plex_type, plex_type, plex_type)
+        return [x[0] for x in self.cursor.execute(query, (last_sync, ))]
+
+    def update_last_sync_seen(self, plex_type, last_sync):
+        """
+        Sets last_sync for all items in the temporary table seen (see
+        set_seen) at once
+        """
+        query = '''
+            UPDATE %s SET last_sync = ?
+            WHERE plex_id IN (SELECT plex_id FROM seen)
+        ''' % plex_type
+        self.cursor.execute(query, (last_sync, ))
+
+    def restamp_last_sync(self, plex_type, section_id, last_sync,
+                          new_last_sync):
+        """
+        Sets new_last_sync for all items of section_id that have been synced
+        at or after last_sync
+        """
+        query = '''
+            UPDATE %s SET last_sync = ? WHERE section_id = ? AND last_sync >= ?
+        ''' % plex_type
+        self.cursor.execute(query, (new_last_sync, section_id, last_sync))
 
     def checksum(self, plex_id, plex_type):
         """
@@ -124,6 +264,15 @@ class PlexDBBase(object):
         except TypeError:
             pass
 
+    def checksum_index(self, section_id, plex_type):
+        """
+        Returns a dict {plex_id: checksum} for all items of plex_type in the
+        section with section_id - in one go instead of one SELECT per item
+        """
+        self.cursor.execute('SELECT plex_id, checksum FROM %s WHERE section_id = ?' % plex_type,
+                            (section_id, ))
+        return dict(self.cursor)
+
     def update_last_sync(self, plex_id, plex_type, last_sync):
         """
         Sets a new timestamp for plex_id
@@ -136,29 +285,70 @@ class PlexDBBase(object):
         Removes the item from our Plex db
         """
         self.cursor.execute('DELETE FROM %s WHERE plex_id = ?' % plex_type, (plex_id, ))
+        self.cursor.execute('''
+            DELETE FROM kodi_digest WHERE plex_id = ? AND plex_type = ?
+        ''', (plex_id, plex_type))
+        self.cursor.execute('''
+            DELETE FROM item_type WHERE plex_id = ? AND plex_type = ?
+        ''', (plex_id, plex_type))
+        self.written_plex_ids.add(plex_id)
 
-    def every_plex_id(self, plex_type, offset, limit):
+    def kodi_digest(self, plex_id, plex_type, kind):
+        """
+        Returns the tuple (digest, kodi_ids) we stored when we last wrote kind,
+        e.g. 'ratings', of the item to the Kodi DB. Returns None if we don't
+        know
+        """
+        self.cursor.execute('''
+            SELECT digest, kodi_ids FROM kodi_digest
+            WHERE plex_id = ? AND plex_type = ? AND kind = ?
+            LIMIT 1
+        ''', (plex_id, plex_type, kind))
+        return self.cursor.fetchone()
+
+    def set_kodi_digest(self, plex_id, plex_type, kind, digest, kodi_ids):
+        """
+        Stores the digest [unicode] of the data we just wrote to the Kodi DB
+        for kind, e.g. 'ratings', along with the resulting kodi_ids [unicode]
+        """
+        self.cursor.execute('''
+            INSERT OR REPLACE INTO kodi_digest(
+                plex_id, plex_type, kind, digest, kodi_ids)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (plex_id, plex_type, kind, digest, kodi_ids))
+
+    def wipe_kodi_digests(self):
+        """
+        Forgets what we wrote to the Kodi DB - the next sync of every item
+        will thus rewrite e.g. its ratings
+        """
+        self.cursor.execute('DELETE FROM kodi_digest')
+
+    def every_plex_id(self, plex_type, last_plex_id, limit):
         """
         Returns an iterator for plex_type for every single plex_id
-        Will start with records at DB position offset [int] and return limit
-        [int] number of items
+        Will start with the first plex_id greater than last_plex_id [int] and
+        return limit [int] number of items
         """
-        return (x[0] for x in
-                self.cursor.execute('SELECT plex_id FROM %s LIMIT %s OFFSET %s'
-                                    % (plex_type, limit, offset)))
+        query = '''
+            SELECT plex_id FROM %s WHERE plex_id > ? ORDER BY plex_id LIMIT %s
+        ''' % (plex_type, limit)
+        return (x[0] for x in self.cursor.execute(query, (last_plex_id, )))
 
-    def missing_fanart(self, plex_type, offset, limit):
+    def missing_fanart(self, plex_type, last_plex_id, limit):
         """
         Returns an iterator for plex_type for all plex_id, where fanart_synced
         has not yet been set to 1
-        Will start with records at DB position offset [int] and return limit
-        [int] number of items
+        Will start with the first plex_id greater than last_plex_id [int] and
+        return limit [int] number of items
         """
         query = '''
-            SELECT plex_id FROM %s WHERE fanart_synced = 0
-            LIMIT %s OFFSET %s
-        ''' % (plex_type, limit, offset)
-        return (x[0] for x in self.cursor.execute(query))
+            SELECT plex_id FROM %s
+            WHERE fanart_synced = 0 AND plex_id > ?
+            ORDER BY plex_id
+            LIMIT %s
+        ''' % (plex_type, limit)
+        return (x[0] for x in self.cursor.execute(query, (last_plex_id, )))
 
     def set_fanart_synced(self, plex_id, plex_type):
         """
@@ -167,11 +357,20 @@ class PlexDBBase(object):
         self.cursor.execute('UPDATE %s SET fanart_synced = 1 WHERE plex_id = ?' % plex_type,
                             (plex_id, ))
 
-    def plexid_by_sectionid(self, section_id, plex_type, limit):
+    def plexid_by_sectionid(self, section_id, plex_type, last_plex_id, limit):
+        """
+        Returns an iterator for the plex_ids of all items of plex_type in
+        section_id. Will start with the first plex_id greater than
+        last_plex_id [int] and return limit [int] number of items
+        """
         query = '''
-            SELECT plex_id FROM %s WHERE section_id = ? LIMIT %s
+            SELECT plex_id FROM %s
+            WHERE section_id = ? AND plex_id > ?
+            ORDER BY plex_id
+            LIMIT %s
         ''' % (plex_type, limit)
-        return (x[0] for x in self.cursor.execute(query, (section_id, )))
+        return (x[0] for x in self.cursor.execute(query,
+                                                  (section_id, last_plex_id)))
 
     def kodiid_by_sectionid(self, section_id, plex_type):
         return (x[0] for x in
@@ -289,22 +488,69 @@ def initialize():
                     kodi_type TEXT,
                     kodi_hash TEXT)
             ''')
+            plexdb.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS sync_checkpoint(
+                    section_id INTEGER,
+                    plex_type TEXT,
+                    updated_at INTEGER,
+                    total INTEGER,
+                    position INTEGER,
+                    plex_id INTEGER,
+                    last_sync INTEGER,
+                    PRIMARY KEY (section_id, plex_type))
+            ''')
+            plexdb.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS kodi_digest(
+                    plex_id INTEGER,
+                    plex_type TEXT,
+                    kind TEXT,
+                    digest TEXT,
+                    kodi_ids TEXT,
+                    PRIMARY KEY (plex_id, plex_type, kind))
+            ''')
+            # plex_id -> plex_type for all items, see item_by_id()
+            plexdb.cursor.execute('''
+                SELECT name FROM sqlite_master
+                WHERE type = 'table' AND name = 'item_type'
+            ''')
+            migrate = plexdb.cursor.fetchone() is None
+            plexdb.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS item_type(
+                    plex_id INTEGER PRIMARY KEY,
+                    plex_type TEXT)
+            ''')
+            if migrate:
+                # Existing plex.db - record the items we already synced
+                for plex_type in INDEXED_PLEX_TYPES:
+                    plexdb.cursor.execute('''
+                        INSERT OR REPLACE INTO item_type(plex_id, plex_type)
+                        SELECT plex_id, ? FROM %s
+                    ''' % plex_type, (plex_type, ))
             # DB indicees for faster lookups
             commands = (
                 'CREATE INDEX IF NOT EXISTS ix_movie_1 ON movie (last_sync)',
                 'CREATE UNIQUE INDEX IF NOT EXISTS ix_movie_2 ON movie (kodi_id)',
+                'CREATE INDEX IF NOT EXISTS ix_movie_3 ON movie (section_id)',
+                'CREATE INDEX IF NOT EXISTS ix_movie_4 ON movie (fanart_synced)',
                 'CREATE INDEX IF NOT EXISTS ix_show_1 ON show (last_sync)',
                 'CREATE UNIQUE INDEX IF NOT EXISTS ix_show_2 ON show (kodi_id)',
+                'CREATE INDEX IF NOT EXISTS ix_show_3 ON show (section_id)',
+                'CREATE INDEX IF NOT EXISTS ix_show_4 ON show (fanart_synced)',
                 'CREATE INDEX IF NOT EXISTS ix_season_1 ON season (last_sync)',
                 'CREATE UNIQUE INDEX IF NOT EXISTS ix_season_2 ON season (kodi_id)',
+                'CREATE INDEX IF NOT EXISTS ix_season_3 ON season (section_id)',
                 'CREATE INDEX IF NOT EXISTS ix_episode_1 ON episode (last_sync)',
                 'CREATE UNIQUE INDEX IF NOT EXISTS ix_episode_2 ON episode (kodi_id)',
+                'CREATE INDEX IF NOT EXISTS ix_episode_3 ON episode (section_id)',
                 'CREATE INDEX IF NOT EXISTS ix_artist_1 ON artist (last_sync)',
                 'CREATE UNIQUE INDEX IF NOT EXISTS ix_artist_2 ON artist (kodi_id)',
+                'CREATE INDEX IF NOT EXISTS ix_artist_3 ON artist (section_id)',
                 'CREATE INDEX IF NOT EXISTS ix_album_1 ON album (last_sync)',
                 'CREATE UNIQUE INDEX IF NOT EXISTS ix_album_2 ON album (kodi_id)',
+                'CREATE INDEX IF NOT EXISTS ix_album_3 ON album (section_id)',
                 'CREATE INDEX IF NOT EXISTS ix_track_1 ON track (last_sync)',
                 'CREATE UNIQUE INDEX IF NOT EXISTS ix_track_2 ON track (kodi_id)',
+                'CREATE INDEX IF NOT EXISTS ix_track_3 ON track (section_id)',
                 'CREATE UNIQUE INDEX IF NOT EXISTS ix_playlists_2 ON playlists (kodi_path)',
                 'CREATE INDEX IF NOT EXISTS ix_playlists_3 ON playlists (kodi_hash)',
             )
@@ -325,3 +571,5 @@ def wipe(table=None):
             tables = [i[0] for i in plexdb.cursor.fetchall()]
         for table in tables:
             plexdb.cursor.execute('DROP table IF EXISTS %s' % table)
+    # Our cached Kodi ids might not exist anymore
+    MAPPINGS.clear()
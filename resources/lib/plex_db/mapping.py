@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, unicode_literals
+from logging import getLogger
+from threading import Lock
+
+from .. import utils, variables as v
+
+LOG = getLogger('PLEX.plex_db.mapping')
+
+# Max. number of items we remember
+MAPPING_CACHE_SIZE = 20000
+# Items we load into the cache after a full sync - the ones we play
+WARM_PLEX_TYPES = (v.PLEX_TYPE_MOVIE, v.PLEX_TYPE_EPISODE)
+
+
+class Mapping(object):
+    """
+    The Kodi ids of one single item that we synced from the PMS
+    """
+    __slots__ = ('plex_id', 'plex_type', 'kodi_id', 'kodi_type',
+                 'kodi_fileid', 'kodi_fileid_2')
+
+    def __init__(self, plex_id, plex_type, kodi_id, kodi_type,
+                 kodi_fileid=None, kodi_fileid_2=None):
+        self.plex_id = plex_id
+        self.plex_type = plex_type
+        self.kodi_id = kodi_id
+        self.kodi_type = kodi_type
+        self.kodi_fileid = kodi_fileid
+        self.kodi_fileid_2 = kodi_fileid_2
+
+    @classmethod
+    def from_db_item(cls, db_item):
+        """
+        Pass in the dict returned by e.g. PlexDB().item_by_id(). Returns None
+        if db_item is None
+        """
+        if not db_item:
+            return
+        return cls(db_item['plex_id'],
+                   db_item['plex_type'],
+                   db_item['kodi_id'],
+                   db_item['kodi_type'],
+                   db_item.get('kodi_fileid'),
+                   db_item.get('kodi_fileid_2'))
+
+    def __repr__(self):
+        return ('{{plex_id: {0.plex_id}, plex_type: {0.plex_type}, '
+                'kodi_id: {0.kodi_id}, kodi_type: {0.kodi_type}, '
+                'kodi_fileid: {0.kodi_fileid}, '
+                'kodi_fileid_2: {0.kodi_fileid_2}}}'.format(self))
+
+
+class MappingCache(object):
+    """
+    Thread-safe, read-through cache of plex_id <-> kodi_id/kodi_fileid for
+    the entire PKC service process. Evicts the least recently used items.
+
+    Writers invalidate the plex_ids they changed AFTER committing to plex.db,
+    see PlexDBBase.invalidate_mappings()
+    """
+    def __init__(self, maxsize):
+        self._lock = Lock()
+        # {plex_id: Mapping}
+        self._by_plex_id = utils.LRUCache(maxsize)
+        # {(kodi_id, kodi_type): plex_id}
+        self._by_kodi_id = utils.LRUCache(maxsize)
+        # Incremented with every invalidation - lets us detect that a writer
+        # invalidated while we were reading from plex.db
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def by_plex_id(self, plex_id, plex_type=None):
+        """
+        Returns the Mapping for plex_id or None if we did not sync the item.
+        Supply with the correct plex_type to speed up the lookup
+        """
+        with self._lock:
+            mapping = self._by_plex_id.get(plex_id)
+            if mapping:
+                self.hits += 1
+            else:
+                self.misses += 1
+                generation = self._generation
+        if not mapping:
+            from . import PlexDB
+            with PlexDB(lock=False) as plexdb:
+                mapping = Mapping.from_db_item(plexdb.item_by_id(plex_id,
+                                                                 plex_type))
+            if not mapping:
+                return
+            self._remember(mapping, generation)
+        if plex_type is not None and mapping.plex_type != plex_type:
+            return
+        return mapping
+
+    def by_kodi_id(self, kodi_id, kodi_type):
+        """
+        Returns the Mapping for the Kodi item or None if it was not synced
+        from the PMS
+        """
+        with self._lock:
+            plex_id = self._by_kodi_id.get((kodi_id, kodi_type))
+            mapping = self._by_plex_id.get(plex_id) if plex_id else None
+            if (mapping and mapping.kodi_id == kodi_id and
+                    mapping.kodi_type == kodi_type):
+                self.hits += 1
+                return mapping
+            self.misses += 1
+            generation = self._generation
+        from . import PlexDB
+        with PlexDB(lock=False) as plexdb:
+            mapping = Mapping.from_db_item(plexdb.item_by_kodi_id(kodi_id,
+                                                                  kodi_type))
+        if mapping:
+            self._remember(mapping, generation)
+        return mapping
+
+    def _remember(self, mapping, generation):
+        with self._lock:
+            if generation != self._generation:
+                # A writer might have changed the item while we were reading
+                return
+            self._by_plex_id.set(mapping.plex_id, mapping)
+            self._by_kodi_id.set((mapping.kodi_id, mapping.kodi_type),
+                                 mapping.plex_id)
+
+    def invalidate(self, plex_ids):
+        """
+        Forget the items with plex_ids [iterable of int]
+        """
+        with self._lock:
+            self._generation += 1
+            for plex_id in plex_ids:
+                self._by_plex_id.discard(plex_id)
+
+    def clear(self):
+        """
+        Forget every item, e.g. after wiping plex.db
+        """
+        with self._lock:
+            self._generation += 1
+            self._by_plex_id.clear()
+            self._by_kodi_id.clear()
+
+    def warm(self):
+        """
+        Logs our stats, then refills the cache with the items that we're most
+        likely to play. Call after a full sync
+        """
+        self.log_stats()
+        from . import PlexDB
+        mappings = []
+        with PlexDB(lock=False) as plexdb:
+            for plex_type in WARM_PLEX_TYPES:
+                limit = self._by_plex_id.maxsize - len(mappings)
+                if limit <= 0:
+                    break
+                kodi_type = v.KODITYPE_FROM_PLEXTYPE[plex_type]
+                for row in plexdb.kodi_ids(plex_type, limit):
+                    mappings.append(Mapping(row[0], plex_type, row[1],
+                                            kodi_type, row[2], row[3]))
+        with self._lock:
+            self._generation += 1
+            self._by_plex_id.clear()
+            self._by_kodi_id.clear()
+            self.hits = 0
+            self.misses = 0
+            for mapping in reversed(mappings):
+                self._by_plex_id.set(mapping.plex_id, mapping)
+                self._by_kodi_id.set((mapping.kodi_id, mapping.kodi_type),
+                                     mapping.plex_id)
+        LOG.debug('Warmed up the mapping cache with %s items', len(mappings))
+
+    def log_stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            LOG.info('Mapping cache: %s hits, %s misses, hit rate %.1f%%, '
+                     '%s items cached',
+                     self.hits, self.misses,
+                     100.0 * self.hits / lookups if lookups else 0.0,
+                     len(self._by_plex_id))
+
+
+MAPPINGS = MappingCache(MAPPING_CACHE_SIZE)
@@ -10,6 +10,7 @@ class Movies(object):
         """
         Appends or replaces an entry into the plex table for movies
         """
+        self.add_plex_type(plex_id, v.PLEX_TYPE_MOVIE)
         query = '''
             INSERT OR REPLACE INTO movie(
                 plex_id,
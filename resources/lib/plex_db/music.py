@@ -9,6 +9,7 @@ class Music(object):
         """
         Appends or replaces music artist entry into the plex table
         """
+        self.add_plex_type(plex_id, v.PLEX_TYPE_ARTIST)
         query = '''
             INSERT OR REPLACE INTO artist(
                 plex_id,
@@ -31,6 +32,7 @@ class Music(object):
         """
         Appends or replaces an entry into the plex table
         """
+        self.add_plex_type(plex_id, v.PLEX_TYPE_ALBUM)
         query = '''
             INSERT OR REPLACE INTO album(
                 plex_id,
@@ -57,6 +59,7 @@ class Music(object):
         """
         Appends or replaces an entry into the plex table
         """
+        self.add_plex_type(plex_id, v.PLEX_TYPE_SONG)
         query = '''
             INSERT OR REPLACE INTO track(
                 plex_id,
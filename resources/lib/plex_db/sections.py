@@ -86,6 +86,7 @@ class Sections(object):
         """
         self.cursor.execute('DELETE FROM sections WHERE section_id = ?',
                             (section_id, ))
+        self.remove_sync_checkpoint(section_id)
 
     def update_section_sync(self, section_id, sync_to_kodi):
         """
@@ -118,3 +119,62 @@ class Sections(object):
         Sets the last_sync flag to 0 for every section
         """
         self.cursor.execute('UPDATE sections SET last_sync = 0')
+
+    def sync_checkpoint(self, section_id, plex_type):
+        """
+        Returns the dict
+            updated_at: updatedAt filter of the PMS listing [int or None]
+            total: totalSize of the PMS listing
+            position: position of the last processed item within the listing
+            plex_id: plex_id of the last processed item
+            last_sync: time of the (first) sync that processed these items
+        for an interrupted full sync of section_id and plex_type or None
+        """
+        self.cursor.execute('''
+            SELECT updated_at, total, position, plex_id, last_sync
+            FROM sync_checkpoint
+            WHERE section_id = ? AND plex_type = ?
+            LIMIT 1
+        ''', (section_id, plex_type))
+        entry = self.cursor.fetchone()
+        if not entry:
+            return
+        return {
+            'updated_at': entry[0],
+            'total': entry[1],
+            'position': entry[2],
+            'plex_id': entry[3],
+            'last_sync': entry[4]
+        }
+
+    def set_sync_checkpoint(self, section_id, plex_type, updated_at, total,
+                            position, plex_id, last_sync):
+        """
+        Remembers that every item of section_id and plex_type up to and
+        including position/plex_id has been processed
+        """
+        self.cursor.execute('''
+            INSERT OR REPLACE INTO sync_checkpoint(
+                section_id,
+                plex_type,
+                updated_at,
+                total,
+                position,
+                plex_id,
+                last_sync)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (section_id, plex_type, updated_at, total, position, plex_id,
+              last_sync))
+
+    def remove_sync_checkpoint(self, section_id, plex_type=None):
+        """
+        Removes the checkpoint(s) for section_id [and plex_type]
+        """
+        if plex_type:
+            self.cursor.execute('''
+                DELETE FROM sync_checkpoint
+                WHERE section_id = ? AND plex_type = ?
+            ''', (section_id, plex_type))
+        else:
+            self.cursor.execute('DELETE FROM sync_checkpoint WHERE section_id = ?',
+                                (section_id, ))
@@ -10,6 +10,7 @@ class TVShows(object):
         """
         Appends or replaces tv show entry into the plex table
         """
+        self.add_plex_type(plex_id, v.PLEX_TYPE_SHOW)
         self.cursor.execute(
             '''
             INSERT OR REPLACE INTO show(
@@ -35,6 +36,7 @@ class TVShows(object):
         """
         Appends or replaces an entry into the plex table
         """
+        self.add_plex_type(plex_id, v.PLEX_TYPE_SEASON)
         self.cursor.execute(
             '''
             INSERT OR REPLACE INTO season(
@@ -63,6 +65,7 @@ class TVShows(object):
         """
         Appends or replaces an entry into the plex table
         """
+        self.add_plex_type(plex_id, v.PLEX_TYPE_EPISODE)
         self.cursor.execute(
             '''
             INSERT OR REPLACE INTO episode(
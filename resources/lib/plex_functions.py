@@ -6,6 +6,8 @@ from ast import literal_eval
 from copy import deepcopy
 from time import time
 from threading import Thread
+from collections import deque
+from functools import partial
 
 from .downloadutils import DownloadUtils as DU, exceptions
 from . import backgroundthread, utils, plex_tv, variables as v, app
@@ -14,6 +16,9 @@ from . import backgroundthread, utils, plex_tv, variables as v, app
 LOG = getLogger('PLEX.plex_functions')
 
 CONTAINERSIZE = int(utils.settings('limitindex'))
+# Max. number of chunks of CONTAINERSIZE items that DownloadGen keeps in memory
+# or is downloading at any given time
+CHUNKS_IN_FLIGHT = 10
 
 # For discovery of PMS in the local LAN
 PLEX_GDM_IP = '239.0.0.250'  # multicast to PMS
@@ -459,14 +464,15 @@ def _poke_pms(pms, queue):
              url, pms['uuid'], xml.get('machineIdentifier'))
 
 
-def GetPlexMetadata(key, reraise=False):
+def GetPlexMetadata(key, reraise=False, missing=None):
     """
     Returns raw API metadata for key as an etree XML.
 
     Can be called with either Plex key '/library/metadata/xxxx'metadata
     OR with the digits 'xxxx' only.
 
-    Returns None or 401 if something went wrong
+    Returns None or 401 if something went wrong. Returns missing if the PMS
+    answered, but not with the item's metadata - e.g. if it has been deleted
     """
     key = str(key)
     if '/library/metadata/' in key:
@@ -505,14 +511,48 @@ def GetPlexMetadata(key, reraise=False):
         if xml == 401:
             # Either unauthorized (taken care of by doUtils) or PMS under strain
             return 401
+        elif xml is None:
+            # PMS did not answer
+            return
         # Did we receive a valid XML?
         try:
             xml[0].attrib
         # Nope we did not receive a valid XML
         except (TypeError, IndexError, AttributeError):
             LOG.error("Error retrieving metadata for %s", url)
-            xml = None
+            xml = missing
+        return xml
+
+
+def get_plex_metadata_batch(plex_ids):
+    """
+    Returns raw API metadata for several plex_ids [list of int] using one
+    single PMS request /library/metadata/<id1>,<id2>,...
+
+    Returns a dict {plex_id: etree xml} where each xml looks just like the
+    answer of GetPlexMetadata(plex_id) for that single item. plex_ids that the
+    PMS did not return are missing from the dict.
+    Returns None or 401 if something went wrong
+    """
+    xml = GetPlexMetadata(','.join(unicode(x) for x in plex_ids),
+                          missing=False)
+    if xml is None or xml == 401:
         return xml
+    answ = {}
+    if xml is False:
+        # None of the items exists (anymore)
+        return answ
+    attrib = dict(xml.attrib)
+    attrib['size'] = '1'
+    for child in xml:
+        plex_id = utils.cast(int, child.get('ratingKey'))
+        if plex_id is None:
+            continue
+        # Wrap every item in its own MediaContainer
+        container = utils.etree.Element(xml.tag, attrib=attrib)
+        container.append(child)
+        answ[plex_id] = container
+    return answ
 
 
 def get_playback_xml(url, server_name, authenticate=True, token=None):
@@ -593,10 +633,17 @@ class DownloadGen(object):
     Special iterator object that will yield all child xmls piece-wise. It also
     saves the original xml.attrib.
 
+    The PMS items are downloaded ahead in chunks of CONTAINERSIZE items and
+    yielded chunk by chunk in the order of their position on the PMS. At most
+    chunks_in_flight chunks are downloading or waiting to be consumed at any
+    time, so memory stays bounded no matter how big the section is. Getting
+    the next item is O(1). Pass start in order to skip the first start items
+    of the PMS listing.
+
     Yields XML etree children or raises RuntimeError at the end
     """
     def __init__(self, url, plex_type, last_viewed_at, updated_at, args,
-                 downloader):
+                 downloader, chunks_in_flight=CHUNKS_IN_FLIGHT, start=0):
         self._downloader = downloader
         self.successful = True
         self.xml = None
@@ -613,28 +660,41 @@ class DownloadGen(object):
         if updated_at:
             url = '%supdatedAt>=%s&' % (url, updated_at)
         self.url = url[:-1]
-        _blocking_download_chunk(self.url, self.args, 0, self.set_xml)
+        _blocking_download_chunk(self.url, self.args, start, self.set_xml)
         self.attrib = self.xml.attrib
-        self.current = 0
+        self.current = start
         self.total = int(self.attrib['totalSize'])
-        self.cache_factor = 10
-        # Will keep track whether we still have results incoming
-        self.pending_counter = []
-        end = min(self.cache_factor * CONTAINERSIZE,
-                  self.total + CONTAINERSIZE - self.total % CONTAINERSIZE)
-        for pos in range(CONTAINERSIZE, end, CONTAINERSIZE):
-            self.pending_counter.append(None)
-            self._downloader(self.url, self.args, pos, self.on_chunk_downloaded)
+        self.chunks_in_flight = max(chunks_in_flight, 1)
+        # The children of the chunk we're currently yielding from
+        self._chunk = deque(self.xml)
+        # No need to keep the entire xml around
+        self.xml = None
+        # Downloaded chunks not yet consumed: {start position: xml}
+        self._chunks = {}
+        # Start position of the next chunk to consume
+        self._next_start = start + CONTAINERSIZE
+        # Start position of the next chunk to download
+        self._next_download = start + CONTAINERSIZE
+        for _ in range(self.chunks_in_flight - 1):
+            self._download_next_chunk()
 
     def set_xml(self, xml):
         self.xml = xml
 
-    def on_chunk_downloaded(self, xml):
-        if xml is not None:
-            self.xml.extend(xml)
-        else:
+    def _download_next_chunk(self):
+        if self._next_download >= self.total:
+            return
+        self._downloader(self.url,
+                         self.args,
+                         self._next_download,
+                         partial(self.on_chunk_downloaded, self._next_download))
+        self._next_download += CONTAINERSIZE
+
+    def on_chunk_downloaded(self, start, xml):
+        if xml is None:
             self.successful = False
-        self.pending_counter.pop()
+            xml = ()
+        self._chunks[start] = xml
 
     def get(self, key, default=None):
         """
@@ -648,27 +708,28 @@ class DownloadGen(object):
     def __next__(self):
         while True:
             try:
-                child = self.xml[0]
+                child = self._chunk.popleft()
+            except IndexError:
+                pass
+            else:
                 self.current += 1
-                self.xml.remove(child)
-                if (self.current % CONTAINERSIZE == 0 and
-                        self.current <= self.total - (self.cache_factor - 1) * CONTAINERSIZE):
-                    self.pending_counter.append(None)
-                    self._downloader(
-                        self.url,
-                        self.args,
-                        self.current + (self.cache_factor - 1) * CONTAINERSIZE,
-                        self.on_chunk_downloaded)
                 return child
-            except IndexError:
-                if not self.pending_counter and not len(self.xml):
-                    if not self.successful:
-                        raise RuntimeError('Could not download everything')
-                    else:
-                        raise StopIteration()
-            LOG.debug('Waiting for download to finish')
-            if app.APP.monitor.waitForAbort(0.1):
-                raise StopIteration('PKC needs to exit now')
+            if self._next_start >= self.total:
+                if not self.successful:
+                    raise RuntimeError('Could not download everything')
+                else:
+                    raise StopIteration()
+            try:
+                chunk = self._chunks.pop(self._next_start)
+            except KeyError:
+                LOG.debug('Waiting for download to finish')
+                if app.APP.monitor.waitForAbort(0.1):
+                    raise StopIteration('PKC needs to exit now')
+                continue
+            self._next_start += CONTAINERSIZE
+            self._chunk = deque(chunk)
+            # We freed up a slot - download the next chunk in line
+            self._download_next_chunk()
 
     next = __next__
 
@@ -698,7 +759,12 @@ def _async_download_chunk(url, args, start, callback):
 
 
 def get_section_iterator(section_id, plex_type=None, last_viewed_at=None,
-                         updated_at=None, args=None):
+                         updated_at=None, args=None, start=0,
+                         chunks_in_flight=CHUNKS_IN_FLIGHT):
+    """
+    Returns a DownloadGen for all items of section_id. chunks_in_flight sets
+    how many chunks of CONTAINERSIZE items are downloaded ahead
+    """
     args = args or {}
     args.update({
         'checkFiles': 0,
@@ -727,7 +793,9 @@ def get_section_iterator(section_id, plex_type=None, last_viewed_at=None,
                        last_viewed_at,
                        updated_at,
                        args,
-                       downloader)
+                       downloader,
+                       chunks_in_flight=chunks_in_flight,
+                       start=start)
 
 
 def DownloadChunks(url):
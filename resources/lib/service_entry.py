@@ -16,6 +16,7 @@ from . import playback_starter
 from . import playqueue
 from . import variables as v
 from . import app
+from . import db
 from . import loghandler
 from . import backgroundthread
 from . import skip_plex_intro
@@ -569,6 +570,8 @@ class Service(object):
         library_sync.clear_window_vars()
         # Will block until threads have quit
         app.APP.stop_threads()
+        # Close our pooled DB connections
+        db.release_pool()
         # CLEANUP
         # Kodi's xbmc.Monitor() stalls
         # delete xbmc.Player() just to be sure
@@ -9,6 +9,7 @@ from sqlite3 import OperationalError
 from datetime import datetime
 from unicodedata import normalize
 from threading import Lock
+from collections import OrderedDict
 import urllib
 import urlparse as _urlparse
 # Originally tried faster cElementTree, but does NOT work reliably with Kodi
@@ -277,6 +278,51 @@ class AttributeDict(dict):
         return self.__unicode__().encode('utf-8')
 
 
+class LRUCache(object):
+    """
+    Dict-like cache that holds at most maxsize entries by evicting the least
+    recently used entry. Keeps track of its hits and misses. NOT thread-safe
+    """
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        try:
+            value = self._data.pop(key)
+        except KeyError:
+            self.misses += 1
+            return default
+        # Move to the end: most recently used
+        self._data[key] = value
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self._data.pop(key, None)
+        self._data[key] = value
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def discard(self, key):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def hit_rate(self):
+        """
+        Returns the share of lookups that hit the cache [float, 0.0 - 1.0]
+        """
+        lookups = self.hits + self.misses
+        return float(self.hits) / lookups if lookups else 0.0
+
+
 def cast(func, value):
     """
     Cast the specified value to the specified type (returned by func). Currently